@@ -0,0 +1,65 @@
+# Simulator client - Andrew Herbert - 18/10/2026
+
+# Usage: python3 900client.py [900sim.py arguments]
+#        python3 900client.py -stop
+#
+# Stands in for "python3 900sim.py": sends its arguments and working
+# directory to the server started by 900serve.py, prints what the
+# simulator printed and exits with the simulator's exit code.  If no server
+# is running the simulator is run in this process instead.  -stop stops
+# the server.
+#
+# The scripts run the simulator with $SIM900 if it is set, e.g.
+#
+#     python3 900serve.py &
+#     SIM900="python3 900client.py" sh algol.sh primes.txt
+
+import os
+import sys
+import json
+import socket
+import tempfile
+
+def defaultSocket ():
+    # as 900serve.py
+    return os.environ.get('SIM900_SOCKET',
+                          os.path.join(tempfile.gettempdir(),
+                                       '900sim-%d.sock' % os.getuid()))
+
+def request (message):
+    # the server's response to message, None if there is no server
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(defaultSocket())
+        except OSError:
+            return None
+        try:
+            s.sendall(json.dumps(message).encode('ascii') + b'\n')
+            with s.makefile('rb') as f:
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            print('lost contact with server', file=sys.stderr)
+            sys.exit(255)
+
+def runLocally (argv):
+    import runpy
+    sys.argv = [os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '900sim.py')] + argv
+    runpy.run_path(sys.argv[0], run_name='__main__')
+
+def main ():
+    argv = sys.argv[1:]
+    if argv == ['-stop']:
+        if request({'stop': True}) is None:
+            print('no server running', file=sys.stderr)
+            sys.exit(1)
+        return
+    response = request({'cwd': os.getcwd(), 'argv': argv})
+    if response is None:
+        runLocally(argv)
+        return
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    sys.exit(response['code'])
+
+main()
@@ -0,0 +1,99 @@
+# Teletype sessions host - Andrew Herbert - 18/10/2026
+
+# Usage: python3 900host.py -jump ADDR [-store FILE] [-ptin FILE]
+#                           [-port N | -socket PATH] [-limit N] [-slice N]
+#
+# Serves interactive sessions, each its own machine loaded from .store (or
+# -store FILE) and started at ADDR, with its teletype attached to a TCP
+# connection to port N on this host (default 9030), or to a connection to
+# the Unix domain socket PATH.  What is typed is the teletype input and the
+# teleprinter output is sent back, e.g.,
+#
+#     python3 900host.py -jump 8 &
+#     nc localhost 9030
+#
+# -ptin puts a copy of FILE in each machine's paper tape reader, punch
+# output is discarded.  The machines are time sliced in one process, -slice
+# instructions at a time, a machine waiting for typing taking no time, see
+# scheduler.py.  Each session's store is its own copy and is not saved.
+
+import sys
+import asyncio
+import argparse
+
+import sim900
+import scheduler
+from sim900 import otherStop
+
+def getArgs ():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-jump', help='start address', type=int,
+                        required=True)
+    parser.add_argument('-store', help='store to start from',
+                        default='.store')
+    parser.add_argument('-ptin', help='paper tape input file path',
+                        default='')
+    parser.add_argument('-port', help='TCP port', type=int, default=9030)
+    parser.add_argument('-socket', help='Unix domain socket path',
+                        default='')
+    parser.add_argument('-limit', help='instruction limit for each session',
+                        type=int, default=sim900.defaultLimit)
+    parser.add_argument('-slice', help='instructions run at a time',
+                        type=int, default=scheduler.sliceSize)
+    args = parser.parse_args()
+    if not (8 <= args.jump <= 8181):
+        print('start address must be in range 8-8181', file=sys.stderr)
+        sys.exit(otherStop)
+    if args.limit < 1 or args.slice < 1:
+        print('nonsensical limit or slice', file=sys.stderr)
+        sys.exit(otherStop)
+    return args
+
+class Host:
+
+    def __init__ (self, args):
+        self.args  = args
+        template   = sim900.Machine()
+        template.loadStore(args.store)
+        self.store = template.store
+        self.tape  = None
+        if args.ptin != '':
+            with open(args.ptin, 'rb') as f:
+                self.tape = f.read()
+        self.scheduler = scheduler.Scheduler()
+
+    def newMachine (self):
+        machine = sim900.Machine()
+        machine.store[:] = self.store
+        machine.flushDecoded()
+        if not (self.tape is None):
+            machine.attachReader(data=self.tape)
+        if self.args.jump == 8181:
+            machine.establishInitialInstructions()
+        machine.start(self.args.jump)
+        return machine
+
+    async def session (self, reader, writer):
+        await scheduler.Session(self.scheduler, self.newMachine(), reader,
+                                writer, self.args.limit).serve()
+
+    async def serve (self):
+        asyncio.ensure_future(self.scheduler.run())
+        if self.args.socket != '':
+            server = await asyncio.start_unix_server(self.session,
+                                                     self.args.socket)
+        else:
+            server = await asyncio.start_server(self.session, 'localhost',
+                                                self.args.port)
+        async with server:
+            await server.serve_forever()
+
+def main ():
+    args = getArgs()
+    scheduler.sliceSize = args.slice
+    try:
+        asyncio.run(Host(args).serve())
+    except KeyboardInterrupt:
+        pass
+
+main()
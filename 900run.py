@@ -0,0 +1,93 @@
+# Run a job through a language system - Andrew Herbert - 18/10/2026
+
+# Usage: python3 900run.py LANGUAGE SOURCE
+#
+# where LANGUAGE is one of algol, 903fortran, sir or 905fortran and SOURCE
+# is a source program, either a path or a name in src/<language>.  Does
+# the same as algol.sh, 903sir.sh or 905fortran.sh but in a single process
+# (see pipeline.py), leaving the same .store, .punch and .ascii files at
+# the end.  The time taken by each step is reported on stderr.
+#
+# With -batch any number of SOURCEs can be given.  The language system is
+# loaded once and the sources are run in parallel by -jobs worker
+# processes (see batch.py).  Each job's teleprinter output is printed in
+# turn, followed by a summary on stderr.  -json FILE writes a record of
+# every job to FILE, the punch output as base64 and as text.  No .store,
+# .punch or .ascii files are left behind.  The exit code is the largest
+# of the jobs' exit codes.
+
+import sys
+import json
+import base64
+import argparse
+
+import sim900
+import pipeline
+import snapshot
+import batch
+
+def getArgs ():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('language', choices=sorted(pipeline.languages))
+    parser.add_argument('source',   help='source program', nargs='+')
+    parser.add_argument('-limit',   help='instruction limit for each step',
+                        type=int, default=sim900.defaultLimit)
+    parser.add_argument('-snapshot-cache', dest='snapshotCache',
+                        help='directory of snapshots of earlier runs',
+                        default='')
+    parser.add_argument('-quiet', help='do not report step timings',
+                        action='store_true')
+    parser.add_argument('-batch', help='run each source as a separate job',
+                        action='store_true')
+    parser.add_argument('-jobs', help='number of worker processes',
+                        type=int, default=None)
+    parser.add_argument('-json', help='file to write batch job records to',
+                        default='')
+    return parser.parse_args()
+
+def printTimings (job):
+    total = 0.0
+    for step, seconds, instructions, code in job.timings:
+        total += seconds
+        print('%-20s %8.3fs %10d instructions%s' %
+              (step, seconds, instructions,
+               '' if code is None else '  exit %d' % code), file=sys.stderr)
+    print('%-20s %8.3fs' % ('total', total), file=sys.stderr)
+
+def runBatch (args):
+    records = batch.runBatch(args.language, args.source, args.jobs,
+                             args.limit)
+    for record in records:
+        sys.stdout.write(record['tty'])
+    if not args.quiet:
+        for record in records:
+            print('%-30s %8.3fs %12d instructions  exit %d' %
+                  (record['source'], record['seconds'],
+                   record['instructions'], record['code']), file=sys.stderr)
+    if args.json != '':
+        for record in records:
+            punch = record['punch']
+            record['ascii'] = pipeline.fromTelecode(punch)
+            record['punch'] = base64.b64encode(punch).decode('ascii')
+        with open(args.json, 'w') as f:
+            json.dump(records, f, indent=1)
+    sys.exit(max(record['code'] for record in records))
+
+def main ():
+    args = getArgs()
+    if args.batch:
+        runBatch(args)
+    if len(args.source) != 1:
+        print('Only one source without -batch', file=sys.stderr)
+        sys.exit(sim900.otherStop)
+    cache = None
+    if args.snapshotCache != '':
+        cache = snapshot.SnapshotCache(args.snapshotCache)
+    job = pipeline.runJob(args.language, args.source[0], limit=args.limit,
+                          cache=cache)
+    job.writeOutputs()
+    if not args.quiet:
+        printTimings(job)
+    sys.exit(job.code)
+
+main()
@@ -0,0 +1,188 @@
+# Simulator server - Andrew Herbert - 18/10/2026
+
+# Usage: python3 900serve.py [-socket PATH] [-machines N]
+#
+# Runs 900sim.py jobs sent by 900client.py over a Unix domain socket, so
+# that each step of a job does not pay for starting Python, importing the
+# simulator and reading .store.  A request names the client's working
+# directory and its 900sim.py arguments; the server runs 900sim.py's main()
+# there, in this process, and replies with the exit code and the output
+# written to stdout and stderr.  The files 900sim.py reads and writes
+# (.store, .reader.pos, .punch and so on) are the same as when it is run
+# directly.
+#
+# The machines of the last -machines .store files used are kept in memory.
+# When a job starts from a .store that is unchanged since the server last
+# wrote it, the machine is reused as it is, with its decoded instructions
+# and translated blocks, rather than read back from the file.
+#
+# Requests are run one at a time, in the order they arrive.  The socket is
+# $SIM900_SOCKET if set, otherwise 900sim-<uid>.sock in the temporary
+# directory.  "python3 900client.py -stop" stops the server.
+#
+# -debug is refused, the debugger would read the server's stdin rather
+# than the client's.
+
+import io
+import os
+import sys
+import json
+import signal
+import tempfile
+import argparse
+import traceback
+import contextlib
+import socketserver
+import importlib.util
+from collections import OrderedDict
+
+import sim900
+import storefile
+from sim900 import otherStop
+
+systemDir = os.path.dirname(os.path.abspath(__file__))
+
+def defaultSocket ():
+    # as 900client.py
+    return os.environ.get('SIM900_SOCKET',
+                          os.path.join(tempfile.gettempdir(),
+                                       '900sim-%d.sock' % os.getuid()))
+
+def loadSimulator ():
+    # 900sim.py as a module, its name is not an identifier
+    spec = importlib.util.spec_from_file_location(
+               'sim900cli', os.path.join(systemDir, '900sim.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class WarmMachines:
+    # machines kept for reuse, by absolute path of the store file each
+    # was last loaded from or saved to, least recently used first
+
+    def __init__ (self, size):
+        self.size     = size
+        self.machines = OrderedDict()
+
+    def unchanged (self, path, machine):
+        # True if the file at path holds what machine last saved there
+        if machine.storeImage is None or \
+           storefile.imageBytes(machine.store) != machine.storeImage:
+            return False
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return False
+        return data[:storefile.header] == \
+               storefile.binaryHeader(len(machine.store)) and \
+               data[storefile.header:] == machine.storeImage
+
+    def get (self, storePath):
+        # called by 900sim.py for the machine to run
+        path = os.path.abspath(storePath)
+        machine = self.machines.pop(path, None)
+        if not (machine is None) and self.unchanged(path, machine):
+            machine.reset()
+            machine.storeImagePath = storePath
+            machine.ttyOut         = sys.stdout
+            machine.lineBuffered   = False
+            machine.traceTrigger   = None
+            machine.profile        = None
+            machine.undoLog        = None
+            for addr in list(machine.breaks):
+                machine.clearBreak(addr)
+            for addr in list(machine.watches):
+                machine.clearWatch(addr)
+            machine.setMonitor(None, 0)
+            machine.clearStats() # of this run only, as for a new machine
+        else:
+            machine = sim900.Machine()
+            machine.loadStore(storePath)
+        self.machines[path] = machine
+        while len(self.machines) > self.size:
+            self.machines.popitem(last=False)
+        return machine
+
+class Handler (socketserver.StreamRequestHandler):
+
+    def handle (self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        if request.get('stop'):
+            self.reply({'code': 0, 'stdout': '', 'stderr': ''})
+            self.server.stopping = True
+            return
+        self.reply(self.server.runJob(request['cwd'], request['argv']))
+
+    def reply (self, response):
+        self.wfile.write(json.dumps(response).encode('ascii') + b'\n')
+
+class Server (socketserver.UnixStreamServer):
+
+    def __init__ (self, path, machines):
+        if os.path.exists(path):
+            os.remove(path) # left by a server that died
+        socketserver.UnixStreamServer.__init__(self, path, Handler)
+        self.path      = path
+        self.stopping  = False
+        self.simulator = loadSimulator()
+        self.simulator.machineSource = WarmMachines(machines).get
+
+    def runJob (self, cwd, argv):
+        # run 900sim.py with arguments argv in directory cwd
+        out = io.StringIO()
+        err = io.StringIO()
+        handlers = (signal.getsignal(signal.SIGINT),
+                    signal.getsignal(signal.SIGTERM))
+        home = os.getcwd()
+        code = 0
+        try:
+            os.chdir(cwd)
+            with contextlib.redirect_stdout(out), \
+                 contextlib.redirect_stderr(err):
+                try:
+                    self.simulator.main(argv)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else \
+                           (0 if e.code is None else otherStop)
+                except Exception:
+                    traceback.print_exc()
+                    code = otherStop
+        except OSError as e:
+            print('cannot run in %s - %s' % (cwd, e), file=err)
+            code = otherStop
+        finally:
+            os.chdir(home)
+            signal.signal(signal.SIGINT,  handlers[0])
+            signal.signal(signal.SIGTERM, handlers[1])
+        return {'code': code, 'stdout': out.getvalue(),
+                'stderr': err.getvalue()}
+
+    def serve (self):
+        try:
+            while not self.stopping:
+                self.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+def getArgs ():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-socket', help='socket path', default=defaultSocket())
+    parser.add_argument('-machines', help='number of machines kept warm',
+                        type=int, default=8)
+    return parser.parse_args()
+
+def main ():
+    args = getArgs()
+    # SIGTERM stops the server as SIGINT does
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    Server(args.socket, max(args.machines, 1)).serve()
+
+main()
@@ -8,489 +8,326 @@
 # at end, dumps out contents of store to .store, unless catastrophic errors.
 # This is to simulate retention of data in core store between entry points.
 # There is a companion program "storeprint.py" which can be used to obtain
-# an interpreted listing of the store.
+# an interpreted listing of the store.  .store is written in a binary format,
+# only the pages of store changed by the run being rewritten, unless the
+# -textstore option asks for the original text format.  Either format is
+# accepted on input and "storeconvert.py" converts between them.
 
 # By default reads input from file .reader unless overriden by -ptin option
-# on the command line.  At end writes any unconsumed paper tape input to
-# .reader,# unless catastrophic errors, overwriting existing contents.
-# This is to # simulate leaving a tape in the reader between successive entry
-# points. # The input file should be raw bytes representing eight bit paper tape
+# on the command line.  At end records the tape and how far it has been read
+# in .reader.pos, unless catastrophic errors, and the next run carries on
+# from there unless given -ptin or a .reader newer than .reader.pos.
+# This is to simulate leaving a tape in the reader between successive entry
+# points without copying the rest of the tape on each run.  With -readerfile
+# any unconsumed paper tape input is written to .reader instead, overwriting
+# existing contents, for scripts that use the remaining tape.
+# The input file should be raw bytes representing eight bit paper tape
 # codes, either binary of one of the Elliott telecodes.  There is a companion
 # program "to900text.py" which converts a UTF-8 character file to its
 # equivalent in Elliott 900 telecode.
 
+# -textin PATH takes paper tape input from a UTF-8 text file instead,
+# converted to telecode as it is loaded as "to900text.py" would, and any
+# unconsumed input is written to .reader.  -ascii writes the punch output
+# converted to ASCII to .ascii at the end, as "from900text.py" would.  See
+# telecode.py.
+
 # Teletype input is handled similarly, taken from the file .ttyin unless
-# overridden by the -ttyin option on the command line
+# overridden by the -ttyin option on the command line, its position kept in
+# .ttyin.pos
 
 # By default paper tape output is send to file .punch, unless overridden by
 # -ptout option on command line.  There is a companion program "from900text.py"
 # which converts a file containing 900 telecode output to it's UTF-8 equivalent.
 
+# Teleprinter and paper tape punch output is buffered and written out when
+# the simulator stops.  -linebuffer writes teleprinter output a line at a
+# time instead, for watching a program as it runs.
+
 # By default the simulator jumps to 8181 to start execution, unless overriden by
-# -jump option on command line.
+# -jump option on command line.  Starting at 8181 the words of a binary tape
+# read by the initial orders and the standard loaders are put straight into
+# store rather than simulated, with the same result, see fastload.py.
+# -slowload simulates them, -verifyload loads the tape both ways and halts
+# if the results differ.
 
 # A limit on maximum number of instructions to be executed can be set using
 # the -limit command line option.
 
 # A trace in file .trace will be written if -trace command line option is
 # present.  There is a companion program "traceprint.py" that produces am
-# interpreted listing of the trace.
+# interpreted listing of the trace.  The trace is written in a compact
+# binary format, unless -texttrace asks for the original text format (see
+# tracefile.py).  -trace-ring N keeps only the last N trace records, written
+# to .trace when the simulator stops.
+#
+# Trace triggers restrict the trace to what is of interest:
+#   -trace-range LOW HIGH  only instructions at addresses LOW to HIGH
+#   -trace-after N         start after N instructions have been executed
+#   -trace-at ADDR         start at the first execution of address ADDR
+#   -trace-count M         stop after M instructions have been traced
+#   -trace-every K         trace only every K'th instruction selected
+# Any trigger turns on tracing.  Instructions before the trace starts, and
+# after it stops, run at full speed.
+
+# If -snapshot-cache DIR is given, the outcome of each run is kept in DIR
+# and a run repeating an earlier one, from the same store with the same
+# input, is replaced by restoring the outcome.  See snapshot.py.
+
+# If -profile is present, the number of times each address and function
+# code is executed, the jumps taken and the time between input/output
+# instructions are counted and a report written to .profile, with the
+# hottest addresses shown as by storeprint.py and a map of the addresses
+# executed.  -profile-json FILE also writes the counts to FILE as JSON.
+# See profiler.py.
+
+# With -checkpoint N the full state of the machine (store, registers,
+# interrupt level, tape positions, punch position and the instructions left
+# to run) is written to .checkpoint every N instructions.  SIGINT or SIGTERM
+# stop the simulator with the state written to .checkpoint and exit code 4.
+# -resume carries on from .checkpoint exactly where it stopped, with the
+# tapes recorded there; .checkpoint is removed when the run is complete.
+# See checkpoint.py.
+
+# -debug runs the machine under an interactive debugger, with breakpoints,
+# watchpoints, single stepping and store printing, commands being read from
+# stdin (see debugger.py).  Quitting before the machine stops writes
+# .checkpoint, as SIGINT does without -debug, for -resume.  Binary tapes
+# are loaded by simulation when debugging.  -undo N keeps an undo log of
+# the last N instructions (sixteen bytes each, see undolog.py), so that the
+# debugger can step back from where the machine stops, at the cost of
+# running at the speed of the general instruction loop.  -debug cannot be
+# used through 900serve.py.
+
+# Run statistics, e.g., instructions executed and instruction decode cache
+# hit rate, are printed on stderr at the end if -stats is present.
+# -stats-json FILE writes them to FILE as JSON, with the wall time, the
+# instructions executed by function code and B modified or not, the bytes
+# read or written by each device, the level terminates and why the run
+# stopped.  With -stats-every N as well FILE is rewritten every N
+# instructions during the run, for watching a long run, using the monitor
+# hook of sim900.py.  The counts are kept whether asked for or not.
 
 # The program exits with an exit code indicating the reason for completion,
 # e.g., 0 = dynamic stop, 1 = run out of paper tape input, etc.
 
+import os
 import sys
-import os.path
-import argparse
+import json
 import time
+import signal
+import argparse
 
-# Exit handling
-
-dynStop   =   0  # dynamic stop
-rdrStop   =   1  # run off paper tape
-ttyStop   =   2  # run off tty input
-limitStop =   3  # reached execution limit
-otherStop = 255  # unspecified error
-
-def finish (code):
-    #print('exiting with code', code)
-    writeStoreToFile ()
-    endTracing () # close tracing if any to ensure written to file
-    closeReader () # tidy up I/O
-    closePunch ()
-    closeTTY ()
-    sys.exit(code)
-
-def failure (s, code):
-    print ('\n\n***Halted - ', s)
-    finish (code)
+import sim900
+import snapshot
+import profiler
+import checkpoint
+import telecode
+import fastload
+import debugger
+import undolog
+from sim900 import dynStop, rdrStop, ttyStop, limitStop, otherStop
 
+checkpointStop = 4 # stopped by a signal, state saved in .checkpoint
 
-# Useful constants for 18 and 13 bit arithmetic
-bit19    = 1<<18    # arithmetic is 2's complement 18 bits
-mask18   = 0o777777
-bit18    = 1<<17
-mask16   = 0o177777 # absolute addresses are 16 bits
-addrMask = 8191     # offset within module in an absolute address
-modMask  = 0o160000 # module number in an absolute address
+stopReasons = {dynStop: 'dynamic stop', rdrStop: 'end of paper tape',
+               ttyStop: 'end of teletype input',
+               limitStop: 'instruction limit', checkpointStop: 'checkpoint',
+               otherStop: 'error'}
 
-# Function to convert 18 bit values to numbers
-def normal (n):
-    if n >= bit18:
-        return n - bit19
-    else:
-        return n
+# Exit handling
 
-# Execution tracing
+storePath    = '.store'
+ptrDefault   = '.reader'
+ptpDefault   = '.punch'
+ttyInDefault = '.ttyin'
 traceDefault = '.trace'
-tracePath    = traceDefault
-traceFile    = None
-
-def startTracing ():
-    global traceFile
-    try:
-        traceFile = open(tracePath, 'w')
-    except:
-        failure('cannot open trace file ' + tracePath, otherStop)
-
-def endTracing ():
-    if not (traceFile is None):
-        traceFile.close()
-
-def trace (s):
-    if not (traceFile == None):
-        traceFile.write(s+'\n')
-
-# 16K store
-maxStore = 16*1024
-store = [0 for addr in range(maxStore)]
-
-def clearStore ():
-    for word in store:
-        word = 0
-
-# readStoreFromFile, writeStoreToFile -- functions to dump out store
-# to a file as a sequence of integers, to enable store to be preserved
-# between runs of the program
-
-storePath = '.store'
-
-def readStoreFromFile ():
-    # if path exists, read in contents of store as integers
-    if not os.path.exists(storePath):
-        clearStore()
-    else:
-        with open (storePath) as f:
-            words = [int(x) for x in f.read().split()]
-        store[:len(words)] = words
-
-def writeStoreToFile ():
-    with open(storePath, mode='w') as f:
-        for i in range(maxStore):
-         print('%7d' % store[i], file=f, end=('\n' if i % 10 == 9 else ''))
-
-# Paper tape input/output
-ptrDefault = '.reader'
-ptrPath    = ptrDefault # can be overridden by command option -ptin
-ptrBuf     = None
-ptrIdx     = 0
-
-ptpDefault = '.punch'
-ptpPath    = ptpDefault # can be overridden by command line option -ptout
-ptpFile    = None
+profileDefault = '.profile'
+asciiDefault = '.ascii'
+textStore    = False # write .store in the original text format
+readerFile   = False # leave unconsumed input in .reader and .ttyin
+textIn       = False # paper tape input converted from text
+asciiOut     = False # punch output converted to .ascii
+stopRequest  = False # SIGINT or SIGTERM received
+
+machineSource = None # set by 900serve.py to reuse machines between runs
+
+def newMachine ():
+    # a machine holding the contents of .store
+    if not (machineSource is None):
+        return machineSource(storePath)
+    machine = sim900.Machine()
+    machine.loadStore(storePath)
+    return machine
+
+def requestStop (signum, frame):
+    global stopRequest
+    stopRequest = True
+
+def stopRequested ():
+    return stopRequest
+
+def halted (s):
+    print ('\n\n***Halted - ', s)
 
-ttyInDefault = '.ttyin'
-ttyInPath    = ttyInDefault # can be overridden by command line option -ttyin
-ttyInBuf     = None
-ttyInIdx     = 0
-
-# Save any remaining paper tape to simulate leaving tape in reader between runs
-def closeReader ():
-    if not (ptrBuf is None):
-        #print('Saving', ptrBuf[ptrIdx:])
-        try:
-            with open(ptrDefault, 'wb') as f:
-                f.write(ptrBuf[ptrIdx:])
-        except: failure('cannot save remaining paper tape to ' + ptrDefault,
-                        otherStop)
-
-# Close paper tape punch to ensure output to file
-def closePunch ():
-    if not (ptpFile is None):
-        ptpFile.close()
-
-# Read input paper tape
-def readTape ():
-    global ptrBuf, ptrIdx
-    if ptrBuf is None:
-        try:
-            with open(ptrPath, 'rb') as f: # open input file on first 15 2048
-                ptrBuf = f.read()
-        except: failure('cannot open ptr input file ' + ptrPath, otherStop)
-    if ptrIdx >= len(ptrBuf):
-        msg = 'run off end of input tape'
-        trace(msg)
-        failure(msg, rdrStop)
-    code = ptrBuf[ptrIdx]
-    if code < 0 | code > 128:
-        failure('invalid code in paper tape input - %d' & code, otherStop)
-    ptrIdx+=1
-    if not (traceFile is None):
-        trace('ptr read code %3d' % code)
-    return code
-
-# Save any remaining tty input analogous to papert ape input
-def closeTTY ():
-    if (not ttyInBuf is None):
+# Save any remaining input to simulate leaving tape in reader between runs
+def saveRemainder (data, path, what):
+    if not (data is None):
         try:
-            with open(ttyInDefault, 'wb') as f:
-                f.write(ttyInBuf[ttyInIdx:])
-        except: failure('cannot save remaining teletype input to ' +
-                         ttyInDefault, otherStop)
-
-# Read tty
-def readTTYIn ():
-    global ttyInBuf, ttyInIdx
-    if ttyInBuf is None:
+            with open(path, 'wb') as f:
+                f.write(data)
+        except:
+            halted('cannot save remaining %s to %s' % (what, path))
+            return otherStop
+    return None
+
+# Or record the tape in the reader and how far it has been read, the
+# tape's size and modification time identifying the version of it read
+def positionPath (path):
+    return path + '.pos'
+
+def tapeIdentity (path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size,
+            'mtime': st.st_mtime_ns}
+
+def savePosition (data, tape, offset, path, what):
+    if not (data is None or tape is None):
         try:
-            with open(ttyInPath, 'rb') as f: # open input file on first 15 2048
-                ttyInBuf = f.read()
-        except: failure('cannot open tty input file ' + ttyInPath, otherStop)
-    if ttyInIdx >= len(ttyInBuf):
-        msg = 'run off end of tty input'
-        trace(msg)
-        failure(msg, ttyStop)
-    code = ttyInBuf[ttyInIdx]
-    if code < 0 | code > 128:
-        failure('invalid code in tty input - %d' & code, otherStop)
-    ttyInIdx+=1
-    if not (traceFile is None):
-        trace('tty read code %3d' % code)
-    return code
-
-# Output to paper tape punch
-def punchTape (code):
-    global   ptpFile
-    if ptpFile is None:
-        try:
-            ptpFile = open(ptpPath, 'wb') # open output file on first 15 6144
-        except: failure('cannot open paper tape output file ' + ptpPath,
-                        otherStop)
-    ptpFile.write(bytes([code]))
-
-def readTTY ():
-    failure('teletype input from console not implemented', otherStop)
-
-def writeTTY (code):
-    ch = code & 127
-    if ch == 10 or 32 <= ch <= 122:
-        sys.stdout.write(chr(ch))
-
-# Internal machine state
-
-# Accumulator and extension (Q register)
-aReg = 0
-qReg = 0
-
-# Interrupt level - will be either 1 or 4. real machine has 1, 2, 3, 4
-level = 1
-
-# Addresses of b register and sequence control register depend on level
-sLevel1 = 0
-bLevel1 = 1
-sLevel4 = 6
-bLevel4 = 7
-
-scr  = sLevel1
-bReg = bLevel1
-
-def makeIns (m, f, n):
-    # create an instruction from m, f and n fields
-    return (((m << 4) + f) << 13) + n
-
-# Simulate initial orders by writing them to store
-def establishInitialInstructions ():
-    store[8180] = (-3 & mask18)
-    store[8181] = makeIns(0,  0, 8180)
-    store[8182] = makeIns(0,  4, 8189)
-    store[8183] = makeIns(0, 15, 2048)
-    store[8184] = makeIns(0,  9, 8186)
-    store[8185] = makeIns(0,  8, 8183)
-    store[8186] = makeIns(0, 15, 2048)
-    store[8187] = makeIns(1,  5, 8180)
-    store[8188] = makeIns(0, 10,    1)
-    store[8189] = makeIns(0,  4,    1)
-    store[8190] = makeIns(0,  9, 8182)
-    store[8191] = makeIns(0,  8, 8177)
-
-# Instructions, operate on aReg, qReg and store.
-#SCR and B register are accessed via the store rather than memoed.
-
-#  0 Load B
-def loadB(addr):
-    global qReg
-    qReg = store[addr]
-    store[bReg] = qReg
-
-#  1 Add
-def add (addr):
-    global aReg
-    aReg = (aReg + store[addr]) & mask18
-
-#  2 Negate and Add
-def negAdd (addr):
-    global aReg, qReg
-    qReg = store[addr]
-    aReg = (qReg - aReg) & mask18
-
-#  3 Store Q
-def storeQ (addr):
-    store[addr] = qReg >> 1
-
-#  4 Load A
-def loadA (addr):
-    global aReg
-    aReg = store[addr]
-
-#  5 Store A
-
-def storeALevel1 (addr):
-    global store
-    if 8180 <= addr <= 8191: # need this for FORTRAN to work
-        trace('write to initial instructions ignored')
-        return
-    store[addr] = aReg
-
-def storeALevel4 (addr):
-    global store
-    store[addr] = aReg
-
-#  6 Collate
-def collate (addr):
-    global aReg
-    aReg &= store[addr]
-
-#  7 Jump if zero
-def jumpZ (addr):
-    global store
-    if aReg == 0:
-        store[scr] = addr
-
-#  8 Jump unconditional
-def jump (addr):
-    global store
-    store[scr] = addr
-
-#  9 Jump negative
-def jumpN (addr):
-    global store
-    if aReg >= bit18:
-        store[scr] = addr
-
-# 10 Count in store
-def count (addr):
-    global store
-    store[addr] = (store[addr] + 1) & mask18
-
-# 11 Store S
-def storeS (addr):
-    global qReg, store
-    s = store[scr]
-    qReg = s & modMask
-    store[addr] = s & addrMask
-
-# def aqShiftR ():
-#     global aReg, qReg
-#     qReg = (qReg >> 1) | (bit18 if aReg & 1 == 1 else 0)
-#     aReg = (aReg >> 1) | (bit18 if aReg >= bit18 else 0)
-#
-#
-# def aqShiftL ():
-#     global aReg, qReg
-#     aReg = ((aReg << 1) | (1 if qReg >= bit18 else 0)) & mask18
-#     qReg = (qReg << 1) & mask18
-
-# 12 Multiply - n.b. depends on Python multi-length arithmetic to handle 36 bit AQ
-def multiply (addr):
-    global aReg, qReg
-    a = normal(aReg)
-    intprod = (a * normal(store[addr]))
-    qReg = (intprod <<  1) & mask18
-    # set bit 1 of Q to make X3 happy - spec says "undefined".
-    if a<0:
-        qReg = qReg | 1
-    aReg = (intprod >> 17) & mask18
-
-# 12 Multiply: simulate microcode
-# def multiply (addr):
-#     global aReg, qReg
-#     m = store[addr]
-#     for processCounter in range(1, 19):
-#         if processCounter == 1:
-#             qReg  = aReg
-#             aReg  = 0
-#             xbits = qReg << 1
-#         else:
-#             xbits = qReg
-#             aqShiftR()
-#         xbits &= 3
-#         if xbits == 1:
-#             aReg = (aReg + m) & mask18
-#         elif xbits == 2:
-#             aReg = (aReg - m) & mask18
-#         if m == bit18 & aReg != 0:
-#             correct for using 18 bits where hardware uses 19 bits
-#             aReg = bit19 - aReg
-
-# 13 Divide
-def divide(addr):
-	global aReg, qReg
-	aq = (normal(aReg) << 18) | qReg
-	m  = normal(store[addr])
-	intquot = ((aq // m) >> 1) & mask18
-	aReg = intquot | 1
-	qReg = intquot & 0o777776
-
-# 13 Divide: simulate microcode
-# def divideMC (addr):
-#     global aReg, qReg
-#     m = store[addr]
-#     qReg = qReg & 0o777776
-#     xbits = aReg
-#     for processCounter in range (1, 19):
-#         if (xbits >= bit18) == (m >= bit18):
-#             qReg += 1
-#             aReg = (aReg - m) & mask18
-#         else:
-#             aReg = (aReg + m) & mask18
-#         xbits = aReg
-#         aqShiftL()
-#     aReg = qReg + 1
-
-# 14 Shift, etc - n.b. depends on Python multi-length arithmetic to handle 36 bit AQ
-def shift (addr):
-    global aReg, qReg
-    places = addr & addrMask
-    aq = (aReg << 18) | qReg
-    if places <= 2047:
-        aq = aq << places
-        aReg = (aq >> 18) & mask18
-        qReg = aq & mask18
-    elif places >= 6144:
-        places = 8192-places
-        aq = ((normal(aReg) << 18) | qReg) >> places
-        aReg = (aq >> 18) & mask18
-        qReg = aq & mask18
-    else:
-        failure('unsupported i/o 14 %4d' & places, otherStop)
-
-# 15 Input/output etc
-def inOut (addr):
-    global aReg, level, scr, bReg, putStore, functionDict
-    opAddr = addr & addrMask
-    if opAddr == 7168:
-        # Level terminate
-        level = 4
-        scr = sLevel4
-        bReg = bLevel4
-        functionDict[5] = storeALevel4
-    elif opAddr == 2048:
-        byte = readTape()
-        aReg = ((aReg << 7) | byte) & mask18
-    elif opAddr == 2052:
-        byte = readTTYIn()
-        aReg = ((aReg << 7) | byte) & mask18
-    elif opAddr == 6144:
-        punchTape(aReg & 255)
-    elif opAddr == 6148:
-        writeTTY(aReg & 255)
+            position = tapeIdentity(tape)
+            position['offset'] = offset
+            with open(positionPath(path), 'w') as f:
+                json.dump(position, f)
+        except:
+            halted('cannot save position of %s in %s' %
+                   (what, positionPath(path)))
+            return otherStop
+    return None
+
+def removePosition (path):
+    if os.path.exists(positionPath(path)):
+        os.remove(positionPath(path))
+
+def loadPosition (path):
+    # (tape, offset) left in the reader for default input file path: the
+    # tape recorded in path.pos unless path has been replaced since
+    try:
+        with open(positionPath(path)) as f:
+            position = json.load(f)
+        offset = position.pop('offset')
+        if tapeIdentity(position['path']) != position:
+            return (path, 0) # tape changed
+        if os.path.abspath(path) != position['path'] and \
+           os.path.exists(path) and \
+           os.stat(path).st_mtime_ns >= \
+           os.stat(positionPath(path)).st_mtime_ns:
+            return (path, 0) # a new tape put in the reader
+        return (position['path'], offset)
+    except (OSError, ValueError, KeyError):
+        return (path, 0)
+
+def saveASCII (punchPath):
+    try:
+        if os.path.exists(punchPath):
+            telecode.decodeFile(punchPath, asciiDefault)
+        else:
+            open(asciiDefault, 'w').close()
+    except (OSError, UnicodeError):
+        halted('cannot convert %s to %s' % (punchPath, asciiDefault))
+        return otherStop
+    return None
+
+def finish (machine, code):
+    machine.saveStore(storePath, textStore)
+    machine.close() # close tracing and punch to ensure written to file
+    if asciiOut:
+        code = saveASCII(machine.ptpPath) or code
+    if textIn and not readerFile:
+        code = saveRemainder(machine.readerRemainder(), ptrDefault,
+                             'paper tape') or code
+        removePosition(ptrDefault)
+    if readerFile:
+        code = saveRemainder(machine.readerRemainder(), ptrDefault,
+                             'paper tape') or code
+        code = saveRemainder(machine.ttyInRemainder(), ttyInDefault,
+                             'teletype input') or code
+        if not (machine.ptrBuf is None):
+            removePosition(ptrDefault)
+        if not (machine.ttyInBuf is None):
+            removePosition(ttyInDefault)
     else:
-        failure('Unsupported i/o 15 %4d' % opAddr, otherStop)
-
-# Set up function code mapping to functions
-functionDict = {  0: loadB,     1: add,           2: negAdd,   3: storeQ,
-                  4: loadA,     5: storeALevel1,  6: collate,  7: jumpZ,
-                  8: jump,      9: jumpN,        10: count,   11: storeS,
-                 12: multiply, 13: divide,       14: shift,   15: inOut}
-
-# Instruction fetch and decode
-
-lastS = 0  # detect a dynmaic stop if SCR isn't changed
-
-limit = 200000000 # about one hundred hours of computation
-
-def decode ():
-    global lastS, limit, scr
-    # instruction fetch, decode and execute loop
-    while limit > 0: # break out on a dynamic stop
-        limit -= 1
-        # Update SCR
-        lastS = store[scr]
-        store[scr] += 1
-        # Fetch instruction and break out fields
-        instruction = store[lastS]
-        f = (instruction >> 13) & 15
-        a = (instruction & addrMask) | (lastS & modMask)
-        m = ((a + store[bReg]) if instruction >= bit18 else a) & mask16
-        trace('%d %d %d %d %d' % (lastS, instruction, aReg, qReg, store[bReg]))
-        functionDict[f](m)
-        if store[scr] == lastS:
-            msg = 'Dynamic stop at %d' % store[scr]
-            trace(msg)
-            #print('\n', msg, sep='')
-            return dynStop
-    msg = 'execution limit reached'
-    trace(msg)
-    failure(msg, limitStop)
-
-jumpAddr = 8181 # default to running initial orders
+        code = savePosition(machine.ptrBuf, machine.ptrPath, machine.ptrIdx,
+                            ptrDefault, 'paper tape') or code
+        code = savePosition(machine.ttyInBuf, machine.ttyInPath,
+                            machine.ttyInIdx, ttyInDefault,
+                            'teletype input') or code
+    sys.exit(code)
+
+class RunStats:
+    # statistics of the run of machine, from when created
+
+    def __init__ (self, machine, path=''):
+        self.machine = machine
+        self.path    = path # for JSON, '' for none
+        self.started = time.perf_counter()
+        self.before  = machine.instructions
+
+    def report (self, code=None):
+        # statistics as a dictionary, code being the exit code if the run
+        # has stopped
+        machine = self.machine
+        seconds = time.perf_counter() - self.started
+        run     = machine.instructions - self.before
+        report  = {'exit': code,
+                   'reason': (None if code is None else
+                              stopReasons.get(code, 'error')),
+                   'message': machine.message,
+                   'wallTime': seconds, 'run': run,
+                   'instructionsPerSecond': run / seconds if seconds else 0.0}
+        report.update(machine.stats())
+        return report
+
+    def write (self, code=None):
+        # write the report to path, replacing it whole
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(self.report(code), f, indent=1)
+            f.write('\n')
+        os.replace(self.path + '.tmp', self.path)
+
+    def sample (self, machine):
+        # monitor for machine.setMonitor()
+        self.write()
+
+def printStats (stats):
+    for key in stats:
+        value = stats[key]
+        if isinstance(value, dict):
+            printStats({key + '.' + name: value[name] for name in value})
+        elif isinstance(value, list):
+            printStats({'%s[%d]' % (key, i): value[i]
+                        for i in range(len(value))})
+        elif isinstance(value, float):
+            print('%-16s %12.4f' % (key, value), file=sys.stderr)
+        elif isinstance(value, int):
+            print('%-16s %12d' % (key, value), file=sys.stderr)
+        elif not (value is None):
+            print('%-16s %s' % (key, value), file=sys.stderr)
+
+def reportStats (args, runStats, code):
+    if args.stats:
+        printStats(runStats.report(code))
+    if args.statsJSON != '':
+        runStats.write(code)
 
 # Decode parameters
-def getArgs():
-    global ptrPath, ptpPath, ttyInPath, jumpAddr, limit
+def getArgs(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('-ptin',  help='paper tape input file path',
                         default='')
+    parser.add_argument('-textin', help='paper tape input text file path',
+                        default='')
+    parser.add_argument('-ascii', help='write punch output as text to .ascii',
+                        action="store_true")
     parser.add_argument('-ttyin',  help='teleprinter input file path',
                         default='')
     parser.add_argument('-ptout', help='paper tape output file path',
@@ -498,45 +335,250 @@ def getArgs():
     parser.add_argument('-jump', help='start address', default='')
     parser.add_argument('-trace',help='turn on tracing to .trace',
                         action="store_true")
+    parser.add_argument('-texttrace', help='write .trace as text',
+                        action="store_true")
+    parser.add_argument('-trace-ring', dest='traceRing', type=int, default=0,
+                        help='trace only the last TRACERING records')
+    parser.add_argument('-trace-range', dest='traceRange', type=int,
+                        nargs=2, metavar=('LOW', 'HIGH'),
+                        help='trace only addresses LOW to HIGH')
+    parser.add_argument('-trace-after', dest='traceAfter', type=int,
+                        default=0, help='start trace after N instructions')
+    parser.add_argument('-trace-at', dest='traceAt', type=int,
+                        help='start trace on first execution of an address')
+    parser.add_argument('-trace-count', dest='traceCount', type=int,
+                        default=0, help='stop trace after M instructions')
+    parser.add_argument('-trace-every', dest='traceEvery', type=int,
+                        default=1, help='trace every Kth instruction')
+    parser.add_argument('-profile', help='write a profile to .profile',
+                        action="store_true")
+    parser.add_argument('-profile-json', dest='profileJSON', default='',
+                        help='write the profile as JSON to a file')
+    parser.add_argument('-linebuffer', help='write teleprinter output a '
+                        'line at a time', action="store_true")
+    parser.add_argument('-readerfile', help='leave unconsumed input in '
+                        '.reader and .ttyin', action="store_true")
     parser.add_argument('-limit', help='instruction execution limit',
                         type=int)
-    args = parser.parse_args()
-    if args.ptin != '':
-        ptrPath = args.ptin
-    if args.ttyin != '':
-        ttyInPath = args.ttyin
-    if args.ptout != '':
-        ptpPath = args.ptout
+    parser.add_argument('-checkpoint', type=int, default=0,
+                        help='write .checkpoint every N instructions')
+    parser.add_argument('-resume', help='carry on from .checkpoint',
+                        action="store_true")
+    parser.add_argument('-slowload', help='simulate loading binary tapes',
+                        action="store_true")
+    parser.add_argument('-verifyload', help='check loading binary tapes '
+                        'against simulation', action="store_true")
+    parser.add_argument('-debug', help='run under the debugger',
+                        action="store_true")
+    parser.add_argument('-undo', type=int, default=0,
+                        help='keep the last N instructions to undo in -debug')
+    parser.add_argument('-stats', help='print run statistics on stderr',
+                        action="store_true")
+    parser.add_argument('-stats-json', dest='statsJSON', default='',
+                        help='write run statistics as JSON to a file')
+    parser.add_argument('-stats-every', dest='statsEvery', type=int,
+                        default=0, help='rewrite the -stats-json file every '
+                        'N instructions')
+    parser.add_argument('-textstore', help='write .store as text',
+                        action="store_true")
+    parser.add_argument('-snapshot-cache', dest='snapshotCache',
+                        help='directory of snapshots of earlier runs',
+                        default='')
+    parser.add_argument('-snapshot-size', dest='snapshotSize', type=int,
+                        help='snapshot cache size bound in megabytes',
+                        default=snapshot.defaultMaxBytes // (1024*1024))
+    args = parser.parse_args(argv)
     if args.jump != '':
         addr = int(args.jump)
-        if 8 <= addr <= 8181:
-            jumpAddr = addr
-        else:
-            failure('start address must be in range 8-8181', otherStop)
-    if args.trace:
-        startTracing()
-    if args.limit:
-        if args.limit < 1:
-            failure('nonsensical limit - %d', args.limit, otherStop)
-        else:
-            limit = args.limit
-
-# main program
-getArgs()                        # get and decode command line arguments
-readStoreFromFile()              # reload store from previous run, if available
-if jumpAddr == 8181:
-    establishInitialInstructions ()  # set up initial instructions
-store[scr] = jumpAddr                # initialise sequence control register
-#startTime = time.time()
-res = decode()                   # run instruction fetch decode loop
-#stopTime = time.time()
-#print('Execution time', stopTime-startTime, 'secs')
-finish (res)
-
-
-
-
-
-
-
+        if not (8 <= addr <= 8181):
+            halted('start address must be in range 8-8181')
+            sys.exit(otherStop)
+    if args.traceRing < 0:
+        halted('nonsensical trace ring size - %d' % args.traceRing)
+        sys.exit(otherStop)
+    if args.debug and not (machineSource is None):
+        halted('cannot debug through 900serve.py')
+        sys.exit(otherStop)
+    if args.undo < 0 or (args.undo > 0 and not args.debug):
+        halted('-undo needs -debug and a positive count')
+        sys.exit(otherStop)
+    if args.statsEvery < 0 or (args.statsEvery > 0 and args.statsJSON == ''):
+        halted('-stats-every needs -stats-json and a positive count')
+        sys.exit(otherStop)
+    if args.traceRing > 0 and args.texttrace:
+        halted('a trace ring is written in binary')
+        sys.exit(otherStop)
+    if args.traceAfter < 0 or args.traceCount < 0 or args.traceEvery < 1:
+        halted('nonsensical trace trigger')
+        sys.exit(otherStop)
+    if args.limit is not None and args.limit < 1:
+        halted('nonsensical limit - %d' % args.limit)
+        sys.exit(otherStop)
+    if args.checkpoint < 0:
+        halted('nonsensical checkpoint interval - %d' % args.checkpoint)
+        sys.exit(otherStop)
+    if args.ptin != '' and args.textin != '':
+        halted('-ptin and -textin are alternatives')
+        sys.exit(otherStop)
+    if args.resume and (args.jump != '' or args.ptin != '' or
+                        args.textin != '' or
+                        args.ttyin != '' or args.ptout != ''):
+        halted('-resume takes the start address and tapes from .checkpoint')
+        sys.exit(otherStop)
+    return args
+
+def writeProfile (machine, jsonPath):
+    profile = machine.profile
+    try:
+        with open(profileDefault, 'w') as f:
+            profile.report(machine.store, f)
+        if jsonPath != '':
+            with open(jsonPath, 'w') as f:
+                json.dump(profile.asJSON(machine.store), f, indent=1)
+    except OSError as e:
+        halted('cannot write profile - %s' % e)
+
+def getTrigger (args):
+    # a TraceTrigger if any trigger option is given, otherwise None
+    if args.traceRange is None and args.traceAfter == 0 and \
+       args.traceAt is None and args.traceCount == 0 and args.traceEvery == 1:
+        return None
+    low, high = (0, sim900.maxStore-1) if args.traceRange is None \
+                else args.traceRange
+    return sim900.TraceTrigger(low, high, args.traceAfter, args.traceAt,
+                               args.traceCount, args.traceEvery)
+
+resumeLimit = 0 # instructions left to run when checkpointed
+
+def attachTapes (machine, args):
+    if args.ptin != '':
+        machine.attachReader(args.ptin)
+    elif args.textin != '':
+        try:
+            with open(args.textin, 'r', encoding='utf-8-sig') as f:
+                machine.attachReader(data=telecode.toTelecode(f.read()))
+        except (OSError, UnicodeError):
+            halted('cannot read text input file ' + args.textin)
+            sys.exit(otherStop)
+    elif readerFile:
+        machine.attachReader(ptrDefault)
+    else:
+        tape, offset = loadPosition(ptrDefault)
+        machine.attachReader(tape, offset=offset)
+    if args.ttyin != '':
+        machine.attachTTYIn(args.ttyin)
+    elif readerFile:
+        machine.attachTTYIn(ttyInDefault)
+    else:
+        tape, offset = loadPosition(ttyInDefault)
+        machine.attachTTYIn(tape, offset=offset)
+    machine.attachPunch(args.ptout if args.ptout != '' else ptpDefault)
 
+def resume (machine):
+    global resumeLimit
+    try:
+        resumeLimit = checkpoint.load(machine, checkpoint.defaultPath)
+    except sim900.MachineStop as stop:
+        halted(stop.msg)
+        sys.exit(stop.code)
+
+def fastLoad (machine, limit, verify):
+    # load a binary tape, returns the exit code or None if the machine is
+    # to be run on
+    if not verify:
+        return fastload.load(machine, limit)[0]
+    res, decoded, differences = fastload.verify(machine, limit)
+    if len(differences) != 0:
+        for difference in differences:
+            print(difference, file=sys.stderr)
+        halted('fast load differs from simulation')
+        sys.exit(otherStop)
+    print('fast load verified, %d of %d instructions decoded' %
+          (decoded, machine.instructions), file=sys.stderr)
+    return res
+
+def main (argv=None):
+    global textStore, readerFile, textIn, asciiOut, stopRequest
+    args = getArgs(argv)              # get and decode command line arguments
+    stopRequest = False
+    textStore  = args.textstore
+    readerFile = args.readerfile
+    textIn     = args.textin != ''
+    asciiOut   = args.ascii
+    machine = newMachine()            # reload store from previous run
+    loading = False
+    if args.resume:
+        resume(machine)               # registers and tapes as checkpointed
+    else:
+        attachTapes(machine, args)
+        jumpAddr = int(args.jump) if args.jump != '' else 8181
+        loading = jumpAddr == 8181
+        if loading:
+            machine.establishInitialInstructions() # set up initial orders
+        machine.start(jumpAddr)       # initialise sequence control register
+    machine.lineBuffered = args.linebuffer
+    limit = args.limit if args.limit else sim900.defaultLimit
+    if args.resume and not args.limit:
+        limit = resumeLimit           # what was left when checkpointed
+    trigger = getTrigger(args)
+    tracing = args.trace or args.texttrace or args.traceRing > 0 or \
+              not (trigger is None)
+    profiling = args.profile or args.profileJSON != ''
+    if tracing and profiling:
+        halted('cannot trace and profile together')
+        sys.exit(otherStop)
+    if args.debug and (tracing or profiling or args.snapshotCache != ''):
+        halted('cannot debug and trace, profile or use snapshots')
+        sys.exit(otherStop)
+    if profiling:
+        machine.profile = profiler.Profile()
+    try:
+        if tracing:
+            machine.startTracing(traceDefault, args.texttrace, args.traceRing,
+                                 trigger)
+    except sim900.MachineStop as stop:
+        halted(stop.msg)
+        finish(machine, stop.code)
+    runStats = RunStats(machine, args.statsJSON)
+    if args.statsEvery > 0:
+        machine.setMonitor(runStats.sample, args.statsEvery)
+    if args.snapshotCache != '' and not (tracing or profiling):
+        cache = snapshot.SnapshotCache(args.snapshotCache,
+                                       args.snapshotSize * 1024*1024)
+        res = snapshot.run(cache, machine, limit) # or replay an earlier run
+    else:
+        # run instruction fetch decode loop, in slices so as to checkpoint
+        signal.signal(signal.SIGINT, requestStop)
+        signal.signal(signal.SIGTERM, requestStop)
+        res = None
+        if loading and not (tracing or profiling or args.slowload or
+                            args.debug) and args.checkpoint == 0:
+            before = machine.instructions
+            res = fastLoad(machine, limit, args.verifyload)
+            limit -= machine.instructions - before
+        if args.debug:
+            if args.undo > 0:
+                machine.undoLog = undolog.UndoLog(args.undo)
+            debug = debugger.Debugger(machine, limit)
+            res = debug.run()
+            if res is None: # quit with the machine still running
+                checkpoint.save(machine, checkpoint.defaultPath, debug.left)
+        elif res is None:
+            res = checkpoint.run(machine, limit, checkpoint.defaultPath,
+                                 args.checkpoint, stopRequested)
+        if res is None:
+            halted('stopped, state saved in ' + checkpoint.defaultPath)
+            reportStats(args, runStats, checkpointStop)
+            finish(machine, checkpointStop)
+        if (args.resume or args.checkpoint > 0) and \
+           os.path.exists(checkpoint.defaultPath):
+            os.remove(checkpoint.defaultPath) # run complete
+    if res != dynStop:
+        halted(machine.message)
+    if profiling:
+        writeProfile(machine, args.profileJSON)
+    reportStats(args, runStats, res)
+    finish(machine, res)
+
+if __name__ == '__main__':
+    main()
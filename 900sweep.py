@@ -0,0 +1,77 @@
+# Run a program over many data tapes - Andrew Herbert - 18/10/2026
+
+# Usage: python3 900sweep.py -jump ADDR TAPE ...
+#
+# Runs the program in .store (or -store FILE) from ADDR once for each TAPE
+# in the paper tape reader, as a parameter sweep.  The runs are made in
+# lockstep with NumPy if it is installed (see lockstep.py), otherwise one
+# after another; -scalar forces the latter.  -ttyin FILE gives every run
+# the same teletype input.  A summary of each run is printed on stderr and
+# -json FILE writes a record of every run to FILE, the teleprinter output
+# as text and the punch output as base64 and as text.  The exit code is the
+# largest of the runs' exit codes.
+
+import sys
+import json
+import time
+import base64
+import argparse
+
+import sim900
+import lockstep
+import telecode
+
+def getArgs ():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('tapes', help='paper tape input for each run',
+                        nargs='+')
+    parser.add_argument('-jump', help='start address', type=int,
+                        required=True)
+    parser.add_argument('-store', help='store to start from',
+                        default='.store')
+    parser.add_argument('-ttyin', help='teleprinter input file path',
+                        default='')
+    parser.add_argument('-limit', help='instruction limit for each run',
+                        type=int, default=sim900.defaultLimit)
+    parser.add_argument('-scalar', help='run one machine at a time',
+                        action='store_true')
+    parser.add_argument('-json', help='file to write run records to',
+                        default='')
+    return parser.parse_args()
+
+def readFile (path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def main ():
+    args = getArgs()
+    machine = sim900.Machine()
+    machine.loadStore(args.store)
+    readers = [readFile(path) for path in args.tapes]
+    ttyIn = b'' if args.ttyin == '' else readFile(args.ttyin)
+    start = time.time()
+    records = lockstep.sweep(machine.store, args.jump, readers,
+                             [ttyIn] * len(readers), args.limit,
+                             vector=not args.scalar)
+    seconds = time.time() - start
+    instructions = 0
+    for path, record in zip(args.tapes, records):
+        record['tape'] = path
+        instructions += record['instructions']
+        print('%-30s %12d instructions  exit %d  %s' %
+              (path, record['instructions'], record['code'],
+               record['message']), file=sys.stderr)
+    print('%d runs, %d instructions in %.3fs, %.0f instructions/second%s' %
+          (len(records), instructions, seconds, instructions / seconds,
+           '' if args.scalar or not lockstep.available() else ', lockstep'),
+          file=sys.stderr)
+    if args.json != '':
+        for record in records:
+            punch = record['punch']
+            record['ascii'] = telecode.fromTelecode(punch)
+            record['punch'] = base64.b64encode(punch).decode('ascii')
+        with open(args.json, 'w') as f:
+            json.dump(records, f, indent=1)
+    sys.exit(max(record['code'] for record in records))
+
+main()
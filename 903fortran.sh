@@ -1,18 +1,19 @@
 #!/bin/sh
+SIM=${SIM900:-python3 900sim.py} # or "python3 900client.py", see 900serve.py
 rm -f .reader .punch .ascii .save
 #echo loading SIR assembler
-python3 900sim.py -ptin sir(iss6)(5500)
+$SIM -ptin sir(iss6)(5500)
 #echo convert input tape $1
 python3 to900text.py src/903sir/$1.txt
 #echo read in program
-python3 900sim.py -jump 8
+$SIM -jump 8
 if [ $? != 0 ]
 then exit $?
 fi
 #echo load data tape
 cp .save .reader
 #echo run program
-python3 900sim.py -jump 32
+$SIM -jump 32
 #check for punch output
 touch .punch
 python3 from900text.py
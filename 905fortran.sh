@@ -1,4 +1,5 @@
 #!/bin/sh
+SIM=${SIM900:-python3 900sim.py} # or "python3 900client.py", see 900serve.py
 rm -rf .reader .punch .reverse .save .ascii
 #echo
 echo
@@ -6,11 +7,11 @@ echo "***"
 echo "*** Loading 905 FORTRAN compiler and reading source code tape."
 echo "*** Outputs a relocatable binary tape and halts."
 echo "***"
-python3 900sim.py -ptin 905fortran_iss6
+$SIM -ptin 905fortran_iss6
 #echo convert input tape $1
 python3 to900text.py src/905fortran/$1
 #echo compile program
-python3 900sim.py -jump 16 -ttyin src/905fortran/O0R
+$SIM -jump 16 -ttyin src/905fortran/O0R -readerfile
 echo
 echo "***"
 echo "*** Compilation complete - now loading binary using \"900 LINKER\"."
@@ -20,14 +21,14 @@ mv .reader .save
 #echo reverse output
 python3 reverse.py
 #echo load loader
-python3 900sim.py -ptin loader_iss3
+$SIM -ptin loader_iss3
 #echo load program binary
-python3 900sim.py -ptin .reverse -jump 16 -ttyin src/905fortran/O20L
+$SIM -ptin .reverse -jump 16 -ttyin src/905fortran/O20L
 echo
 echo "***"
 echo "*** Now loading FORTRAN library routines."
 echo "***"
-python3 900sim.py -ptin 905fortlib -jump 16 -ttyin src/905fortran/O3L
+$SIM -ptin 905fortlib -jump 16 -ttyin src/905fortran/O3L
 #echo complete load and run
 echo
 echo "***"
@@ -36,7 +37,7 @@ echo "***"
 # clear punch
 rm .punch
 touch .punch
-python3 900sim.py -jump 16 -ttyin src/905fortran/MM -ptin .save
+$SIM -jump 16 -ttyin src/905fortran/MM -ptin .save
 echo
 echo "***"
 echo "*** Program run complete."
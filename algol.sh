@@ -1,18 +1,19 @@
 #!/bin/sh
+SIM=${SIM900:-python3 900sim.py} # or "python3 900client.py", see 900serve.py
 rm -f .reader .punch .ascii
 #echo loading Algol
-python3 900sim.py -ptin alg16klg_masd
+$SIM -ptin alg16klg_masd
 #echo convert input tape
 python3 to900text.py src/algol/$1
 #echo run translator
-python3 900sim.py -jump 8
+$SIM -jump 8
 if [ $? != 0 ]
 then exit $?
 fi
 echo 
 echo
 #echo run interpreter
-python3 900sim.py -jump 10
+$SIM -jump 10
 touch .punch
 python3 from900text.py
 if  [ ! -s .ascii ]
@@ -0,0 +1,79 @@
+# Batch compile and run farm - Andrew Herbert - 18/10/2026
+
+# Runs many source programs through one language system.  The language
+# system is loaded once, then worker processes are forked that inherit the
+# loaded machine copy-on-write.  Each job runs in its own machine state with
+# its teleprinter and punch output kept in memory, so jobs cannot interfere
+# with each other through .reader, .store or .punch and all cores can be
+# used.  Each job yields a record:
+#
+#   source        source file path
+#   code          exit code of the last step, as 900sim.py would return
+#   message       reason the last step stopped, None for a dynamic stop
+#   tty           teleprinter output
+#   punch         punch output, bytes
+#   instructions  instructions executed by the job, excluding the load
+#   seconds       elapsed time of the job
+#   timings       (step, seconds, instructions, exit code) for each step
+
+import io
+import os
+import time
+import multiprocessing
+from array import array
+
+import sim900
+import pipeline
+
+template = None # loaded job inherited by the workers
+image    = None # its store as loaded, restored for each job
+
+def loadTemplate (language, limit=sim900.defaultLimit):
+    # run the first step of the language, loading its system tape
+    job = pipeline.Job(io.StringIO(), limit)
+    name = pipeline.systems[language]
+    job.load(name)
+    job.preloaded = name
+    return job
+
+def runOne (language, source):
+    # run one job starting from the template, in this process
+    machine = template.machine
+    machine.setStore(image)
+    job = pipeline.Job(io.StringIO(), template.limit, machine=machine)
+    job.reader    = template.reader
+    job.ttyIn     = template.ttyIn
+    job.punch     = template.punch
+    job.code      = template.code
+    job.preloaded = template.preloaded
+    job.loadOutput = template.out.getvalue()
+    start  = time.time()
+    before = machine.instructions
+    try:
+        pipeline.languages[language](job, pipeline.sourcePath(language,
+                                                              source))
+    except Exception as e: # a job must not bring down the batch
+        job.code = sim900.otherStop
+        machine.message = 'simulator error - %r' % e
+    return {'source': source, 'code': job.code,
+            'message': machine.message, 'tty': job.out.getvalue(),
+            'punch': b'' if job.punch is None else job.punch,
+            'instructions': machine.instructions - before,
+            'seconds': time.time() - start, 'timings': job.timings}
+
+def work (task):
+    return runOne(*task)
+
+def runBatch (language, sources, workers=None, limit=sim900.defaultLimit):
+    # run each of sources, returns their records in the same order
+    global template, image
+    template = loadTemplate(language, limit)
+    image    = array('i', template.machine.store)
+    tasks = [(language, source) for source in sources]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1 or not ('fork' in multiprocessing.get_all_start_methods()):
+        return [work(task) for task in tasks]
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        return pool.map(work, tasks, chunksize=1)
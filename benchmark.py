@@ -0,0 +1,182 @@
+# Benchmark and regression suite - Andrew Herbert - 18/10/2026
+
+# Usage: python3 benchmark.py [NAME ...] [-json FILE] [-compare FILE]
+#                             [-repeat N] [-update]
+#
+# Runs X3 and every sample program in src/algol, src/903fortran,
+# src/903sir and src/905fortran through its pipeline (see pipeline.py),
+# each job in a process of its own.  For each job it reports the wall time,
+# the instructions simulated, instructions per second and peak resident
+# set size, and checks the teleprinter and punch output against the golden
+# copies in golden/<suite>/<name>.tty and .punch.  NAMEs, e.g. algol/primes
+# or just algol, restrict the jobs run.
+#
+# -json FILE writes the results to FILE for tracking performance across
+# versions of the simulator, -compare FILE reports the speed of each job
+# relative to such an earlier file.  -repeat N runs each job N times and
+# keeps the fastest.  -update replaces the golden copies with the output
+# of this run, to be used only when a change of output is intended.
+#
+# The exit code is 0 if every job's output matched, 1 otherwise.
+
+import io
+import os
+import sys
+import json
+import time
+import base64
+import platform
+import argparse
+import subprocess
+
+import pipeline
+
+goldenDir = os.path.join(pipeline.systemDir, 'golden')
+
+x3Limit = 6823740 # as in x3.sh
+
+def x3 (job, source):
+    # as x3.sh
+    job.simulate(ptin=pipeline.readFile(source))          # load X3
+    job.limit = x3Limit
+    job.simulate(jump=8)                                  # run the tests
+    return job.code
+
+suites = {'x3': x3, 'algol': pipeline.algol, '903fortran': pipeline.fortran903,
+          '903sir': pipeline.sir, '905fortran': pipeline.fortran905}
+
+def sources (suite):
+    # the source paths of the jobs in suite
+    if suite == 'x3':
+        return [pipeline.systemPath('x3_iss4')]
+    folder = pipeline.systemPath(os.path.join('src', suite))
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+                                       if name.endswith('.txt')]
+
+def jobName (suite, path):
+    return suite + '/' + os.path.splitext(os.path.basename(path))[0]
+
+def allJobs (names):
+    # (suite, source path) of each job, restricted to names if any given
+    jobs = []
+    for suite in suites:
+        for path in sources(suite):
+            name = jobName(suite, path)
+            if names == [] or name in names or suite in names:
+                jobs.append((suite, path))
+    return jobs
+
+def peakRSS ():
+    # peak resident set size of this process in kilobytes
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def runJob (suite, path):
+    # run one job in this process, returning its record
+    out = io.StringIO()
+    job = pipeline.Job(out)
+    start = time.perf_counter()
+    suites[suite](job, path)
+    seconds = time.perf_counter() - start
+    punch = b'' if job.punch is None else job.punch
+    return {'name': jobName(suite, path), 'code': job.code,
+            'seconds': seconds, 'instructions': job.machine.instructions,
+            'maxRSS': peakRSS(), 'tty': out.getvalue(),
+            'punch': base64.b64encode(punch).decode('ascii')}
+
+def runChild (suite, path):
+    # run one job in a new process, so its time and memory are its own
+    result = subprocess.run([sys.executable, os.path.abspath(__file__),
+                             '-job', suite, path],
+                            stdout=subprocess.PIPE, check=True)
+    return json.loads(result.stdout)
+
+def goldenPaths (name):
+    base = os.path.join(goldenDir, name)
+    return (base + '.tty', base + '.punch')
+
+def readGolden (path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+def check (record, update):
+    # compare a job's output with the golden copies, or replace them
+    ttyPath, punchPath = goldenPaths(record['name'])
+    tty   = record['tty'].encode('ascii')
+    punch = base64.b64decode(record['punch'])
+    if update:
+        os.makedirs(os.path.dirname(ttyPath), exist_ok=True)
+        for path, data in ((ttyPath, tty), (punchPath, punch)):
+            with open(path, 'wb') as f:
+                f.write(data)
+    record['ttyOK']   = readGolden(ttyPath) == tty
+    record['punchOK'] = readGolden(punchPath) == punch
+
+def getArgs ():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('names', nargs='*',
+                        help='jobs to run, e.g. algol/primes or algol')
+    parser.add_argument('-json', help='file to write results to',
+                        default='')
+    parser.add_argument('-compare', help='earlier results to compare with',
+                        default='')
+    parser.add_argument('-repeat', help='runs of each job, fastest kept',
+                        type=int, default=1)
+    parser.add_argument('-update', help='replace the golden output',
+                        action='store_true')
+    parser.add_argument('-job', nargs=2, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main ():
+    args = getArgs()
+    if not (args.job is None):
+        # child process running a single job
+        json.dump(runJob(*args.job), sys.stdout)
+        return
+    earlier = {}
+    if args.compare != '':
+        with open(args.compare) as f:
+            earlier = {r['name']: r for r in json.load(f)['jobs']}
+    jobs = allJobs(args.names)
+    if jobs == []:
+        print('no such jobs', file=sys.stderr)
+        sys.exit(1)
+    records = []
+    print('%-26s %8s %12s %10s %8s  %s' %
+          ('job', 'seconds', 'instructions', 'ins/sec', 'RSS KB', 'output'))
+    for suite, path in jobs:
+        record = None
+        for i in range(max(args.repeat, 1)):
+            r = runChild(suite, path)
+            if record is None or r['seconds'] < record['seconds']:
+                record = r
+        check(record, args.update)
+        record['ips'] = record['instructions'] / record['seconds']
+        ok = record['ttyOK'] and record['punchOK']
+        line = '%-26s %8.3f %12d %10.0f %8d  %s' % \
+               (record['name'], record['seconds'], record['instructions'],
+                record['ips'], record['maxRSS'],
+                'ok' if ok else 'DIFFERS (%s)' %
+                ', '.join(what for what, same in (('tty', record['ttyOK']),
+                                                 ('punch', record['punchOK']))
+                          if not same))
+        if record['name'] in earlier:
+            line += '  %.2fx' % (earlier[record['name']]['seconds'] /
+                                 record['seconds'])
+        print(line)
+        del record['tty'], record['punch']
+        records.append(record)
+    total = sum(r['seconds'] for r in records)
+    print('%-26s %8.3f' % ('total', total))
+    if args.json != '':
+        with open(args.json, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'seconds': total, 'jobs': records}, f, indent=1)
+    sys.exit(0 if all(r['ttyOK'] and r['punchOK'] for r in records) else 1)
+
+main()
@@ -6,6 +6,8 @@
 import sys
 import argparse
 
+import telecode
+
 def getArgs ():
     parser = argparse.ArgumentParser()
     parser.add_argument('input')
@@ -13,12 +15,9 @@ def getArgs ():
     return args.input
 
 def printFile (path):
-    with open(path, 'rb') as f:
-        buf = f.read()
-    for i in range(len(buf)):
-        print('%4d' % buf[i], end='')
-        if i%10 == 9:
-            print()
+    # a whole number of lines at a time
+    for buf in telecode.readChunks(path, 10*64*1024):
+        sys.stdout.write(telecode.numberLines(buf))
 
 printFile(getArgs())
     
@@ -0,0 +1,154 @@
+# Checkpoint and resume - Andrew Herbert - 18/10/2026
+
+# .store only carries the store from one run of the simulator to the next.
+# A checkpoint holds everything needed to carry on a run part way through:
+# the store, A, Q, the interrupt level (and so which of store[0] or store[6]
+# is the SCR), the instructions executed and left to execute, the tapes in
+# the reader and teletype input and how far each has been read, and the
+# punch file and how much has been punched.  900sim.py -checkpoint N writes
+# one every N instructions, and on SIGINT or SIGTERM, and -resume carries
+# on from it.
+
+# A checkpoint is one file, written atomically, holding a line of JSON
+# describing the state followed by the store image (see storefile.py) and
+# the contents of any tapes held in memory rather than in files.  Tape
+# files are identified by size and modification time, and a checkpoint
+# refuses to resume if one has changed.
+
+# Translated blocks, decoded instructions, traces and profiles are not
+# part of the state, they are rebuilt or restarted on resuming.
+
+import os
+import sys
+import json
+import tempfile
+from array import array
+
+import storefile
+from sim900 import failure, otherStop
+
+defaultPath = '.checkpoint'
+version     = 1
+sliceSize   = 1 << 20 # instructions between checks for a stop request
+
+def tapeIdentity (path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size,
+            'mtime': st.st_mtime_ns}
+
+def tapeState (path, data, offset):
+    # (description, bytes to include) of an input tape
+    if not (path is None):
+        tape = {'path': os.path.abspath(path), 'offset': offset}
+        if not (data is None):
+            tape.update(tapeIdentity(path)) # has been read
+        return (tape, b'')
+    elif not (data is None):
+        return ({'path': None, 'offset': offset, 'bytes': len(data)},
+                bytes(data))
+    return (None, b'')
+
+def save (machine, path, limit):
+    # write a checkpoint of machine, with limit instructions left to run
+    image = storefile.imageBytes(machine.store)
+    state = machine.getState()
+    reader, readerData = tapeState(machine.ptrPath, machine.ptrBuf,
+                                   machine.ptrIdx)
+    ttyIn, ttyInData   = tapeState(machine.ttyInPath, machine.ttyInBuf,
+                                   machine.ttyInIdx)
+    punched = machine.punchPosition()
+    punchData = b''
+    if machine.ptpPath is None and not (punched is None):
+        punchData = machine.punchOutput()
+    state.update({'format': '900CHECKPOINT', 'version': version,
+                  'limit': limit, 'storeBytes': len(image),
+                  'reader': reader, 'ttyIn': ttyIn,
+                  'punch': {'path': None if machine.ptpPath is None
+                                    else os.path.abspath(machine.ptpPath),
+                            'offset': punched, 'bytes': len(punchData)}})
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(json.dumps(state).encode('ascii') + b'\n')
+        f.write(image)
+        f.write(readerData)
+        f.write(ttyInData)
+        f.write(punchData)
+    os.replace(temp, path)
+
+def restoreTape (tape, f, what):
+    # (path, data, offset) for attachReader() or attachTTYIn()
+    if tape is None:
+        return (None, None, 0)
+    if tape['path'] is None:
+        return (None, f.read(tape['bytes']), tape['offset'])
+    if 'size' in tape:
+        identity = {key: tape[key] for key in ('path', 'size', 'mtime')}
+        try:
+            changed = tapeIdentity(tape['path']) != identity
+        except OSError:
+            changed = True
+        if changed:
+            failure('%s %s changed since checkpoint' % (what, tape['path']),
+                    otherStop)
+    return (tape['path'], None, tape['offset'])
+
+def load (machine, path):
+    # put machine into the state recorded in the checkpoint at path,
+    # returning the number of instructions left to run
+    try:
+        with open(path, 'rb') as f:
+            state = json.loads(f.readline())
+            if state.get('format') != '900CHECKPOINT' or \
+               state.get('version') != version:
+                failure('%s is not a checkpoint' % path, otherStop)
+            store = array('i', f.read(state['storeBytes']))
+            reader = restoreTape(state['reader'], f, 'paper tape')
+            ttyIn  = restoreTape(state['ttyIn'], f, 'teletype input')
+            punch  = state['punch']
+            punchData = f.read(punch['bytes'])
+    except (OSError, ValueError, KeyError):
+        failure('cannot read checkpoint ' + path, otherStop)
+    if sys.byteorder == 'big':
+        store.byteswap()
+    machine.setStore(store)
+    machine.setState(state)
+    machine.attachReader(*reader)
+    machine.attachTTYIn(*ttyIn)
+    if punch['path'] is None:
+        machine.attachPunch()
+        if not (punch['offset'] is None):
+            machine.punchBytes(punchData)
+    else:
+        machine.attachPunch(punch['path'], punch['offset'])
+    return state['limit']
+
+def run (machine, limit, path=defaultPath, every=0, stopping=None):
+    # run machine as machine.run(limit) does, writing a checkpoint to path
+    # each time another every instructions have run (never if every is 0)
+    # and when stopping(), if given, returns True.  Returns the exit code,
+    # or None if stopped by stopping()
+    due = every
+    try:
+        while True:
+            n = min(limit, sliceSize)
+            if every > 0:
+                n = min(n, due)
+            before = machine.instructions
+            code = machine.runSlice(n)
+            if not (code is None):
+                return code
+            n = machine.instructions - before
+            limit -= n
+            if limit == 0:
+                return machine.limitStopped()
+            if not (stopping is None) and stopping():
+                save(machine, path, limit)
+                return None
+            if every > 0:
+                due -= n
+                if due == 0:
+                    save(machine, path, limit)
+                    due = every
+    finally:
+        machine.flushTrace()
@@ -0,0 +1,327 @@
+# Interactive debugger - Andrew Herbert - 18/10/2026
+
+# Runs a machine under the control of commands typed at a prompt, e.g.,
+# from 900sim.py -debug:
+#
+#   break ADDR [if CONDITION]  stop before executing ADDR, only when
+#                              CONDITION, an expression in A and Q, is true,
+#                              e.g., "break 8200 if A < 0 and Q == 5"
+#   watch ADDR                 stop after an instruction writes ADDR, which
+#                              may be the SCR or B word, 0 and 1 at level 1,
+#                              6 and 7 at level 4 (as an operand, or B by
+#                              load B, not the SCR moving on or jumping)
+#   delete [ADDR]              remove the breakpoint and watchpoint at ADDR,
+#                              or all of them
+#   info                       list the breakpoints and watchpoints
+#   step [N]                   execute N instructions (default 1)
+#   continue                   run until a breakpoint, a watchpoint, the
+#                              machine stopping or SIGINT
+#   print ADDR [LAST]          print store from ADDR to LAST, as
+#                              storeprint.py does
+#   list [ADDR]                print the instructions around ADDR, or the
+#                              next to be executed
+#   regs                       print A, Q, B, SCR, level and instructions
+#   back [N]                   undo the last N instructions (default 1)
+#   backto ADDR                undo instructions back to before the last
+#                              one to write ADDR
+#   quit                       leave the debugger
+#
+# A blank line repeats the last command.  A and Q in a condition are the
+# signed values of the registers.
+#
+# Breakpoints and watchpoints are set in the machine (see setBreak() and
+# setWatch() in sim900.py) and cost next to nothing until they are hit, so
+# the machine runs at full speed in between.  Instructions at a breakpoint
+# are not translated into blocks, and nor are ones writing a watched word,
+# which are interpreted instead.
+#
+# back and backto need the machine to have an undo log (see undolog.py and
+# 900sim.py -undo N), which costs the full speed of the machine but lets a
+# run that has stopped be stepped back from where it stopped.
+
+import cmd
+import signal
+
+import storefile
+from sim900 import normal, breakStop, maxStore
+
+sliceSize = 1 << 20 # instructions run between checks for SIGINT
+
+def condition (text):
+    # a function of A and Q that is the value of the expression text, or
+    # true if it cannot be evaluated, e.g., divides by zero
+    code = compile(text, '<condition>', 'eval')
+    def test (aReg, qReg):
+        try:
+            return eval(code, {'__builtins__': {}},
+                        {'A': normal(aReg), 'Q': normal(qReg)})
+        except Exception:
+            return True
+    try:
+        eval(code, {'__builtins__': {}}, {'A': 0, 'Q': 0})
+    except NameError:
+        raise # not just A and Q
+    except Exception:
+        pass
+    return test
+
+class Debugger (cmd.Cmd):
+
+    prompt = '(900) '
+
+    def __init__ (self, machine, limit, stdin=None, stdout=None):
+        super().__init__(stdin=stdin, stdout=stdout)
+        if not (stdin is None):
+            self.use_rawinput = False
+        self.machine     = machine
+        self.left        = limit # instructions left to run
+        self.code        = None  # exit code once the machine has stopped
+        self.interrupted = False
+
+    def run (self):
+        # take commands until quit, returns the exit code if the machine
+        # stopped, or None if not
+        previous = signal.signal(signal.SIGINT, self.interrupt)
+        try:
+            self.where()
+            self.cmdloop()
+        finally:
+            signal.signal(signal.SIGINT, previous)
+        return self.code
+
+    def interrupt (self, signum, frame):
+        self.interrupted = True
+
+    def say (self, text):
+        print(text, file=self.stdout)
+
+    def where (self):
+        # show the instruction to be executed next
+        machine = self.machine
+        addr = machine.store[machine.scr]
+        if 0 <= addr < maxStore:
+            self.say(storefile.formatWord(addr, machine.store[addr]))
+
+    def address (self, text):
+        # the address in text, or None after saying why not
+        try:
+            addr = int(text)
+        except ValueError:
+            self.say('not an address - ' + text)
+            return None
+        if not (0 <= addr < maxStore):
+            self.say('address out of range - %d' % addr)
+            return None
+        return addr
+
+    def resume (self, n):
+        # run up to n instructions, the first even if at a breakpoint,
+        # returns the exit code or None
+        machine = self.machine
+        before  = machine.instructions
+        code    = None
+        addr    = machine.store[machine.scr]
+        if addr in machine.breaks:
+            test = machine.breaks[addr]
+            machine.clearBreak(addr)
+            try:
+                code = machine.runSlice(1)
+            finally:
+                machine.setBreak(addr, test)
+            n -= machine.instructions - before
+        if code is None and n > 0:
+            code = machine.runSlice(n)
+        self.left -= machine.instructions - before
+        if code is None and self.left == 0:
+            code = machine.limitStopped()
+        return code
+
+    def report (self, code):
+        # after a step or continue
+        if code is None:
+            self.where()
+            return
+        self.say(self.machine.message)
+        if code != breakStop:
+            self.code = code
+        else:
+            self.where()
+
+    def running (self):
+        if self.code is None:
+            return True
+        self.say('the machine has stopped - ' + self.machine.message)
+        return False
+
+    def emptyline (self):
+        if self.lastcmd.split()[:1] in (['step'], ['s'], ['continue'],
+                                        ['c'], ['back'], ['list'], ['regs']):
+            return self.onecmd(self.lastcmd)
+
+    def do_break (self, arg):
+        """break ADDR [if CONDITION] - stop before executing ADDR"""
+        words = arg.split(None, 2)
+        if len(words) == 0:
+            self.say('break needs an address')
+            return
+        addr = self.address(words[0])
+        if addr is None:
+            return
+        test = None
+        if len(words) > 1:
+            if words[1] != 'if' or len(words) < 3:
+                self.say('break ADDR [if CONDITION]')
+                return
+            try:
+                test = condition(words[2])
+            except Exception as e:
+                self.say('bad condition - %s' % e)
+                return
+        self.machine.setBreak(addr, test)
+
+    def do_watch (self, arg):
+        """watch ADDR - stop after an instruction writes ADDR"""
+        addr = self.address(arg.strip())
+        if not (addr is None):
+            self.machine.setWatch(addr)
+
+    def do_delete (self, arg):
+        """delete [ADDR] - remove the breakpoint and watchpoint at ADDR,
+        or all of them"""
+        machine = self.machine
+        if arg.strip() == '':
+            addrs = set(machine.breaks) | machine.watches
+        else:
+            addr = self.address(arg.strip())
+            if addr is None:
+                return
+            addrs = [addr]
+        for addr in list(addrs):
+            machine.clearBreak(addr)
+            machine.clearWatch(addr)
+
+    def do_info (self, arg):
+        """info - list the breakpoints and watchpoints"""
+        machine = self.machine
+        for addr in sorted(machine.breaks):
+            self.say('break %d%s' % (addr, '' if machine.breaks[addr] is None
+                                     else ' (conditional)'))
+        for addr in sorted(machine.watches):
+            self.say('watch %d' % addr)
+
+    def do_step (self, arg):
+        """step [N] - execute N instructions"""
+        try:
+            n = int(arg) if arg.strip() != '' else 1
+        except ValueError:
+            self.say('not a count - ' + arg)
+            return
+        if n > 0 and self.running():
+            self.report(self.resume(min(n, self.left)))
+
+    def do_continue (self, arg):
+        """continue - run until a breakpoint, a watchpoint or a stop"""
+        if not self.running():
+            return
+        self.interrupted = False
+        while True:
+            code = self.resume(min(sliceSize, self.left))
+            if not (code is None) or self.interrupted:
+                break
+        if self.interrupted and code is None:
+            self.say('interrupted')
+        self.report(code)
+
+    def do_print (self, arg):
+        """print ADDR [LAST] - print store from ADDR to LAST"""
+        words = arg.split()
+        if not (1 <= len(words) <= 2):
+            self.say('print ADDR [LAST]')
+            return
+        addrs = [self.address(word) for word in words]
+        if None in addrs:
+            return
+        store = self.machine.store
+        for addr in range(addrs[0], addrs[-1] + 1):
+            self.say(storefile.formatWord(addr, store[addr]))
+
+    def do_list (self, arg):
+        """list [ADDR] - print the instructions around ADDR"""
+        machine = self.machine
+        if arg.strip() == '':
+            addr = machine.store[machine.scr]
+        else:
+            addr = self.address(arg.strip())
+            if addr is None:
+                return
+        for a in range(max(0, addr - 4), min(maxStore, addr + 6)):
+            mark = '>' if a == machine.store[machine.scr] else \
+                   '*' if a in machine.breaks else ' '
+            self.say(mark + storefile.formatWord(a, machine.store[a]))
+
+    def do_regs (self, arg):
+        """regs - print the registers"""
+        machine = self.machine
+        store   = machine.store
+        self.say('A %+7d  Q %+7d  B %+7d  SCR %5d  level %d  '
+                 'instructions %d' %
+                 (normal(machine.aReg), normal(machine.qReg),
+                  normal(store[machine.bReg]), store[machine.scr],
+                  machine.level, machine.instructions))
+
+    def undoLog (self):
+        if self.machine.undoLog is None:
+            self.say('no undo log, see -undo')
+        return self.machine.undoLog
+
+    def backed (self, n, done):
+        # after undoing done of n instructions
+        if done < n:
+            self.say('undo log exhausted after %d' % done)
+        if done > 0:
+            self.code = None # running again
+        self.where()
+
+    def do_back (self, arg):
+        """back [N] - undo the last N instructions"""
+        try:
+            n = int(arg) if arg.strip() != '' else 1
+        except ValueError:
+            self.say('not a count - ' + arg)
+            return
+        log = self.undoLog()
+        if not (log is None) and n > 0:
+            done = log.back(self.machine, n)
+            self.left += done
+            self.backed(n, done)
+
+    def do_backto (self, arg):
+        """backto ADDR - undo back to before the last write of ADDR"""
+        addr = self.address(arg.strip())
+        log  = self.undoLog()
+        if addr is None or log is None:
+            return
+        n = log.lastWrite(addr)
+        if n is None:
+            self.say('no write of %d in the undo log' % addr)
+            return
+        done = log.back(self.machine, n)
+        self.left += done
+        self.backed(n, done)
+
+    def do_quit (self, arg):
+        """quit - leave the debugger"""
+        return True
+
+    def do_EOF (self, arg):
+        self.say('')
+        return True
+
+    do_b = do_break
+    do_w = do_watch
+    do_s = do_step
+    do_c = do_continue
+    do_p = do_print
+    do_l = do_list
+    do_r = do_regs
+    do_q = do_quit
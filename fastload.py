@@ -0,0 +1,544 @@
+# Fast paper tape loading - Andrew Herbert - 18/10/2026
+
+# A binary tape is loaded by starting at 8181: the initial orders read the
+# first few words of the tape, which are a second stage loader, and jump to
+# it at 8177, the second stage loader then reads the rest of the tape.
+# Simulating this costs fifteen or so instructions for each word loaded.
+#
+# load() runs a machine started at 8181 as run() would, but when the
+# machine reaches the word loop of the initial orders, or of a second stage
+# loader it recognises by its code, the words of the tape are decoded here
+# and put straight into store, leaving the store, registers, SCR, reader
+# position and count of instructions executed exactly as simulating the
+# loop would have done.  Between loops, and for the start and end of each
+# tape, the loaders are simulated an instruction at a time, so a checksum
+# failure, running off the end of the tape or a word that would overwrite a
+# loader is all handled by the simulator.  Once no recognised loop has been
+# reached for maxSearch instructions the machine is left to run as usual.
+#
+# The second stage loaders recognised are
+#
+#   binary  - the standard loader at 8135, used by SIR, the 903 and 905
+#             FORTRAN systems and the 905 loader.  An address word, marked
+#             by the 128 hole in its first character, is followed by the
+#             words to put at that address on, three characters each.
+#   x3      - the X3 test tape's loader at 8153.
+#   algol   - the ALGOL tapes' loader at 8167, which stores each word with
+#             an instruction read from the tape and counted on as it goes.
+#
+# as are the loops clearing store before a loader is read on the X3, ALGOL
+# and 16K FORTRAN tapes.  Other loaders are simulated.  So is the 905
+# loader (loader_iss3) reading relocatable binary: it is a program run
+# from 16, not a loader started at 8181, and what it does with each word
+# depends on the symbol tables it keeps in store.
+#
+# verify() loads a tape both ways and reports any difference.
+
+import io
+from array import array
+
+import sim900
+from sim900 import makeIns, initialOrders, mask18, mask16, bit18, bit19, \
+                   addrMask
+
+# Looking for a loop to decode, the machine is stepped an instruction at a
+# time for searchSteps instructions, then run at full speed for searchSlice,
+# and so on until maxSearch instructions have run without finding one
+searchSteps = 32
+searchSlice = 4096
+maxSearch   = 1000000
+
+class Loader:
+    # a loop that can be decoded: the address of its first instruction,
+    # the words of the loader it relies on as (address, word), the lowest
+    # address the loader occupies and the function that decodes it
+
+    def __init__ (self, name, head, code, low, decode):
+        self.name   = name
+        self.head   = head
+        self.code   = code
+        self.low    = low
+        self.decode = decode
+
+    def recognise (self, store):
+        for addr, word in self.code:
+            if store[addr] != word:
+                return False
+        return True
+
+    def span (self, store, addr):
+        # words that can be loaded from addr on without reaching SCR or B,
+        # the loader or the initial orders
+        if 2 <= addr < self.low:
+            return self.low - addr
+        elif 8192 <= addr < len(store):
+            return len(store) - addr
+        return 0
+
+def codeWords (first, words):
+    return [(first + i, words[i]) for i in range(len(words))]
+
+def finish (machine, scr, lastS, executed):
+    # a loop left at scr, having executed instructions
+    if executed > 0:
+        machine.store[machine.scr] = scr
+        machine.lastS = lastS
+        machine.instructions += executed
+        machine.flushDecoded()
+    return executed
+
+# The initial orders, from 8182: A is set to 32769 and characters shifted
+# in until A is negative, then one more character completes the word, which
+# is put at 8180 + B.  B is counted up and the loop left at 8191, for 8177,
+# when it reaches zero.  A tape's leader of blanks is read by the loop from
+# 8183, which is decoded too, carrying on with the word in A.
+
+def initialOrdersDecode (machine, tape, budget):
+    store    = machine.store
+    i        = machine.ptrIdx
+    executed = 0
+    lastS    = 8185
+    a        = machine.aReg
+    n        = 0
+    if store[machine.scr] == 8182:
+        lastS = 8190
+        a = store[8189]
+        n = 1
+    while True:
+        while a < bit18 and i < len(tape):
+            a = ((a << 7) | tape[i]) & mask18
+            i += 1
+            n += 2 if a >= bit18 else 3
+        if a < bit18 or i >= len(tape):
+            break # simulate running off the end of the tape
+        a = ((a << 7) | tape[i]) & mask18
+        addr = (8180 + store[1]) & mask16
+        b = (store[1] + 1) & mask18
+        n += 5 if b >= bit18 else 6
+        if addr < 2 or addr >= len(store) or executed + n > budget:
+            break
+        if not (8180 <= addr <= 8191): # else write ignored
+            store[addr] = a
+        store[1] = machine.aReg = b
+        i += 1
+        machine.ptrIdx = i
+        executed += n
+        if b < bit18:
+            return finish(machine, 8177, 8191, executed)
+        lastS = 8190
+        a = store[8189]
+        n = 1
+    return finish(machine, 8182, lastS, executed)
+
+# The standard binary loader, from 8138 with the first character of a word
+# in A: 8173 holds the first character, 8174 the address, 8175 the sum of
+# the words loaded and 8176 the sum of the addresses.  A zero address ends
+# the tape, leaving at 8160 to check the sums.
+
+def binaryDecode (machine, tape, budget):
+    store    = machine.store
+    i        = machine.ptrIdx - 1 # first character of the word
+    a        = machine.aReg
+    executed = 0
+    while i + 3 <= len(tape):
+        if a & 128:
+            w = ((a << 14) | (tape[i+1] << 7) | tape[i+2]) & mask18
+            if w == 0:
+                if executed + 7 > budget:
+                    break
+                store[8173] = a
+                machine.aReg = 0
+                machine.ptrIdx = i + 3
+                return finish(machine, 8160, 8144, executed + 7)
+            if i + 3 >= len(tape) or executed + 13 > budget:
+                break
+            store[8173] = a
+            store[8174] = w
+            store[8176] = (store[8176] + w) & mask18
+        else:
+            # the run of words up to the next address word
+            addr = store[8174]
+            k = min(binary.span(store, addr), (budget - executed) // 15,
+                    (len(tape) - 1 - i) // 3)
+            first = tape[i:i+3*k:3].translate(addressFlags).find(1)
+            if first >= 0:
+                k = first
+            if k == 0:
+                break
+            j = i + 3*k
+            words = [((x << 14) | (y << 7) | z) & mask18
+                     for x, y, z in zip(tape[i:j:3], tape[i+1:j:3],
+                                        tape[i+2:j:3])]
+            store[addr:addr+k] = array('i', words)
+            store[8173] = tape[j-3]
+            store[8174] = addr + k
+            store[8175] = (store[8175] + sum(words)) & mask18
+            store[1] = machine.qReg = addr + k - 1
+            a = tape[j]
+            i = j
+            executed += 15*k
+            machine.aReg = a
+            machine.ptrIdx = i + 1
+            continue
+        a = tape[i+3]
+        i += 3
+        executed += 13
+        machine.aReg = a
+        machine.ptrIdx = i + 1
+    return finish(machine, 8138, 8150, executed)
+
+addressFlags = bytes(1 if code & 128 else 0 for code in range(256))
+
+# The X3 loader, from 8159: B is the address, 8179 the negated sum of the
+# words loaded.  A zero word ends a block, leaving at 8168.
+
+def x3Decode (machine, tape, budget):
+    store    = machine.store
+    i        = machine.ptrIdx
+    executed = 0
+    while True:
+        addr = store[1]
+        k = min(x3.span(store, addr), (budget - executed) // 9,
+                (len(tape) - i) // 3, 4096)
+        j = i + 3*k
+        words = [((x << 14) | (y << 7) | z) & mask18
+                 for x, y, z in zip(tape[i:j:3], tape[i+1:j:3],
+                                    tape[i+2:j:3])]
+        if 0 in words:
+            k = words.index(0)
+            words = words[:k]
+        if k == 0:
+            break
+        store[addr:addr+k] = array('i', words)
+        total = sum(words)
+        machine.qReg = (store[8179] - total + words[-1]) & mask18
+        store[8179] = machine.aReg = (store[8179] - total) & mask18
+        store[1] = addr + k
+        machine.ptrIdx = i = i + 3*k
+        executed += 9*k
+        if len(words) < 4096:
+            break
+    return finish(machine, 8159, 8167, executed)
+
+# Store clearing loops, run by the first words of a tape before its loader
+# is read.  The X3 loop, from 8171, puts 8179 at 8170 + B and counts B up
+# to zero, leaving at 8181.
+
+def x3ClearDecode (machine, tape, budget):
+    store = machine.store
+    b     = store[1]
+    first = (8170 + b) & mask16
+    n     = (-b) & mask18 or bit19 # iterations, the last leaves the loop
+    k     = min(n, x3Clear.span(store, first), budget // 6)
+    if k == 0:
+        return 0
+    store[first:first+k] = array('i', [store[8179]]) * k
+    store[1] = b = (b + k) & mask18
+    machine.aReg = b
+    if k == n:
+        return finish(machine, 8181, 8175, 6*k - 1)
+    return finish(machine, 8171, 8176, 6*k)
+
+# The ALGOL fill loop, from 8171, counts B up, puts A at 8191 + B and then
+# 8178 in A until B + 8179 is zero, leaving at 8181.
+
+def algolFillDecode (machine, tape, budget):
+    store = machine.store
+    b     = store[1]
+    first = (8192 + b) & mask16
+    n     = (-(b + 1 + store[8179])) & mask18 # iterations after the first
+    k     = min(n + 1, algolFill.span(store, first), budget // 7)
+    if k == 0:
+        return 0
+    store[first] = machine.aReg
+    store[first+1:first+k] = array('i', [store[8178]]) * (k - 1)
+    store[1] = (b + k) & mask18
+    if k == n + 1:
+        machine.aReg = 0
+        return finish(machine, 8181, 8175, 7*k - 2)
+    machine.aReg = store[8178]
+    return finish(machine, 8171, 8177, 7*k)
+
+# The ALGOL clear loop, from 8175, puts A at the address of the store
+# instruction at 8177 and counts the instruction on, until it overwrites
+# the loop at 8175.
+
+def algolClearDecode (machine, tape, budget):
+    store = machine.store
+    ins   = store[8177]
+    if ins >> 13 != 5: # an unmodified store A
+        return 0
+    first = ins & addrMask
+    k     = min(algolClear.span(store, first), budget // 4)
+    if k == 0:
+        return 0
+    store[first:first+k] = array('i', [machine.aReg]) * k
+    store[8177] = ins + k
+    return finish(machine, 8175, 8179, 4*k)
+
+# The ALGOL loader, from 8170, reads a word with B in A before the first
+# character: if that leaves A zero, a blank, 8175 is reset to 5 8175 and
+# the next word read is put there.  Each word is then put in store by the
+# instruction at 8175, added to the sum at 8167 and 8175 counted on, so
+# that the word after a blank is the store instruction, less one, for the
+# words following it.  The loader stops when a word puts anything other
+# than a store instruction at 8175.
+
+def algolDecode (machine, tape, budget):
+    store    = machine.store
+    i        = machine.ptrIdx
+    b        = store[1]
+    blanks   = (b << 7) & mask18 == 0 # else no first character reads zero
+    a        = machine.aReg
+    lastS    = 8179
+    executed = 0
+    while i < len(tape):
+        if blanks and tape[i] == 0:
+            if executed + 5 > budget:
+                break
+            a = store[8175] = store[8169]
+            i += 1
+            lastS = 8169
+            executed += 5
+            continue
+        ins = store[8175]
+        if (ins >> 13) & 15 != 5:
+            break # simulate whatever the tape put there
+        addr = ins & addrMask
+        to   = ((addr + b) if ins >= bit18 else addr) & mask16
+        if to == 8175:
+            k = 1
+        else:
+            k = min(algolLoader.span(store, to), (budget - executed) // 10,
+                    (len(tape) - i) // 3, 8192 - addr)
+            if blanks and k > 0:
+                zero = tape[i:i+3*k:3].find(0)
+                if zero >= 0:
+                    k = zero
+        if k == 0 or i + 3 > len(tape) or executed + 10 > budget:
+            break
+        j = i + 3*k
+        words = [((x << 14) | (y << 7) | z) & mask18
+                 for x, y, z in zip(tape[i:j:3], tape[i+1:j:3],
+                                    tape[i+2:j:3])]
+        store[to:to+k] = array('i', words)
+        a = store[8167] = (store[8167] + sum(words)) & mask18
+        store[8175] = (store[8175] + 1 if to == 8175 else ins + k) & mask18
+        i = j
+        lastS = 8179
+        executed += 10*k
+    machine.aReg = a
+    machine.ptrIdx = i
+    return finish(machine, 8170, lastS, executed)
+
+# The 16K FORTRAN loop, from 8176, counts B up and puts A at 1 + B and
+# 8191 + B, until it overwrites the jump at 8174.
+
+def fortranClearDecode (machine, tape, budget):
+    store = machine.store
+    b     = store[1]
+    low   = (b + 2) & mask16
+    high  = (b + 8192) & mask16
+    k     = min(fortranClear.span(store, low), fortranClear.span(store, high),
+                budget // 5)
+    if k == 0:
+        return 0
+    fill = array('i', [machine.aReg]) * k
+    store[low:low+k]   = fill
+    store[high:high+k] = fill
+    store[1] = (b + k) & mask18
+    return finish(machine, 8176, 8174, 5*k)
+
+initial =Loader('initial orders', 8182, codeWords(8182, initialOrders[2:]),
+                 8180, initialOrdersDecode)
+
+leader = Loader('initial orders', 8183, initial.code, 8180,
+                initialOrdersDecode)
+
+binary = Loader('binary', 8138,
+                codeWords(8138, [makeIns(0,  5, 8173),
+                                 makeIns(0,  6, 8178),
+                                 makeIns(0,  7, 8151),
+                                 makeIns(0,  4, 8173),
+                                 makeIns(0, 15, 2048),
+                                 makeIns(0, 15, 2048),
+                                 makeIns(0,  7, 8160),
+                                 makeIns(0,  5, 8174),
+                                 makeIns(0,  1, 8176),
+                                 makeIns(0,  5, 8176),
+                                 makeIns(0,  4, 8179),
+                                 makeIns(0, 15, 2048),
+                                 makeIns(0,  8, 8138),
+                                 makeIns(0,  0, 8174),
+                                 makeIns(0,  4, 8173),
+                                 makeIns(0, 15, 2048),
+                                 makeIns(0, 15, 2048),
+                                 makeIns(1,  5,    0),
+                                 makeIns(0,  1, 8175),
+                                 makeIns(0,  5, 8175),
+                                 makeIns(0, 10, 8174),
+                                 makeIns(0,  8, 8148)]) +
+                [(8178, 128), (8179, 0)],
+                8135, binaryDecode)
+
+x3 = Loader('x3', 8159,
+            codeWords(8159, [makeIns(0, 15, 2048),
+                             makeIns(0, 15, 2048),
+                             makeIns(0, 15, 2048),
+                             makeIns(0,  7, 8168),
+                             makeIns(1,  5,    0),
+                             makeIns(0,  2, 8179),
+                             makeIns(0,  5, 8179),
+                             makeIns(0, 10,    1),
+                             makeIns(0,  8, 8159)]),
+            8153, x3Decode)
+
+x3Clear = Loader('x3 clear', 8171,
+                 codeWords(8171, [makeIns(0,  4, 8179),
+                                  makeIns(1,  5, 8170),
+                                  makeIns(0, 10,    1),
+                                  makeIns(0,  4,    1),
+                                  makeIns(0,  7, 8181),
+                                  makeIns(0,  8, 8171)]),
+                 8170, x3ClearDecode)
+
+algolFill = Loader('algol fill', 8171,
+                   codeWords(8171, [makeIns(0, 10,    1),
+                                    makeIns(1,  5, 8191),
+                                    makeIns(0,  4,    1),
+                                    makeIns(0,  1, 8179),
+                                    makeIns(0,  7, 8181),
+                                    makeIns(0,  4, 8178),
+                                    makeIns(0,  8, 8171)]),
+                   8171, algolFillDecode)
+
+algolClear = Loader('algol clear', 8175,
+                    [(8175, makeIns(0,  8, 8177)),
+                     (8178, makeIns(0, 10, 8177)),
+                     (8179, makeIns(0,  8, 8175))],
+                    8175, algolClearDecode)
+
+algolLoader = Loader('algol', 8170,
+                     codeWords(8168, [makeIns(0,  4, 8169),
+                                      makeIns(0,  5, 8175),
+                                      makeIns(0,  4,    1),
+                                      makeIns(0, 15, 2048),
+                                      makeIns(0,  7, 8168),
+                                      makeIns(0, 15, 2048),
+                                      makeIns(0, 15, 2048)]) +
+                     codeWords(8176, [makeIns(0,  1, 8167),
+                                      makeIns(0,  5, 8167),
+                                      makeIns(0, 10, 8175),
+                                      makeIns(0,  8, 8170)]),
+                     8167, algolDecode)
+
+fortranClear = Loader('fortran clear', 8176,
+                      [(8174, makeIns(0,  8, 8176))] +
+                      codeWords(8176, [makeIns(0, 10,    1),
+                                       makeIns(1,  5,    1),
+                                       makeIns(1,  5, 8191),
+                                       makeIns(0,  8, 8174)]),
+                      8174, fortranClearDecode)
+
+loaders = {} # the loaders with their loop starting at each address
+for loader in (initial, leader, binary, x3, x3Clear, algolFill, algolClear,
+               algolLoader, fortranClear):
+    loaders.setdefault(loader.head, []).append(loader)
+
+def decode (machine, budget):
+    # decode the loop the machine is at, if any, returns the number of
+    # instructions accounted for
+    if machine.level != 1 or machine.ptrBuf is None:
+        return 0
+    for loader in loaders.get(machine.store[machine.scr], ()):
+        if loader.recognise(machine.store):
+            break
+    else:
+        return 0
+    before = machine.ptrIdx
+    n = loader.decode(machine, machine.ptrBuf, budget)
+    machine.ioCounts['reader'] += machine.ptrIdx - before
+    machine.fastLoaded += n
+    return n
+
+def load (machine, limit):
+    # run machine, started at 8181, up to limit instructions while it is
+    # loading a tape.  Returns (code, decoded): the exit code if the machine
+    # stopped, otherwise None and the machine is to be run on for the rest
+    # of limit, and the number of instructions decoded rather than simulated
+    if not (machine.traceFile is None and machine.profile is None and
+            machine.undoLog is None) or machine.breaks or machine.watches:
+        return (None, 0)
+    start    = machine.instructions
+    decoded  = 0
+    searched = 0 # instructions run since a loop was decoded
+    stepping = searchSteps
+    while searched < maxSearch:
+        left = limit - (machine.instructions - start)
+        if left == 0:
+            return (machine.limitStopped(), decoded)
+        n = decode(machine, left)
+        if n > 0:
+            decoded += n
+            searched = 0
+            stepping = searchSteps
+            continue
+        before = machine.instructions
+        if stepping > 0:
+            code = machine.runSlice(1)
+            stepping -= 1
+        else:
+            code = machine.runSlice(min(searchSlice, left))
+            stepping = searchSteps
+        if not (code is None):
+            return (code, decoded)
+        searched += machine.instructions - before
+    return (None, decoded)
+
+def copyMachine (machine):
+    # a machine in the same state as machine, with output kept in memory
+    copy = sim900.Machine()
+    copy.store[:] = machine.store
+    copy.setState(machine.getState())
+    copy.attachReader(machine.ptrPath, machine.ptrBuf, machine.ptrIdx)
+    copy.attachTTYIn(machine.ttyInPath, machine.ttyInBuf, machine.ttyInIdx)
+    copy.ttyOut = io.StringIO()
+    return copy
+
+def verify (machine, limit):
+    # run machine as load() and then run() would, and a copy of it by
+    # simulation alone.  Returns (code, decoded, differences), differences
+    # being a list of descriptions of where the two disagree
+    reference = copyMachine(machine)
+    expected  = reference.run(limit)
+    ttyOut = machine.ttyOut
+    machine.ttyOut = io.StringIO()
+    try:
+        start = machine.instructions
+        code, decoded = load(machine, limit)
+        if code is None:
+            code = machine.run(limit - (machine.instructions - start))
+        tty = machine.ttyOut.getvalue()
+    finally:
+        machine.ttyOut = ttyOut
+    ttyOut.write(tty)
+    differences = []
+    if code != expected or machine.message != reference.message:
+        differences.append('exit %d (%s), simulated %d (%s)' %
+                           (code, machine.message,
+                            expected, reference.message))
+    for name in ('aReg', 'qReg', 'level', 'lastS', 'ptrIdx', 'ttyInIdx',
+                 'instructions'):
+        fast, slow = getattr(machine, name), getattr(reference, name)
+        if fast != slow:
+            differences.append('%s %d, simulated %d' % (name, fast, slow))
+    changed = [addr for addr in range(len(machine.store))
+               if machine.store[addr] != reference.store[addr]]
+    for addr in changed[:10]:
+        differences.append('store[%d] %d, simulated %d' %
+                           (addr, machine.store[addr], reference.store[addr]))
+    if len(changed) > 10:
+        differences.append('and %d more store words' % (len(changed) - 10))
+    if tty != reference.ttyOut.getvalue():
+        differences.append('teleprinter output differs')
+    return (code, decoded, differences)
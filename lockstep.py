@@ -0,0 +1,351 @@
+# Lockstep execution of many machines - Andrew Herbert - 18/10/2026
+
+# For parameter sweeps: the same program run by many machines, each with
+# its own data tapes.  A Lockstep holds the state of n machines as NumPy
+# arrays, the stores as an n x 16384 array and A, Q and the interrupt level
+# as vectors, and executes one instruction of every running machine at
+# once.  The machines need not stay at the same address, each step gathers
+# every machine's instruction, then the machines are grouped by function
+# code and each group executed with array operations.  Input/output is
+# done machine by machine from tapes held in memory, and punch and
+# teleprinter output are collected in memory.
+#
+# Once few machines are left running (at most scalarBelow) the vector step
+# costs more than it saves, and each of the rest is handed to a sim900
+# Machine to finish with its translated fast path.
+#
+# NumPy is optional.  sweep() runs the machines one after another with
+# sim900.Machine when NumPy is not installed.
+#
+# Each machine yields a record:
+#
+#   code          exit code, as 900sim.py would return
+#   message       reason the machine stopped
+#   tty           teleprinter output
+#   punch         punch output, bytes
+#   instructions  instructions executed
+
+import io
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import sim900
+from sim900 import (dynStop, rdrStop, ttyStop, limitStop, otherStop,
+                    maxStore, mask18, mask16, bit18, bit19, addrMask, modMask,
+                    sLevel1, sLevel4)
+
+scalarBelow = 8 # machines left running when the rest go to sim900.Machine
+
+def available ():
+    return not (numpy is None)
+
+def normal (v):
+    # 18 bit values as signed integers
+    return numpy.where(v >= bit18, v - bit19, v)
+
+class Lockstep:
+
+    def __init__ (self, n, store=None):
+        # n machines each starting with a copy of store, a sim900 store
+        if numpy is None:
+            raise ImportError('lockstep execution needs NumPy')
+        self.n        = n
+        self.store    = numpy.zeros((n, maxStore), dtype=numpy.int32)
+        if not (store is None):
+            self.store[:] = numpy.frombuffer(array('i', store).tobytes(),
+                                             dtype=numpy.int32)[:maxStore]
+        self.aReg     = numpy.zeros(n, dtype=numpy.int64)
+        self.qReg     = numpy.zeros(n, dtype=numpy.int64)
+        self.level    = numpy.ones(n, dtype=numpy.int8)
+        self.scr      = numpy.full(n, sLevel1, dtype=numpy.int64)
+        self.running  = numpy.ones(n, dtype=bool)
+        self.executed = numpy.zeros(n, dtype=numpy.int64)
+        self.codes    = [None] * n
+        self.messages = [None] * n
+        self.readers  = [b''] * n
+        self.ptrIdx   = [0] * n
+        self.ttyIns   = [b''] * n
+        self.ttyInIdx = [0] * n
+        self.punches  = [bytearray() for i in range(n)]
+        self.ttys     = [bytearray() for i in range(n)]
+
+    def attachReader (self, i, data, offset=0):
+        self.readers[i] = data
+        self.ptrIdx[i]  = offset
+
+    def attachTTYIn (self, i, data, offset=0):
+        self.ttyIns[i]   = data
+        self.ttyInIdx[i] = offset
+
+    def start (self, addr):
+        # set every machine's sequence control register
+        self.store[numpy.arange(self.n), self.scr] = addr
+
+    def stop (self, i, code, message):
+        self.running[i]  = False
+        self.codes[i]    = code
+        self.messages[i] = message
+
+    def results (self):
+        return [{'code': self.codes[i], 'message': self.messages[i],
+                 'tty': self.ttys[i].decode('ascii'),
+                 'punch': bytes(self.punches[i]),
+                 'instructions': int(self.executed[i])}
+                for i in range(self.n)]
+
+    def run (self, limit=sim900.defaultLimit):
+        # run every machine until it stops or has executed limit
+        # instructions, returns the records of the machines.  The machines
+        # still running have all executed the same number of instructions
+        steps = 0
+        while True:
+            idx = numpy.flatnonzero(self.running)
+            if len(idx) <= scalarBelow:
+                for i in idx:
+                    self.finishScalar(i, limit)
+                break
+            if steps == limit:
+                for i in idx:
+                    self.stop(i, limitStop, 'execution limit reached')
+                break
+            self.step(idx)
+            steps += 1
+        return self.results()
+
+    def step (self, idx):
+        # execute one instruction of each of the machines idx
+        flat  = self.store.reshape(-1)
+        base  = idx * maxStore
+        sAt   = base + self.scr[idx]
+        lastS = flat[sAt].astype(numpy.int64)
+        if lastS.max() >= maxStore:
+            bad = lastS >= maxStore
+            for i in idx[bad]:
+                self.stop(i, otherStop, 'address out of range')
+            keep  = ~bad
+            idx, base, sAt, lastS = idx[keep], base[keep], sAt[keep], \
+                                    lastS[keep]
+            if len(idx) == 0:
+                return
+        flat[sAt] = lastS + 1
+        ins = flat[base + lastS].astype(numpy.int64)
+        f   = (ins >> 13) & 15
+        m   = (ins & addrMask) | (lastS & modMask)
+        modified = ins >= bit18
+        m   = numpy.where(modified, m + flat[sAt + 1], m) & mask16
+        self.executed[idx] += 1
+        # function codes that address store must address the 16K there is
+        ok = None
+        if m.max() >= maxStore:
+            bad = (m >= maxStore) & ((f < 7) | ((f >= 10) & (f < 14)))
+            for i in idx[bad]:
+                self.stop(i, otherStop, 'address out of range')
+            ok = ~bad
+        aReg = self.aReg
+        qReg = self.qReg
+        functions = numpy.flatnonzero(numpy.bincount(f if ok is None
+                                                     else f[ok],
+                                                     minlength=16))
+        for fn in functions:
+            if len(functions) == 1 and ok is None:
+                sel = slice(None) # all the same function
+            elif ok is None:
+                sel = numpy.flatnonzero(f == fn)
+            else:
+                sel = numpy.flatnonzero((f == fn) & ok)
+            i   = idx[sel]
+            at  = base[sel] + m[sel] # absolute index of operand
+            if fn == 0:   # load B
+                v = flat[at]
+                qReg[i] = v
+                flat[sAt[sel] + 1] = v
+            elif fn == 1: # add
+                aReg[i] = (aReg[i] + flat[at]) & mask18
+            elif fn == 2: # negate and add
+                v = flat[at].astype(numpy.int64)
+                qReg[i] = v
+                aReg[i] = (v - aReg[i]) & mask18
+            elif fn == 3: # store Q
+                flat[at] = qReg[i] >> 1
+            elif fn == 4: # load A
+                aReg[i] = flat[at]
+            elif fn == 5: # store A, writes to initial instructions ignored
+                k = m[sel]
+                write = (self.level[i] != 1) | (k < 8180) | (k > 8191)
+                flat[at[write]] = aReg[i[write]]
+            elif fn == 6: # collate
+                aReg[i] &= flat[at]
+            elif fn == 7: # jump if zero
+                jump = aReg[i] == 0
+                flat[sAt[sel][jump]] = m[sel][jump]
+            elif fn == 8: # jump
+                flat[sAt[sel]] = m[sel]
+            elif fn == 9: # jump if negative
+                jump = aReg[i] >= bit18
+                flat[sAt[sel][jump]] = m[sel][jump]
+            elif fn == 10: # count in store
+                flat[at] = (flat[at] + 1) & mask18
+            elif fn == 11: # store S
+                s = flat[sAt[sel]]
+                qReg[i] = s & modMask
+                flat[at] = s & addrMask
+            elif fn == 12: # multiply
+                a = normal(aReg[i])
+                product = a * normal(flat[at].astype(numpy.int64))
+                qReg[i] = ((product << 1) & mask18) | (a < 0)
+                aReg[i] = (product >> 17) & mask18
+            elif fn == 13: # divide
+                self.divide(i, flat[at])
+            elif fn == 14: # shift
+                self.shift(i, m[sel] & addrMask)
+            else:
+                for j, k in zip(i, m[sel]):
+                    self.inOut(j, int(k) & addrMask)
+        # dynamic stop if the SCR, which may have moved, is unchanged
+        stopped = flat[base + self.scr[idx]] == lastS
+        for j, s in zip(idx[stopped], lastS[stopped]):
+            if self.running[j]:
+                self.stop(j, dynStop, 'Dynamic stop at %d' % s)
+
+    def divide (self, i, divisor):
+        divisor = normal(divisor.astype(numpy.int64))
+        zero = divisor == 0
+        for j in i[zero]:
+            self.stop(j, otherStop, 'divide by zero')
+        i, divisor = i[~zero], divisor[~zero]
+        aq = (normal(self.aReg[i]) << 18) | self.qReg[i]
+        quotient = ((aq // divisor) >> 1) & mask18
+        self.aReg[i] = quotient | 1
+        self.qReg[i] = quotient & 0o777776
+
+    def shift (self, i, places):
+        aReg = self.aReg
+        qReg = self.qReg
+        left  = places <= 2047
+        right = places >= 6144
+        for j, p in zip(i[~(left | right)], places[~(left | right)]):
+            self.stop(j, otherStop, 'unsupported i/o 14 %4d' % p)
+        # left: only the bottom 36 bits are kept, so none survive 36 places
+        l  = i[left]
+        p  = places[left].astype(numpy.uint64)
+        aq = (aReg[l].astype(numpy.uint64) << 18) | \
+             qReg[l].astype(numpy.uint64)
+        aq = numpy.where(p < 36, aq << numpy.minimum(p, 63),
+                         numpy.uint64(0)).astype(numpy.int64)
+        aReg[l] = (aq >> 18) & mask18
+        qReg[l] = aq & mask18
+        # right: arithmetic, shifts of 63 places and more give all sign
+        r  = i[right]
+        p  = numpy.minimum(8192 - places[right], 63)
+        aq = ((normal(aReg[r]) << 18) | qReg[r]) >> p
+        aReg[r] = (aq >> 18) & mask18
+        qReg[r] = aq & mask18
+
+    def inOut (self, i, op):
+        # one machine's input/output, as sim900.Machine.inOut()
+        if op == 7168: # level terminate
+            self.level[i] = 4
+            self.scr[i]   = sLevel4
+        elif op == 2048 or op == 2052:
+            if op == 2048:
+                tape, pos = self.readers[i], self.ptrIdx
+            else:
+                tape, pos = self.ttyIns[i], self.ttyInIdx
+            if pos[i] >= len(tape):
+                if op == 2048:
+                    self.stop(i, rdrStop, 'run off end of input tape')
+                else:
+                    self.stop(i, ttyStop, 'run off end of tty input')
+                return
+            byte = tape[pos[i]]
+            pos[i] += 1
+            self.aReg[i] = ((int(self.aReg[i]) << 7) | byte) & mask18
+        elif op == 6144:
+            self.punches[i].append(int(self.aReg[i]) & 255)
+        elif op == 6148:
+            ch = int(self.aReg[i]) & 127
+            if ch == 10 or 32 <= ch <= 122:
+                self.ttys[i].append(ch)
+        else:
+            self.stop(i, otherStop, 'Unsupported i/o 15 %4d' % op)
+
+    def finishScalar (self, i, limit):
+        # run machine i to the end with sim900.Machine
+        store = array('i')
+        store.frombytes(self.store[i].tobytes())
+        machine = sim900.Machine(store)
+        machine.ttyOut = io.StringIO()
+        machine.setState({'aReg': int(self.aReg[i]),
+                          'qReg': int(self.qReg[i]),
+                          'level': int(self.level[i]), 'lastS': 0,
+                          'ptrIdx': 0, 'ttyInIdx': 0,
+                          'instructions': int(self.executed[i])})
+        machine.attachReader(data=self.readers[i], offset=self.ptrIdx[i])
+        machine.attachTTYIn(data=self.ttyIns[i], offset=self.ttyInIdx[i])
+        machine.attachPunch()
+        try:
+            code = machine.run(limit - int(self.executed[i]))
+        except Exception as e: # as batch.py, one machine must not stop all
+            code = otherStop
+            machine.message = errorMessage(e)
+        self.stop(i, code, machine.message)
+        self.store[i] = numpy.frombuffer(machine.store.tobytes(),
+                                         dtype=numpy.int32)
+        self.aReg[i]     = machine.aReg
+        self.qReg[i]     = machine.qReg
+        self.level[i]    = machine.level
+        self.scr[i]      = machine.scr
+        self.executed[i] = machine.instructions
+        self.ptrIdx[i]   = machine.ptrIdx
+        self.ttyInIdx[i] = machine.ttyInIdx
+        self.ttys[i]    += machine.ttyOut.getvalue().encode('ascii')
+        punch = machine.punchOutput()
+        if not (punch is None):
+            self.punches[i] += punch
+
+def errorMessage (e):
+    # what a machine of a sweep stopped by exception e reports, an address
+    # outside store being reported as the lockstep engine does
+    if isinstance(e, IndexError):
+        return 'address out of range'
+    return 'simulator error - %r' % e
+
+def runScalar (store, start, reader, ttyIn, limit):
+    # one machine of a sweep run by sim900.Machine
+    machine = sim900.Machine(array('i', store))
+    machine.ttyOut = io.StringIO()
+    machine.attachReader(data=reader)
+    machine.attachTTYIn(data=ttyIn)
+    machine.attachPunch()
+    machine.start(start)
+    try:
+        code = machine.run(limit)
+    except Exception as e:
+        code = otherStop
+        machine.message = errorMessage(e)
+    punch = machine.punchOutput()
+    return {'code': code, 'message': machine.message,
+            'tty': machine.ttyOut.getvalue(),
+            'punch': b'' if punch is None else punch,
+            'instructions': machine.instructions}
+
+def sweep (store, start, readers, ttyIns=None, limit=sim900.defaultLimit,
+           vector=True):
+    # run the program in store from start once for each tape in readers,
+    # with the corresponding teletype input from ttyIns, in lockstep if
+    # NumPy is available, returns a record for each run
+    if ttyIns is None:
+        ttyIns = [b''] * len(readers)
+    if not vector or numpy is None or len(readers) <= scalarBelow:
+        return [runScalar(store, start, reader, ttyIn, limit)
+                for reader, ttyIn in zip(readers, ttyIns)]
+    lockstep = Lockstep(len(readers), store)
+    for i in range(len(readers)):
+        lockstep.attachReader(i, readers[i])
+        lockstep.attachTTYIn(i, ttyIns[i])
+    lockstep.start(start)
+    return lockstep.run(limit)
@@ -0,0 +1,253 @@
+# In-process job pipelines - Andrew Herbert - 18/10/2026
+
+# Runs the steps of algol.sh, 903fortran.sh, 903sir.sh and 905fortran.sh in
+# one Python process.  The store, the tape left in the reader and the punch
+# output are handed from one step to the next in memory, so nothing is
+# written to disk until the job is complete.  900run.py is the command
+# line interface.
+
+# A job is a list of steps.  A step either runs the simulator, as one
+# invocation of 900sim.py would, or transforms the tapes, as to900text.py,
+# reverse.py and from900text.py do.  Each step is timed.  Binary tapes are
+# loaded as by fastload.py.
+
+import os
+import sys
+import time
+
+import sim900
+import snapshot
+import fastload
+from sim900 import dynStop
+from telecode import toTelecode, fromTelecode # as to900text.py, from900text.py
+
+systemDir = os.path.dirname(os.path.abspath(__file__))
+
+def systemPath (name):
+    # path of a language system tape or teletype input file
+    return os.path.join(systemDir, name)
+
+def readFile (path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+class Job:
+    # the state carried between steps, standing in for the files
+    # .store, .reader, .ttyin, .punch and .save
+
+    def __init__ (self, out=None, limit=sim900.defaultLimit, cache=None,
+                  machine=None):
+        self.machine = sim900.Machine() if machine is None else machine
+        self.out     = sys.stdout if out is None else out
+        self.machine.ttyOut = self.out
+        self.limit   = limit
+        self.cache   = cache  # snapshot.SnapshotCache or None
+        self.reader  = None   # tape left in the reader
+        self.ttyIn   = None   # teletype input left over
+        self.punch   = None   # punch output, None if nothing punched yet
+        self.save    = None   # tape put aside
+        self.preloaded = None # language system already in store
+        self.loadOutput = ''  # teleprinter output from loading it
+        self.code    = dynStop
+        self.timings = []     # (step, seconds, instructions, exit code)
+
+    def time (self, step, start, instructions, code=None):
+        self.timings.append((step, time.time()-start, instructions, code))
+
+    def echo (self, text=''):
+        print(text, file=self.out)
+
+    def halted (self, s):
+        print('\n\n***Halted - ', s, file=self.out)
+
+    def simulate (self, jump=8181, ptin=None, ttyin=None):
+        # one run of the simulator, ptin and ttyin are input tapes, if None
+        # the tape left over from the previous run is used
+        start   = time.time()
+        machine = self.machine
+        machine.reset()
+        machine.attachReader(data=self.reader if ptin is None else ptin)
+        machine.attachTTYIn(data=self.ttyIn if ttyin is None else ttyin)
+        if jump == 8181:
+            machine.establishInitialInstructions()
+        machine.start(jump)
+        before = machine.instructions
+        if self.cache is None:
+            code = None
+            if jump == 8181:
+                code = fastload.load(machine, self.limit)[0]
+            if code is None:
+                code = machine.run(self.limit -
+                                   (machine.instructions - before))
+        else:
+            code = snapshot.run(self.cache, machine, self.limit)
+        if code != dynStop:
+            self.halted(machine.message)
+        # leave any unconsumed input in the reader, as 900sim.py does
+        if not (machine.ptrBuf is None):
+            self.reader = machine.readerRemainder()
+        if not (machine.ttyInBuf is None):
+            self.ttyIn = machine.ttyInRemainder()
+        punch = machine.punchOutput()
+        if not (punch is None):
+            self.punch = punch
+        self.code = code
+        self.time('900sim -jump %d' % jump, start,
+                  machine.instructions-before, code)
+        return code
+
+    def load (self, name):
+        # load a language system tape through the initial orders, unless
+        # the job was started with it already loaded
+        if self.preloaded == name:
+            self.preloaded = None
+            self.out.write(self.loadOutput)
+            return self.code
+        return self.simulate(ptin=readFile(systemPath(name)))
+
+    def convert (self, path):
+        # to900text.py
+        start = time.time()
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            self.reader = toTelecode(f.read())
+        self.time('to900text', start, 0)
+
+    def punchText (self):
+        # from900text.py
+        start = time.time()
+        text = fromTelecode(b'' if self.punch is None else self.punch)
+        self.time('from900text', start, 0)
+        return text
+
+    def showPunch (self, blank=True):
+        # blank is True to follow the heading with a blank line
+        text = self.punchText()
+        if text == '':
+            self.echo('*** No punch output ***')
+            if blank:
+                self.echo()
+        else:
+            self.echo('*** Punch output ***')
+            if blank:
+                self.echo()
+            self.out.write(text)
+        return text
+
+    def writeOutputs (self, directory='.'):
+        # the files left behind by the shell scripts
+        self.machine.saveStore(os.path.join(directory, '.store'))
+        with open(os.path.join(directory, '.punch'), 'wb') as f:
+            f.write(b'' if self.punch is None else self.punch)
+        with open(os.path.join(directory, '.ascii'), 'w') as f:
+            f.write(fromTelecode(b'' if self.punch is None else self.punch))
+
+# The language systems, each a function of a job and source file path
+# following the corresponding shell script
+
+# tape loaded by the first step of each language
+systems = {'algol': 'alg16klg_masd', '903fortran': 'fort16klg_iss5',
+           'sir': 'sir(iss6)(5500)', '905fortran': '905fortran_iss6'}
+
+def algol (job, source):
+    job.load(systems['algol'])                               # load Algol
+    job.convert(source)
+    if job.simulate(jump=8) != dynStop:                      # translate
+        return job.code
+    job.echo()
+    job.echo()
+    job.simulate(jump=10)                                    # interpret
+    job.showPunch()
+    return job.code
+
+def fortran903 (job, source):
+    job.load(systems['903fortran'])                          # load FORTRAN
+    job.convert(source)
+    job.simulate(jump=8)                                     # initialise
+    if job.simulate(jump=10) != dynStop:                     # translate
+        return job.code
+    job.simulate(jump=11)                                    # run program
+    job.showPunch(blank=False)
+    return job.code
+
+def sir (job, source):
+    job.load(systems['sir'])                                 # load SIR
+    job.convert(source)
+    if job.simulate(jump=8) != dynStop:                      # assemble
+        return job.code
+    job.simulate(jump=32)                                    # run program
+    job.echo()
+    job.showPunch(blank=False)
+    return job.code
+
+def fortran905 (job, source):
+    def ttyin (name):
+        return readFile(systemPath(os.path.join('src', '905fortran', name)))
+    job.echo()
+    job.echo('***')
+    job.echo('*** Loading 905 FORTRAN compiler and reading source code tape.')
+    job.echo('*** Outputs a relocatable binary tape and halts.')
+    job.echo('***')
+    job.load(systems['905fortran'])
+    job.convert(source)
+    job.simulate(jump=16, ttyin=ttyin('O0R'))                # compile
+    job.echo()
+    job.echo('***')
+    job.echo('*** Compilation complete - now loading binary using '
+             '"900 LINKER".')
+    job.echo('***')
+    job.save, job.reader = job.reader, None  # tape may contain data
+    start = time.time()
+    binary = b'' if job.punch is None else job.punch[::-1] # reverse.py
+    job.time('reverse', start, 0)
+    job.simulate(ptin=readFile(systemPath('loader_iss3')))   # load loader
+    job.simulate(jump=16, ptin=binary, ttyin=ttyin('O20L'))  # load program
+    job.echo()
+    job.echo('***')
+    job.echo('*** Now loading FORTRAN library routines.')
+    job.echo('***')
+    job.simulate(jump=16, ptin=readFile(systemPath('905fortlib')),
+                 ttyin=ttyin('O3L'))
+    job.echo()
+    job.echo('***')
+    job.echo('*** Now running compiled program')
+    job.echo('***')
+    job.punch = b''
+    job.simulate(jump=16, ptin=b'' if job.save is None else job.save,
+                 ttyin=ttyin('MM'))
+    job.echo()
+    job.echo('***')
+    job.echo('*** Program run complete.')
+    job.echo('***')
+    text = job.punchText()
+    job.echo()
+    job.echo('***')
+    if text == '':
+        job.echo('*** No punch output ***')
+        job.echo('***')
+    else:
+        job.echo('*** Punch output ***')
+        job.echo('***')
+        job.out.write(text)
+    job.echo()
+    return job.code
+
+languages = {'algol': algol, '903fortran': fortran903, 'sir': sir,
+             '905fortran': fortran905}
+
+def sourcePath (language, name):
+    # a source file name can be given relative to src/<language>
+    if os.path.exists(name):
+        return name
+    folder = '903sir' if language == 'sir' else language
+    for candidate in (name, name + '.txt'):
+        path = systemPath(os.path.join('src', folder, candidate))
+        if os.path.exists(path):
+            return path
+    return name
+
+def runJob (language, source, out=None, limit=sim900.defaultLimit,
+            cache=None):
+    # run a complete job, returns the Job
+    job = Job(out, limit, cache)
+    languages[language](job, sourcePath(language, source))
+    return job
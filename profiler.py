@@ -0,0 +1,161 @@
+# Execution profiler - Andrew Herbert - 18/10/2026
+
+# A Profile is filled in by Machine.runProfiled(), used by 900sim.py when
+# -profile is given.  It counts executions of each store address and each
+# function code, jumps taken and not taken by the conditional jumps 7 and
+# 9, backward jumps (the ends of loops) and for each input/output device
+# the instructions executed and time taken since the previous input/output
+# instruction.  The counters are arrays indexed by address so counting
+# costs little.
+
+# report() prints a flat profile of the hot addresses, annotated with the
+# contents of store in the format used by storeprint.py, the hot loops,
+# the function code and input/output counts and a coverage map of the
+# addresses executed.  asJSON() gives the same information for other
+# programs to use.
+
+import time
+from array import array
+
+import storefile
+
+maxStore = 16*1024
+
+# input/output instructions counted, 15 <address>
+ioOps   = (2048, 2052, 6144, 6148)
+ioNames = ('paper tape in', 'teletype in', 'paper tape out', 'teletype out')
+
+functionNames = ('load B', 'add', 'negate add', 'store Q', 'load A',
+                 'store A', 'collate', 'jump zero', 'jump', 'jump negative',
+                 'count', 'store S', 'multiply', 'divide', 'shift',
+                 'input/output')
+
+def counters (n):
+    return array('Q', bytes(8*n))
+
+class Profile:
+
+    def __init__ (self):
+        self.counts    = counters(maxStore) # executions by address
+        self.functions = counters(16)       # executions by function code
+        self.taken     = counters(maxStore) # 7 and 9 jumps taken
+        self.notTaken  = counters(maxStore) # 7 and 9 jumps not taken
+        self.backward  = counters(maxStore) # jumps taken to an earlier address
+        self.ioCounts  = counters(len(ioOps))
+        self.ioGaps    = counters(len(ioOps)) # instructions before each
+        self.ioMaxGap  = counters(len(ioOps))
+        self.ioSeconds = array('d', bytes(8*len(ioOps)))
+        self.lastIO    = 0           # instruction count at last i/o
+        self.lastTime  = time.time() # and time
+
+    def inOut (self, op, instructions):
+        # called for each input/output instruction, instructions is the
+        # total executed so far
+        if op in ioOps:
+            i = ioOps.index(op)
+            now = time.time()
+            gap = instructions - self.lastIO
+            self.ioCounts[i]  += 1
+            self.ioGaps[i]    += gap
+            self.ioSeconds[i] += now - self.lastTime
+            if gap > self.ioMaxGap[i]:
+                self.ioMaxGap[i] = gap
+            self.lastIO   = instructions
+            self.lastTime = now
+
+    def total (self):
+        return sum(self.functions)
+
+    def hot (self, top):
+        # the top most executed addresses, most executed first
+        executed = [addr for addr in range(maxStore) if self.counts[addr]]
+        executed.sort(key=lambda addr: -self.counts[addr])
+        return executed[:top]
+
+    def loops (self, store, top):
+        # (first, last, iterations, instructions) for the loops closed by
+        # the top most taken backward jumps, instructions counts everything
+        # executed from first to last
+        loops = []
+        for addr in range(maxStore):
+            if self.backward[addr]:
+                if store[addr] >= 131072:
+                    continue # B modified jump, target not known
+                first = store[addr] & 8191 | addr & 0o160000
+                if first > addr:
+                    continue # jump rewritten since
+                inside = sum(self.counts[first:addr+1])
+                loops.append((first, addr, self.backward[addr], inside))
+        loops.sort(key=lambda loop: -loop[2])
+        return loops[:top]
+
+    def asJSON (self, store, top=50):
+        # a dictionary suitable for json.dump()
+        def nonzero (counts):
+            return {str(addr): counts[addr] for addr in range(maxStore)
+                                            if counts[addr]}
+        return {'instructions': self.total(),
+                'functions': {functionNames[f]: self.functions[f]
+                              for f in range(16)},
+                'addresses': nonzero(self.counts),
+                'taken': nonzero(self.taken),
+                'notTaken': nonzero(self.notTaken),
+                'hot': self.hot(top),
+                'loops': [{'first': first, 'last': last,
+                           'iterations': iterations,
+                           'instructions': inside}
+                          for first, last, iterations, inside
+                          in self.loops(store, top)],
+                'io': {ioNames[i]: {'count': self.ioCounts[i],
+                                    'instructions': self.ioGaps[i],
+                                    'maxInstructions': self.ioMaxGap[i],
+                                    'seconds': self.ioSeconds[i]}
+                       for i in range(len(ioOps))},
+                'coverage': [addr for addr in range(maxStore)
+                             if self.counts[addr]]}
+
+    def report (self, store, out, top=50):
+        total = self.total()
+        percent = 100.0 / total if total else 0.0
+        print('Flat profile, %d instructions\n' % total, file=out)
+        print('   count      %   cum %  word', file=out)
+        cumulative = 0
+        for addr in self.hot(top):
+            n = self.counts[addr]
+            cumulative += n
+            jumps = ''
+            if self.taken[addr] or self.notTaken[addr]:
+                jumps = '  taken %d not taken %d' % (self.taken[addr],
+                                                    self.notTaken[addr])
+            print('%8d %6.2f %6.2f  %s%s' %
+                  (n, n*percent, cumulative*percent,
+                   storefile.formatWord(addr, store[addr]), jumps), file=out)
+        print('\nLoops\n', file=out)
+        print(' first   last  iterations  instructions      %', file=out)
+        for first, last, iterations, inside in self.loops(store, top):
+            print('%6d %6d %11d %13d %6.2f' %
+                  (first, last, iterations, inside, inside*percent), file=out)
+        print('\nFunctions\n', file=out)
+        for f in range(16):
+            n = self.functions[f]
+            print('%2d %-14s %12d %6.2f' % (f, functionNames[f], n,
+                                             n*percent), file=out)
+        print('\nInput/output\n', file=out)
+        print('device            count  instructions   mean before  '
+              'max before   seconds', file=out)
+        for i in range(len(ioOps)):
+            n = self.ioCounts[i]
+            print('%-14s %8d %13d %13.1f %11d %9.3f' %
+                  (ioNames[i], n, self.ioGaps[i],
+                   self.ioGaps[i] / n if n else 0.0, self.ioMaxGap[i],
+                   self.ioSeconds[i]), file=out)
+        print('\nCoverage, # executed, . not executed\n', file=out)
+        self.coverageMap(out)
+
+    def coverageMap (self, out, width=64):
+        # a line for each width addresses, omitting lines with nothing run
+        for start in range(0, maxStore, width):
+            line = ''.join('#' if self.counts[addr] else '.'
+                           for addr in range(start, start+width))
+            if '#' in line:
+                print('%5d: %s' % (start, line), file=out)
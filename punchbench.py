@@ -0,0 +1,77 @@
+# Punch and teleprinter output benchmark - Andrew Herbert - 18/10/2026
+
+# Times a program that does nothing but output characters, to measure the
+# cost of the simulated punch and teleprinter rather than of instruction
+# execution:
+#
+#   10  15 6144   punch A, or 15 6148 to print it on the teleprinter
+#   11  10   20   count in 20
+#   12   4   20   load A from 20
+#   13   9   10   jump to 10 while negative
+#   14   8   14   dynamic stop
+#
+# with -n in location 20.  Punch output goes to a file, teleprinter
+# output to /dev/null.
+
+# Usage: python3 punchbench.py [-n N] [-repeat R] [-tty] [-linebuffer]
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+import sim900
+from sim900 import makeIns
+
+def getArgs ():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', help='characters output per run', type=int,
+                        default=100000)
+    parser.add_argument('-repeat', help='number of runs', type=int,
+                        default=5)
+    parser.add_argument('-tty', help='output to the teleprinter',
+                        action='store_true')
+    parser.add_argument('-linebuffer', help='line buffered teleprinter',
+                        action='store_true')
+    args = parser.parse_args()
+    if not (1 <= args.n <= 131072):
+        parser.error('n must be in range 1-131072')
+    return args
+
+def program (machine, n, device):
+    store = machine.store
+    store[10] = makeIns(0, 15, device)
+    store[11] = makeIns(0, 10, 20)
+    store[12] = makeIns(0,  4, 20)
+    store[13] = makeIns(0,  9, 10)
+    store[14] = makeIns(0,  8, 14)
+    store[20] = -n & sim900.mask18
+    machine.flushDecoded()
+
+def main ():
+    args = getArgs()
+    device = 6148 if args.tty else 6144
+    best = None
+    with tempfile.TemporaryDirectory() as directory, \
+         open(os.devnull, 'w') as devnull:
+        for i in range(args.repeat):
+            machine = sim900.Machine()
+            machine.ttyOut = devnull
+            machine.lineBuffered = args.linebuffer
+            machine.attachPunch(os.path.join(directory, 'punch'))
+            program(machine, args.n, device)
+            machine.start(10)
+            start = time.perf_counter()
+            code = machine.run()
+            machine.close()
+            seconds = time.perf_counter() - start
+            if code != sim900.dynStop:
+                print('run failed -', machine.message, file=sys.stderr)
+                sys.exit(code)
+            best = seconds if best is None else min(best, seconds)
+    print('%s: %d characters in %.4fs, %.0f characters/second' %
+          ('teleprinter' if args.tty else 'punch', args.n, best,
+           args.n / best))
+
+main()
@@ -0,0 +1,162 @@
+# Time sliced machines - Andrew Herbert - 18/10/2026
+
+# Runs many machines in one process under asyncio, each attached to a
+# teletype connection, e.g., a TCP or Unix domain socket.  The machines are
+# run in turn, sliceSize instructions at a time with Machine.runSlice(),
+# between which the event loop delivers what has been typed and sends what
+# has been printed.  A machine reading the teletype when nothing has been
+# typed is parked, taking no time, until something is, when it is put at
+# the front of the queue so that the echo comes back at once.  A machine
+# whose output the connection is not taking is parked until it does.
+#
+# Typical use:
+#
+#     scheduler = Scheduler()
+#     asyncio.ensure_future(scheduler.run())
+#     ... for each connection (reader, writer) ...
+#         await Session(scheduler, machine, reader, writer).serve()
+#
+# A session ends when its machine stops, after printing why on the
+# teletype, or when the other end closes the connection.
+
+import asyncio
+from collections import deque
+
+import sim900
+from sim900 import dynStop, ttyWait
+
+sliceSize   = 10000     # instructions run before giving others a turn
+outputLimit = 64*1024   # bytes unsent before a machine is parked
+readSize    = 4096      # bytes of typing taken at a time
+
+class Teleprinter:
+    # the machine's ttyOut, writing to a connection
+
+    def __init__ (self, writer):
+        self.writer = writer
+
+    def write (self, text):
+        if not self.writer.is_closing():
+            self.writer.write(text.encode('ascii'))
+
+    def flush (self):
+        pass
+
+class Session:
+    # a machine and its teletype connection
+
+    def __init__ (self, scheduler, machine, reader, writer,
+                  limit=sim900.defaultLimit):
+        self.scheduler = scheduler
+        self.machine   = machine
+        self.reader    = reader
+        self.writer    = writer
+        self.left      = limit  # instructions left to run
+        self.parked    = False  # waiting for typing
+        self.finished  = asyncio.get_event_loop().create_future()
+        machine.ttyOut = Teleprinter(writer)
+        machine.attachTTYIn(data=bytearray(), wait=True)
+
+    async def serve (self):
+        # run the session until the machine stops or the connection closes
+        self.scheduler.add(self)
+        typing = asyncio.ensure_future(self.keyboard())
+        try:
+            await self.finished
+        finally:
+            typing.cancel()
+            self.scheduler.remove(self)
+            self.machine.close()
+            self.writer.close()
+
+    async def keyboard (self):
+        try:
+            while True:
+                data = await self.reader.read(readSize)
+                if len(data) == 0:
+                    break
+                self.machine.typeIn(data)
+                self.unpark()
+        except OSError:
+            pass
+        self.finish() # connection closed
+
+    def unpark (self):
+        if self.parked:
+            self.parked = False
+            self.scheduler.add(self, first=True)
+
+    def runSlice (self):
+        # run the machine for a slice, returns True if it can run on
+        machine = self.machine
+        before  = machine.instructions
+        code = machine.runSlice(min(sliceSize, self.left))
+        self.left -= machine.instructions - before
+        if code is None and self.left == 0:
+            code = machine.limitStopped()
+        if code is None:
+            return True
+        if code == ttyWait:
+            self.parked = True
+            return False
+        self.machine.ttyOut.write('\n*** %s\n' % machine.message
+                                  if code == dynStop else
+                                  '\n*** Halted - %s\n' % machine.message)
+        self.finish()
+        return False
+
+    def finish (self):
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+    def blocked (self):
+        # True if the connection is not taking the machine's output
+        return self.writer.transport.get_write_buffer_size() > outputLimit
+
+    async def drain (self):
+        try:
+            await self.writer.drain()
+        except OSError:
+            self.finish()
+            return
+        self.scheduler.add(self)
+
+class Scheduler:
+    # runs the sessions ready to run in turn
+
+    def __init__ (self):
+        self.ready    = deque()
+        self.sessions = set()
+        self.wake     = asyncio.Event()
+
+    def add (self, session, first=False):
+        self.sessions.add(session)
+        if session in self.ready:
+            return
+        if first:
+            self.ready.appendleft(session)
+        else:
+            self.ready.append(session)
+        self.wake.set()
+
+    def remove (self, session):
+        self.sessions.discard(session)
+        if session in self.ready:
+            self.ready.remove(session)
+
+    async def run (self):
+        while True:
+            if len(self.ready) == 0:
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+            session = self.ready.popleft()
+            if session.finished.done():
+                continue
+            if session.runSlice():
+                if session.blocked():
+                    asyncio.ensure_future(session.drain())
+                else:
+                    self.ready.append(session)
+            # let the event loop deliver typing and output
+            await asyncio.sleep(0)
@@ -0,0 +1,1781 @@
+# Elliott 903 machine - Andrew Herbert - 18/10/2026
+
+# The Elliott 903 / 920B simulator as an importable Machine object, so that
+# many simulated machines can be hosted in one Python process.  900sim.py is
+# a thin command line wrapper around this module.
+
+# Does not implement 'undefined' effects
+# Has simplified handling of priority levels and initial orders.
+
+# Typical use:
+#
+#     m = Machine()
+#     m.loadStore('.store')
+#     m.attachReader('x3_iss4')
+#     m.establishInitialInstructions()
+#     m.start(8181)
+#     code = m.run(limit)
+#
+# run() returns one of the exit codes below.  Unlike 900sim.py the machine
+# never calls sys.exit, it records the reason for stopping in m.message.
+
+import io
+import sys
+import os.path
+import mmap
+from array import array
+
+import storefile
+import tracefile
+import undolog
+
+# Exit codes
+
+dynStop   =   0  # dynamic stop
+rdrStop   =   1  # run off paper tape
+ttyStop   =   2  # run off tty input
+limitStop =   3  # reached execution limit
+ttyWait   =   5  # runSlice() only, waiting for teletype input
+breakStop =   6  # runSlice() only, at a breakpoint or watchpoint
+otherStop = 255  # unspecified error
+
+class MachineStop (Exception):
+    # raised by failure() to unwind out of run()
+    def __init__ (self, msg, code):
+        Exception.__init__(self, msg)
+        self.msg  = msg
+        self.code = code
+
+def failure (s, code):
+    raise MachineStop(s, code)
+
+# Useful constants for 18 and 13 bit arithmetic
+bit19    = 1<<18    # arithmetic is 2's complement 18 bits
+mask18   = 0o777777
+bit18    = 1<<17
+mask16   = 0o177777 # absolute addresses are 16 bits
+addrMask = 8191     # offset within module in an absolute address
+modMask  = 0o160000 # module number in an absolute address
+
+# Function to convert 18 bit values to numbers
+def normal (n):
+    if n >= bit18:
+        return n - bit19
+    else:
+        return n
+
+# 16K store
+maxStore = 16*1024
+
+def newStore ():
+    # store is held as an array of 32 bit words
+    return array('i', bytes(4*maxStore))
+
+# Addresses of b register and sequence control register depend on level
+sLevel1 = 0
+bLevel1 = 1
+sLevel4 = 6
+bLevel4 = 7
+
+defaultLimit = 200000000 # about one hundred hours of computation
+
+# Basic block translation
+maxBlock   = 64 # longest straight line run translated as one block
+hotCount   =  8 # executions of an address before it is translated
+maxRewrite =  2 # rewrites of translated code before an address is volatile
+
+longLoop   = -1 << 40 # returned by a loop block wanting the instruction budget
+atBreak    = -2 << 40 # returned by breakBlock()
+
+def breakBlock (aReg, qReg, budget=None):
+    # the block at a breakpoint, see Machine.setBreak()
+    return aReg, qReg, atBreak
+
+outputBuffer = 64*1024 # bytes of punch or teleprinter output held back
+
+ioDevices = ('reader', 'ttyIn', 'punch', 'teleprinter') # in stats()
+
+class TraceTrigger:
+    # selects which instructions are traced: those with an address from low
+    # to high, after the first after instructions and from the first
+    # execution of address at, every every'th one, up to records of them
+    # (0 for no limit).  after, armed, left and sample record progress so
+    # that a trigger carries on over successive runs.
+
+    def __init__ (self, low=0, high=maxStore-1, after=0, at=None,
+                  records=0, every=1):
+        self.low     = low
+        self.high    = high
+        self.after   = after
+        self.at      = at
+        self.every   = every
+        self.armed   = at is None # traced address seen
+        self.left    = records    # records still to trace, 0 for no limit
+        self.sample  = every      # instructions until next sample
+
+def mapTape (path):
+    # the contents of a tape file, mapped into memory rather than read
+    with open(path, 'rb') as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # an empty file cannot be mapped
+            return b''
+
+def makeIns (m, f, n):
+    # create an instruction from m, f and n fields
+    return (((m << 4) + f) << 13) + n
+
+# The initial orders, in 8180 to 8191
+initialOrders = [-3 & mask18,
+                 makeIns(0,  0, 8180),
+                 makeIns(0,  4, 8189),
+                 makeIns(0, 15, 2048),
+                 makeIns(0,  9, 8186),
+                 makeIns(0,  8, 8183),
+                 makeIns(0, 15, 2048),
+                 makeIns(1,  5, 8180),
+                 makeIns(0, 10,    1),
+                 makeIns(0,  4,    1),
+                 makeIns(0,  9, 8182),
+                 makeIns(0,  8, 8177)]
+
+class Machine:
+
+    __slots__ = ('store', 'aReg', 'qReg', 'level', 'scr', 'bReg', 'lastS',
+                 'functions', 'instructions', 'message',
+                 'storeImage', 'storeImagePath',
+                 'decoded', 'decodeLookups', 'decodeMisses',
+                 'translating', 'blocks', 'blockEnds', 'covers', 'heat',
+                 'rewrites', 'translations', 'loopTranslations', 'blockDrops',
+                 'blockInstructions', 'tallies',
+                 'functionCounts', 'blockCounts', 'modifiedCount', 'ioCounts',
+                 'levelChanges', 'fastLoaded', 'monitor', 'monitorEvery',
+                 'monitorDue', 'breaks', 'watches', 'undoLog',
+                 'ptrPath', 'ptrBuf', 'ptrIdx', 'ptpPath', 'ptpFile', 'ptpBuf',
+                 'ttyInPath', 'ttyInBuf', 'ttyInIdx', 'ttyInWait',
+                 'ttyOut', 'ttyBuf',
+                 'lineBuffered', 'traceFile',
+                 'traceTrigger', 'profile')
+
+    def __init__ (self, store=None):
+        self.store = newStore() if store is None else store
+        # Accumulator and extension (Q register)
+        self.aReg  = 0
+        self.qReg  = 0
+        # Interrupt level - will be either 1 or 4. real machine has 1, 2, 3, 4
+        self.level = 1
+        self.scr   = sLevel1
+        self.bReg  = bLevel1
+        self.lastS = 0  # detect a dynamic stop if SCR isn't changed
+        # function code mapping to functions
+        self.functions = [self.loadB,    self.add,          self.negAdd,
+                          self.storeQ,   self.loadA,        self.storeALevel1,
+                          self.collate,  self.jumpZ,        self.jump,
+                          self.jumpN,    self.count,        self.storeS,
+                          self.multiply, self.divide,       self.shift,
+                          self.inOut]
+        self.storeImage     = None # store file contents as last read or
+        self.storeImagePath = None # written, for writing back changes only
+        self.instructions = 0    # total executed over all runs
+        self.message      = None # reason for last stop
+        # Predecoded instructions, (function, address, modified) or None
+        self.decoded       = [None] * maxStore
+        self.decodeLookups = 0
+        self.decodeMisses  = 0
+        # Translated blocks, see translate()
+        self.translating       = True
+        self.blocks            = [None] * maxStore # function for block at addr
+        self.blockEnds         = [0] * maxStore    # address after block
+        self.covers            = [None] * maxStore # blocks containing addr
+        self.heat              = [0] * maxStore    # executions of addr
+        self.rewrites          = bytearray(maxStore)
+        self.translations      = 0
+        self.loopTranslations  = 0
+        self.blockDrops        = 0
+        self.blockInstructions = 0
+        self.tallies           = {} # start: (runs, body) of each block
+        # Counts of the instructions run, see stats()
+        self.functionCounts = [0] * 16 # instructions by function code
+        self.blockCounts    = [0] * 16 # those run in translated blocks
+        self.modifiedCount  = 0        # B modified instructions
+        self.ioCounts       = {name: 0 for name in ioDevices} # bytes
+        self.levelChanges   = 0        # level terminates entering level 4
+        self.fastLoaded     = 0        # instructions done by fastload.py
+        self.monitor        = None     # called every monitorEvery
+        self.monitorEvery   = 0        # instructions, see setMonitor()
+        self.monitorDue     = 0
+        # Debugging, see setBreak() and setWatch()
+        self.breaks  = {}    # address: condition(A, Q) or None
+        self.watches = set() # addresses
+        self.undoLog = None  # undolog.UndoLog when recording
+        # Peripherals, opened on first use
+        self.ptrPath   = None
+        self.ptrBuf    = None
+        self.ptrIdx    = 0
+        self.ptpPath   = None
+        self.ptpFile   = None
+        self.ptpBuf    = bytearray() # punch output not yet written
+        self.ttyInPath = None
+        self.ttyInBuf  = None
+        self.ttyInIdx  = 0
+        self.ttyInWait = False # wait for more teletype input at the end
+        self.ttyOut    = sys.stdout
+        self.ttyBuf    = bytearray() # teleprinter output not yet written
+        self.lineBuffered = False    # write teleprinter output line by line
+        self.traceFile = None
+        self.traceTrigger = None # TraceTrigger, None to trace everything
+        self.profile   = None # profiler.Profile when profiling
+
+    # Store
+
+    def clearStore (self):
+        self.store[:] = newStore()
+        self.flushDecoded()
+
+    # Any write to the store from outside the instruction handlers must
+    # be followed by flushDecoded() or invalidate(addr), which discard
+    # predecoded instructions and translated blocks
+
+    def flushDecoded (self):
+        self.decoded[:] = [None] * maxStore
+        self.flushBlocks()
+
+    def flushBlocks (self):
+        for start in self.tallies:
+            self.countTally(start)
+        self.tallies.clear()
+        self.blocks[:] = [None] * maxStore
+        self.covers[:] = [None] * maxStore
+        self.heat[:]   = [0] * maxStore
+        for addr in self.breaks:
+            self.blocks[addr] = breakBlock
+        for addr in self.watches:
+            self.covers[addr] = []
+
+    def invalidate (self, addr):
+        self.decoded[addr] = None
+        if not (self.covers[addr] is None):
+            self.dropBlocks(addr)
+
+    def setStore (self, words):
+        # replace the contents of store, keeping decoded instructions and
+        # translated blocks for words that are unchanged
+        store = self.store
+        for addr in range(min(len(words), maxStore)):
+            if store[addr] != words[addr]:
+                store[addr] = words[addr]
+                self.invalidate(addr)
+
+    # loadStore, saveStore -- dump out store to a file, to enable store to
+    # be preserved between runs, see storefile.py for the formats
+
+    def loadStore (self, path):
+        # if path exists, read in contents of store
+        if not os.path.exists(path):
+            self.clearStore()
+        else:
+            words = storefile.readStore(path)[:maxStore]
+            self.store[:len(words)] = words
+            self.flushDecoded()
+            if storefile.isBinary(path):
+                self.storeImage     = storefile.imageBytes(self.store)
+                self.storeImagePath = path
+
+    def saveStore (self, path, text=False):
+        # a binary file just read or written only has changed pages written
+        original = self.storeImage if path == self.storeImagePath else None
+        storefile.writeStore(path, self.store, text, original)
+        if text:
+            self.storeImage = self.storeImagePath = None
+        else:
+            self.storeImage     = storefile.imageBytes(self.store)
+            self.storeImagePath = path
+
+    # Simulate initial orders by writing them to store
+    def establishInitialInstructions (self):
+        self.store[8180:8192] = array('i', initialOrders)
+        self.flushDecoded()
+
+    # Counts of the instructions run are kept all the time, cheaply: the
+    # interpreter counts each instruction by function code, and whether B
+    # modified, but a translated block only counts how many times it left
+    # after each of its instructions, in tallies[start].  Those are turned
+    # into counts by function code, in blockCounts, when the block is
+    # dropped or stats() called.  The instructions done by fastload.py are
+    # only counted in instructions and fastLoaded.
+
+    def stats (self):
+        # run statistics as a dictionary
+        for start in self.tallies:
+            self.countTally(start)
+        functions = [self.functionCounts[f] + self.blockCounts[f]
+                     for f in range(16)]
+        hits = self.decodeLookups - self.decodeMisses
+        return {'instructions' : self.instructions,
+                'functions'    : functions,
+                'modified'     : self.modifiedCount,
+                'unmodified'   : sum(functions) - self.modifiedCount,
+                'fastLoaded'   : self.fastLoaded,
+                'io'           : dict(self.ioCounts),
+                'levelChanges' : self.levelChanges,
+                'decodeHits'   : hits,
+                'decodeMisses' : self.decodeMisses,
+                'decodeHitRate': (hits / self.decodeLookups
+                                  if self.decodeLookups else 0.0),
+                'translations' : self.translations,
+                'loopTranslations': self.loopTranslations,
+                'blockDrops'   : self.blockDrops,
+                'blockInstructions': self.blockInstructions,
+                'blockRate'    : (self.blockInstructions / self.instructions
+                                  if self.instructions else 0.0)}
+
+    def clearStats (self):
+        # start the statistics again, as for a new machine
+        for start in self.tallies:
+            runs = self.tallies[start][0]
+            runs[:] = [0] * len(runs)
+        self.instructions      = 0
+        self.decodeLookups     = 0
+        self.decodeMisses      = 0
+        self.translations      = 0
+        self.loopTranslations  = 0
+        self.blockDrops        = 0
+        self.blockInstructions = 0
+        self.functionCounts[:] = [0] * 16
+        self.blockCounts[:]    = [0] * 16
+        self.modifiedCount     = 0
+        self.ioCounts          = {name: 0 for name in ioDevices}
+        self.levelChanges      = 0
+        self.fastLoaded        = 0
+
+    def countTally (self, start):
+        # add the instructions counted by the block at start to the
+        # counts by function code, clearing its tally
+        runs, body = self.tallies[start]
+        blockCounts = self.blockCounts
+        for n in range(1, len(runs)):
+            times = runs[n] # times left after the n'th instruction
+            if times != 0:
+                runs[n] = 0
+                self.blockInstructions += n * times
+                for f, modified in body[:n]:
+                    blockCounts[f] += times
+                    if modified:
+                        self.modifiedCount += times
+
+    def setMonitor (self, monitor, every):
+        # call monitor(machine) each time about every instructions have
+        # been run, e.g., to sample machine.stats(), None for no monitor
+        self.monitor      = monitor
+        self.monitorEvery = every
+        self.monitorDue   = every
+
+    def start (self, addr):
+        # initialise sequence control register
+        self.store[self.scr] = addr
+
+    # Registers and input positions, the machine state not held in store
+
+    def getState (self):
+        return {'aReg': self.aReg, 'qReg': self.qReg, 'level': self.level,
+                'lastS': self.lastS, 'ptrIdx': self.ptrIdx,
+                'ttyInIdx': self.ttyInIdx, 'instructions': self.instructions}
+
+    def setState (self, state):
+        self.aReg         = state['aReg']
+        self.qReg         = state['qReg']
+        self.lastS        = state['lastS']
+        self.ptrIdx       = state['ptrIdx']
+        self.ttyInIdx     = state['ttyInIdx']
+        self.instructions = state['instructions']
+        self.setLevel(state['level'])
+
+    def setLevel (self, level):
+        self.level = level
+        if level == 1:
+            self.scr  = sLevel1
+            self.bReg = bLevel1
+            self.functions[5] = self.storeALevel1
+        else:
+            self.scr  = sLevel4
+            self.bReg = bLevel4
+            self.functions[5] = self.storeALevel4
+        self.flushBlocks() # translated for the previous SCR and B
+
+    # Execution tracing, see tracefile.py for the trace formats
+
+    def startTracing (self, path, text=False, ring=0, trigger=None):
+        # ring > 0 keeps only the last ring records, written when run stops
+        try:
+            self.traceFile = tracefile.openTrace(path, text, ring)
+        except:
+            failure('cannot open trace file ' + path, otherStop)
+        self.traceTrigger = trigger
+
+    def endTracing (self):
+        if not (self.traceFile is None):
+            self.traceFile.close()
+            self.traceFile = None
+
+    def trace (self, s):
+        if not (self.traceFile is None):
+            self.traceFile.message(s)
+
+    # Paper tape input/output
+
+    def attachReader (self, path=None, data=None, offset=0):
+        # mount a tape in the reader, either a file mapped on first use or
+        # bytes, positioned offset bytes in
+        self.ptrPath = path
+        self.ptrBuf  = data
+        self.ptrIdx  = offset
+
+    def attachTTYIn (self, path=None, data=None, offset=0, wait=False):
+        # with wait, reading past the end of the input stops runSlice()
+        # with ttyWait instead of failing, to be run again once typeIn()
+        # has supplied more
+        self.ttyInPath = path
+        self.ttyInBuf  = data
+        self.ttyInIdx  = offset
+        self.ttyInWait = wait
+
+    def typeIn (self, data):
+        # add to teletype input attached with wait, dropping what has been
+        # read once it is most of the buffer
+        if self.ttyInIdx >= 4096 and 2*self.ttyInIdx >= len(self.ttyInBuf):
+            del self.ttyInBuf[:self.ttyInIdx]
+            self.ttyInIdx = 0
+        self.ttyInBuf += data
+
+    def attachPunch (self, path=None, offset=None):
+        # punch to a file opened on first use, or if path is None to memory.
+        # Given an offset, punching carries on after the first offset bytes
+        # of an existing file
+        self.closePunch()
+        self.ptpPath = path
+        if not (offset is None):
+            try:
+                self.ptpFile = open(path, 'r+b')
+                self.ptpFile.truncate(offset)
+                self.ptpFile.seek(offset)
+            except: failure('cannot reopen paper tape output file ' +
+                            str(path), otherStop)
+
+    def punchPosition (self):
+        # bytes punched since attachPunch(), None if nothing was
+        if self.ptpFile is None:
+            return None
+        self.flushPunch()
+        return self.ptpFile.tell()
+
+    def punchOutput (self):
+        # everything punched since attachPunch(), None if nothing was
+        if self.ptpFile is None:
+            return None
+        self.flushPunch()
+        if self.ptpPath is None:
+            return self.ptpFile.getvalue()
+        self.ptpFile.flush()
+        with open(self.ptpPath, 'rb') as f:
+            return f.read()
+
+    def reset (self):
+        # as after pressing reset, the store is left untouched
+        self.aReg    = 0
+        self.qReg    = 0
+        self.lastS   = 0
+        self.message = None
+        if self.level != 1:
+            self.setLevel(1)
+        self.close()
+        self.attachReader()
+        self.attachTTYIn()
+        self.attachPunch()
+
+    # Unconsumed input, used to simulate leaving tape in reader between runs
+    def readerRemainder (self):
+        return None if self.ptrBuf is None else self.ptrBuf[self.ptrIdx:]
+
+    def ttyInRemainder (self):
+        return None if self.ttyInBuf is None else self.ttyInBuf[self.ttyInIdx:]
+
+    # Close paper tape punch to ensure output to file
+    def closePunch (self):
+        self.flushPunch()
+        if not (self.ptpFile is None or self.ptpPath is None):
+            self.ptpFile.close()
+        self.ptpFile = None
+
+    def close (self):
+        self.endTracing()
+        self.flushTTY()
+        self.closePunch()
+
+    # Punch and teleprinter output is collected in a bytearray and written
+    # out in large blocks, when a run stops and when the machine is closed
+    def flushPunch (self):
+        if len(self.ptpBuf) != 0:
+            self.ptpFile.write(self.ptpBuf)
+            self.ptpBuf.clear()
+
+    def flushTTY (self):
+        if len(self.ttyBuf) != 0:
+            self.ttyOut.write(self.ttyBuf.decode('ascii'))
+            self.ttyBuf.clear()
+            if self.lineBuffered:
+                self.ttyOut.flush()
+
+    def flushOutput (self):
+        self.flushTTY()
+        if not (self.ptpFile is None):
+            self.flushPunch()
+
+    # Read input paper tape
+    def readTape (self):
+        if self.ptrBuf is None:
+            try:
+                self.ptrBuf = mapTape(self.ptrPath) # open on first 15 2048
+            except: failure('cannot open ptr input file ' + str(self.ptrPath),
+                            otherStop)
+        if self.ptrIdx >= len(self.ptrBuf):
+            msg = 'run off end of input tape'
+            self.trace(msg)
+            failure(msg, rdrStop)
+        code = self.ptrBuf[self.ptrIdx]
+        self.ptrIdx+=1
+        self.ioCounts['reader'] += 1
+        if not (self.traceFile is None):
+            self.trace('ptr read code %3d' % code)
+        return code
+
+    # Read tty
+    def readTTYIn (self):
+        if self.ttyInBuf is None:
+            try:
+                self.ttyInBuf = mapTape(self.ttyInPath) # on first 15 2052
+            except: failure('cannot open tty input file ' +
+                            str(self.ttyInPath), otherStop)
+        if self.ttyInIdx >= len(self.ttyInBuf):
+            if self.ttyInWait:
+                # back to the input instruction, to be executed again
+                self.store[self.scr] -= 1
+                failure('waiting for tty input', ttyWait)
+            msg = 'run off end of tty input'
+            self.trace(msg)
+            failure(msg, ttyStop)
+        code = self.ttyInBuf[self.ttyInIdx]
+        self.ttyInIdx+=1
+        self.ioCounts['ttyIn'] += 1
+        if not (self.traceFile is None):
+            self.trace('tty read code %3d' % code)
+        return code
+
+    # Output to paper tape punch
+    def openPunch (self):
+        if self.ptpPath is None:
+            self.ptpFile = io.BytesIO()
+        else:
+            try:
+                self.ptpFile = open(self.ptpPath, 'wb') # open on first 15 6144
+            except: failure('cannot open paper tape output file ' +
+                            str(self.ptpPath), otherStop)
+
+    def punchTape (self, code):
+        if self.ptpFile is None:
+            self.openPunch()
+        self.ioCounts['punch'] += 1
+        self.ptpBuf.append(code)
+        if len(self.ptpBuf) >= outputBuffer:
+            self.flushPunch()
+
+    def punchBytes (self, data):
+        if self.ptpFile is None:
+            self.openPunch()
+        self.ptpBuf += data
+        if len(self.ptpBuf) >= outputBuffer:
+            self.flushPunch()
+
+    def writeTTY (self, code):
+        self.ioCounts['teleprinter'] += 1
+        ch = code & 127
+        if ch == 10 or 32 <= ch <= 122:
+            self.ttyBuf.append(ch)
+            if (ch == 10 and self.lineBuffered) or \
+               len(self.ttyBuf) >= outputBuffer:
+                self.flushTTY()
+
+    # Instructions, operate on aReg, qReg and store.
+    # SCR and B register are accessed via the store rather than memoed.
+
+    #  0 Load B
+    def loadB (self, addr):
+        self.qReg = self.store[addr]
+        self.store[self.bReg] = self.qReg
+        self.invalidate(self.bReg)
+
+    #  1 Add
+    def add (self, addr):
+        self.aReg = (self.aReg + self.store[addr]) & mask18
+
+    #  2 Negate and Add
+    def negAdd (self, addr):
+        self.qReg = self.store[addr]
+        self.aReg = (self.qReg - self.aReg) & mask18
+
+    #  3 Store Q
+    def storeQ (self, addr):
+        self.store[addr] = self.qReg >> 1
+        self.invalidate(addr)
+
+    #  4 Load A
+    def loadA (self, addr):
+        self.aReg = self.store[addr]
+
+    #  5 Store A
+
+    def storeALevel1 (self, addr):
+        if 8180 <= addr <= 8191: # need this for FORTRAN to work
+            self.trace('write to initial instructions ignored')
+            return
+        self.store[addr] = self.aReg
+        self.invalidate(addr)
+
+    def storeALevel4 (self, addr):
+        self.store[addr] = self.aReg
+        self.invalidate(addr)
+
+    #  6 Collate
+    def collate (self, addr):
+        self.aReg &= self.store[addr]
+
+    #  7 Jump if zero
+    def jumpZ (self, addr):
+        if self.aReg == 0:
+            self.store[self.scr] = addr
+
+    #  8 Jump unconditional
+    def jump (self, addr):
+        self.store[self.scr] = addr
+
+    #  9 Jump negative
+    def jumpN (self, addr):
+        if self.aReg >= bit18:
+            self.store[self.scr] = addr
+
+    # 10 Count in store
+    def count (self, addr):
+        store = self.store
+        store[addr] = (store[addr] + 1) & mask18
+        self.invalidate(addr)
+
+    # 11 Store S
+    def storeS (self, addr):
+        s = self.store[self.scr]
+        self.qReg = s & modMask
+        self.store[addr] = s & addrMask
+        self.invalidate(addr)
+
+    # 12 Multiply - depends on Python multi-length arithmetic for 36 bit AQ
+    def multiply (self, addr):
+        a = normal(self.aReg)
+        intprod = (a * normal(self.store[addr]))
+        qReg = (intprod <<  1) & mask18
+        # set bit 1 of Q to make X3 happy - spec says "undefined".
+        if a<0:
+            qReg = qReg | 1
+        self.qReg = qReg
+        self.aReg = (intprod >> 17) & mask18
+
+    # 13 Divide
+    def divide (self, addr):
+        aq = (normal(self.aReg) << 18) | self.qReg
+        m  = normal(self.store[addr])
+        intquot = ((aq // m) >> 1) & mask18
+        self.aReg = intquot | 1
+        self.qReg = intquot & 0o777776
+
+    # 14 Shift, etc - depends on Python multi-length arithmetic for 36 bit AQ
+    def shift (self, addr):
+        places = addr & addrMask
+        aq = (self.aReg << 18) | self.qReg
+        if places <= 2047:
+            aq = aq << places
+            self.aReg = (aq >> 18) & mask18
+            self.qReg = aq & mask18
+        elif places >= 6144:
+            places = 8192-places
+            aq = ((normal(self.aReg) << 18) | self.qReg) >> places
+            self.aReg = (aq >> 18) & mask18
+            self.qReg = aq & mask18
+        else:
+            failure('unsupported i/o 14 %4d' % places, otherStop)
+
+    # 15 Input/output etc
+    def inOut (self, addr):
+        opAddr = addr & addrMask
+        if opAddr == 7168:
+            # Level terminate
+            if self.level != 4:
+                self.levelChanges += 1
+            self.setLevel(4)
+        elif opAddr == 2048:
+            byte = self.readTape()
+            self.aReg = ((self.aReg << 7) | byte) & mask18
+        elif opAddr == 2052:
+            byte = self.readTTYIn()
+            self.aReg = ((self.aReg << 7) | byte) & mask18
+        elif opAddr == 6144:
+            self.punchTape(self.aReg & 255)
+        elif opAddr == 6148:
+            self.writeTTY(self.aReg & 255)
+        else:
+            failure('Unsupported i/o 15 %4d' % opAddr, otherStop)
+
+    # Basic block translation
+
+    # A straight line run of instructions ending at a jump is compiled into
+    # a Python function that takes and returns A and Q and keeps them in
+    # locals.  The SCR word is only written when the block exits, or just
+    # before an instruction that could read it, and the count of
+    # instructions executed is returned so the limit is updated once per
+    # block.  A block returns a negative count for a dynamic stop.
+
+    # Input/output, B modified and unsupported shifts, jumps to self and
+    # volatile words (ones rewritten after translation) are left to the
+    # interpreter and end a block before them.  A write that lands in a
+    # translated word drops every block containing that word and leaves
+    # the block doing the write at once, so self modifying code is safe.
+
+    # A loop block from translateLoop() that would execute more than
+    # maxBlock instructions returns longLoop instead, and is called again
+    # with the number of instructions that may be executed before the limit.
+
+    def translate (self, start):
+        # compile the block starting at start, returns None if impossible
+        loop = self.translateLoop(start)
+        if not (loop is None):
+            return loop
+        store  = self.store
+        scr    = self.scr
+        bReg   = self.bReg
+        level  = self.level
+        code   = ['def block (aReg, qReg, store=store, decoded=decoded, '
+                  'covers=covers, blockWrite=blockWrite, runs=runs):']
+        emit   = code.append
+        body   = []
+        pc     = start
+        n      = 0
+        ended  = False
+        watches = self.watches
+        while n < maxBlock and 8 <= pc < maxStore and \
+              self.rewrites[pc] < maxRewrite and not (pc in self.breaks):
+            instruction = store[pc]
+            f = (instruction >> 13) & 15
+            k = (instruction & addrMask) | (pc & modMask)
+            modified = instruction >= bit18
+            places = k & addrMask
+            if f == 15 or (f == 14 and (modified or 2047 < places < 6144)):
+                break
+            if 7 <= f <= 9 and not modified and k == pc:
+                break
+            if watches and ((f == 0 and bReg in watches) or
+                            (f in (3, 5, 10, 11) and
+                             (modified or k in watches))):
+                break # a watched word is written by the interpreter
+            n += 1
+            body.append((f, modified))
+            self.translateIns(emit, pc, n, f, k, modified, scr, bReg, level)
+            pc += 1
+            if 7 <= f <= 9 or (not modified and k == scr and f in (3, 5, 10, 11)):
+                ended = True
+                break
+        if n == 0:
+            return None
+        if not ended:
+            emit('    store[%d] = %d' % (scr, pc))
+            self.translateExit(emit, '    ', n, n)
+        runs = [0] * (n+1)
+        namespace = {'store': store, 'decoded': self.decoded,
+                     'covers': self.covers, 'blockWrite': self.blockWrite,
+                     'runs': runs}
+        exec(compile('\n'.join(code), '<block %d>' % start, 'exec'),
+             namespace)
+        self.translations += 1
+        return self.addBlock(start, pc, namespace['block'], runs, body)
+
+    def addBlock (self, start, end, block, runs, body):
+        # install block for the words from start up to end, runs[n]
+        # counting the times it leaves after the n'th instruction of body
+        self.blocks[start]    = block
+        self.blockEnds[start] = end
+        self.tallies[start]   = (runs, body)
+        covers = self.covers
+        for addr in range(start, end):
+            if covers[addr] is None:
+                covers[addr] = [start]
+            else:
+                covers[addr].append(start)
+        return block
+
+    # Loops that only count, add or shift until a jump condition is met are
+    # run in closed form, working out how many times round the loop it will
+    # go and the outcome directly.  The idioms recognised are:
+    #
+    #   delay   L: 10 C      count in C
+    #              4 C       until C is no longer negative
+    #              9 L
+    #
+    #   wait    L: 1 K       add K to A until A is no longer negative
+    #              9 L
+    #
+    #   normalise  L: 14 1   shift AQ left until A is negative,
+    #                 9 X    counting the shifts in C after the test
+    #                 10 C   or before it (10 C, 9 X swapped)
+    #                 8 L
+    #
+    # with C and K outside the loop and not the SCR.  A loop block runs the
+    # loop to completion if the limit allows and otherwise as many whole
+    # times round as it can, leaving the SCR at L, so the instruction count
+    # is exact.
+
+    def translateLoop (self, start):
+        # returns a loop block for an idiom at start, or None
+        store  = self.store
+        scr    = self.scr
+        ins    = []
+        if start < 8:
+            return None
+        for pc in range(start, min(start+4, maxStore)):
+            instruction = store[pc]
+            if instruction >= bit18 or self.rewrites[pc] >= maxRewrite or \
+               pc in self.breaks:
+                break
+            ins.append(((instruction >> 13) & 15,
+                        (instruction & addrMask) | (pc & modMask)))
+        def outside (addr):
+            # a data word the loop can use
+            return addr != scr and not (start <= addr < start + len(ins)) \
+                   and not (addr in self.watches)
+        invalidate = self.invalidate
+        size = len(ins)
+        runs = [0] * 5 # as for a straight block, see addBlock()
+
+        if size >= 3 and ins[0][0] == 10 and ins[1] == (4, ins[0][1]) and \
+           ins[2] == (9, start) and outside(ins[0][1]):
+            c = ins[0][1]
+            def delay (aReg, qReg, budget=None):
+                v = (store[c] + 1) & mask18
+                k = 1 if v < bit18 else 1 + bit19 - v # times round
+                if budget is None:
+                    if 3*k > maxBlock:
+                        return aReg, qReg, longLoop
+                    budget = maxBlock
+                if 3*k <= budget:
+                    v = 0 if k > 1 else v
+                    store[scr] = start + 3
+                else:
+                    k = budget // 3
+                    v = (store[c] + k) & mask18
+                store[c] = v
+                invalidate(c)
+                runs[3] += k
+                return v, qReg, 3*k
+            block = delay
+            size = 3
+
+        elif size >= 2 and ins[0][0] == 1 and ins[1] == (9, start) and \
+             outside(ins[0][1]):
+            kAddr = ins[0][1]
+            def wait (aReg, qReg, budget=None):
+                step = store[kAddr]
+                v = (aReg + step) & mask18
+                if v < bit18:
+                    k = 1
+                elif step == 0:
+                    k = None # never ends
+                elif step < bit18: # up through the top of the range to 0
+                    k = 1 + (bit19 - v + step - 1) // step
+                else:              # down to the largest positive number
+                    k = 1 + (v - bit18) // (bit19 - step) + 1
+                if budget is None:
+                    if k is None or 2*k > maxBlock:
+                        return aReg, qReg, longLoop
+                    budget = maxBlock
+                if not (k is None) and 2*k <= budget:
+                    store[scr] = start + 2
+                else:
+                    k = budget // 2
+                runs[2] += k
+                return (aReg + k*step) & mask18, qReg, 2*k
+            block = wait
+            size = 2
+
+        elif size == 4 and ins[0] == (14, 1 | (start & modMask)) and \
+             ins[3] == (8, start) and \
+             ((ins[1][0] == 9 and ins[2][0] == 10) or
+              (ins[1][0] == 10 and ins[2][0] == 9)):
+            countFirst = ins[1][0] == 10
+            c    = ins[1][1] if countFirst else ins[2][1]
+            exit = ins[2][1] if countFirst else ins[1][1]
+            if not outside(c):
+                return None
+            last = 3 if countFirst else 2 # instructions in last time round
+            def normalise (aReg, qReg, budget=None):
+                aq = (aReg << 18) | qReg
+                rest = aq & (bit18 << 18) - 1 # bits shifted into the sign
+                k = None if rest == 0 else 36 - rest.bit_length()
+                if budget is None:
+                    if k is None or 4*(k-1) + last > maxBlock:
+                        return aReg, qReg, longLoop
+                    budget = maxBlock
+                if not (k is None) and 4*(k-1) + last <= budget:
+                    counts = k if countFirst else k-1
+                    n = 4*(k-1) + last
+                    store[scr] = exit
+                    runs[4] += k-1
+                    runs[last] += 1
+                else:
+                    k = counts = budget // 4
+                    n = 4*k
+                    runs[4] += k
+                aq = (aq << k) & ((bit19 << 18) - 1)
+                store[c] = (store[c] + counts) & mask18
+                invalidate(c)
+                return aq >> 18, aq & mask18, n
+            block = normalise
+        else:
+            return None
+        self.translations += 1
+        self.loopTranslations += 1
+        return self.addBlock(start, start + size, block, runs,
+                             [(f, False) for f, k in ins[:size]])
+
+    def translateIns (self, emit, pc, n, f, k, modified, scr, bReg, level):
+        # emit Python for the n'th instruction of a block, at address pc
+        if modified:
+            # operand may be the SCR word, so bring it up to date first
+            emit('    store[%d] = %d' % (scr, pc+1))
+            emit('    m = (%d + store[%d]) & %d' % (k, bReg, mask16))
+            addr = 'm'
+        else:
+            if k == scr and not (7 <= f <= 9):
+                emit('    store[%d] = %d' % (scr, pc+1))
+            addr = str(k)
+        if f == 0:   # load B
+            emit('    qReg = store[%s]' % addr)
+            emit('    store[%d] = qReg' % bReg)
+        elif f == 1: # add
+            emit('    aReg = (aReg + store[%s]) & %d' % (addr, mask18))
+        elif f == 2: # negate and add
+            emit('    qReg = store[%s]' % addr)
+            emit('    aReg = (qReg - aReg) & %d' % mask18)
+        elif f == 3: # store Q
+            emit('    store[%s] = qReg >> 1' % addr)
+            self.translateWrite(emit, pc, n, k, modified, scr, '    ')
+        elif f == 4: # load A
+            emit('    aReg = store[%s]' % addr)
+        elif f == 5: # store A
+            if level == 1 and modified:
+                # write to initial instructions ignored
+                emit('    if not (8180 <= m <= 8191):')
+                emit('        store[m] = aReg')
+                self.translateWrite(emit, pc, n, k, modified, scr, '        ')
+            elif level != 1 or not (8180 <= k <= 8191):
+                emit('    store[%s] = aReg' % addr)
+                self.translateWrite(emit, pc, n, k, modified, scr, '    ')
+        elif f == 6: # collate
+            emit('    aReg &= store[%s]' % addr)
+        elif f <= 9: # jumps
+            if f == 8:
+                indent = '    '
+            else:
+                emit('    if aReg %s:' % ('== 0' if f == 7 else '>= %d' % bit18))
+                indent = '        '
+            emit('%sstore[%d] = %s' % (indent, scr, addr))
+            if modified:
+                emit('%sif m == %d:' % (indent, pc))
+                self.translateExit(emit, indent + '    ', n, -n)
+            self.translateExit(emit, indent, n, n)
+            if f != 8:
+                emit('    store[%d] = %d' % (scr, pc+1))
+                self.translateExit(emit, '    ', n, n)
+        elif f == 10: # count in store
+            emit('    store[%s] = (store[%s] + 1) & %d' % (addr, addr, mask18))
+            self.translateWrite(emit, pc, n, k, modified, scr, '    ')
+        elif f == 11: # store S
+            emit('    qReg = %d' % ((pc+1) & modMask))
+            emit('    store[%s] = %d' % (addr, (pc+1) & addrMask))
+            self.translateWrite(emit, pc, n, k, modified, scr, '    ')
+        elif f == 12: # multiply
+            emit('    a = aReg - %d if aReg >= %d else aReg' % (bit19, bit18))
+            emit('    b = store[%s]' % addr)
+            emit('    intprod = a * (b - %d if b >= %d else b)' % (bit19, bit18))
+            emit('    qReg = ((intprod << 1) & %d) | (1 if a < 0 else 0)'
+                 % mask18)
+            emit('    aReg = (intprod >> 17) & %d' % mask18)
+        elif f == 13: # divide
+            emit('    aq = ((aReg - %d if aReg >= %d else aReg) << 18) | qReg'
+                 % (bit19, bit18))
+            emit('    b = store[%s]' % addr)
+            emit('    intquot = ((aq // (b - %d if b >= %d else b)) >> 1) & %d'
+                 % (bit19, bit18, mask18))
+            emit('    aReg = intquot | 1')
+            emit('    qReg = intquot & %d' % 0o777776)
+        else:         # shift, places known to be supported
+            places = k & addrMask
+            if places <= 2047:
+                emit('    aq = ((aReg << 18) | qReg) << %d' % places)
+            else:
+                emit('    aq = (((aReg - %d if aReg >= %d else aReg) << 18)'
+                     ' | qReg) >> %d' % (bit19, bit18, 8192-places))
+            emit('    aReg = (aq >> 18) & %d' % mask18)
+            emit('    qReg = aq & %d' % mask18)
+
+    def translateWrite (self, emit, pc, n, k, modified, scr, indent):
+        # emit the check after a store write, leave the block if it wrote
+        # the SCR word or translated code
+        emit('%sdecoded[%s] = None' % (indent, 'm' if modified else k))
+        if modified:
+            emit('%sif m < 8 or not (covers[m] is None):' % indent)
+            self.translateExit(emit, indent + '    ', n,
+                               'blockWrite(m, %d, %d)' % (pc, n))
+        elif k == scr:
+            self.translateExit(emit, indent, n,
+                               'blockWrite(%d, %d, %d)' % (k, pc, n))
+        elif k >= 8:
+            emit('%sif not (covers[%d] is None):' % (indent, k))
+            self.translateExit(emit, indent + '    ', n,
+                               'blockWrite(%d, %d, %d)' % (k, pc, n))
+
+    def translateExit (self, emit, indent, n, result):
+        # emit leaving the block after its n'th instruction, counted
+        # before blockWrite() can drop the block
+        emit('%sruns[%d] += 1' % (indent, n))
+        emit('%sreturn aReg, qReg, %s' % (indent, result))
+
+    def blockWrite (self, addr, pc, n):
+        # the n'th instruction of a block, at pc, wrote to addr, returns
+        # the count to be returned by the block
+        store = self.store
+        scr   = self.scr
+        if addr == scr:
+            if store[scr] == pc:
+                return -n # dynamic stop
+        else:
+            store[scr] = pc + 1
+        if not (self.covers[addr] is None):
+            self.dropBlocks(addr)
+        return n
+
+    def dropBlocks (self, addr):
+        # discard all translated blocks containing addr, which has been
+        # rewritten
+        if self.covers[addr] and self.rewrites[addr] < maxRewrite:
+            self.rewrites[addr] += 1
+        self.discardBlocks(addr)
+
+    def discardBlocks (self, addr):
+        # discard all translated blocks containing addr
+        blocks = self.blocks
+        covers = self.covers
+        for start in covers[addr]:
+            blocks[start] = None
+            self.countTally(start)
+            del self.tallies[start]
+            self.heat[start] = 0
+            self.blockDrops += 1
+            for a in range(start, self.blockEnds[start]):
+                if a != addr:
+                    covers[a].remove(start)
+                    if not covers[a] and not (a in self.watches):
+                        covers[a] = None
+        covers[addr] = [] if addr in self.watches else None
+
+    # Breakpoints and watchpoints, for debugger.py, are only seen by
+    # runSlice() when neither tracing nor profiling.  A breakpoint is
+    # breakBlock() installed as the block at its address, translate()
+    # ending blocks before it, so it costs nothing until it is reached.
+    # A watched word has covers[addr] set, to [] if no block contains it,
+    # so that an instruction writing it is caught by the check for writes
+    # to translated code, and blocks leave writing it to the interpreter.
+    # runSlice() returns breakStop before executing an instruction at a
+    # breakpoint, or after one writing a watched word, with the reason in
+    # message.  A watched B word is also caught being written by load B.
+
+    def setBreak (self, addr, condition=None):
+        # break at addr, only if condition(A, Q) is true if given
+        if not (self.covers[addr] is None):
+            self.discardBlocks(addr)
+        self.breaks[addr] = condition
+        self.blocks[addr] = breakBlock
+
+    def clearBreak (self, addr):
+        if addr in self.breaks:
+            del self.breaks[addr]
+            self.blocks[addr] = None
+
+    def breakTaken (self, addr, aReg, qReg):
+        # True if the breakpoint at addr, just reached, stops the machine
+        condition = self.breaks[addr]
+        if not (condition is None or condition(aReg, qReg)):
+            return False
+        self.message = 'Breakpoint at %d' % addr
+        return True
+
+    def setWatch (self, addr):
+        self.watches.add(addr)
+        self.flushBlocks() # for blocks to leave writing addr to runFast()
+
+    def clearWatch (self, addr):
+        if addr in self.watches:
+            self.watches.discard(addr)
+            self.flushBlocks()
+
+    def written (self, addr):
+        # an instruction has written addr, which is translated or watched
+        if self.covers[addr]:
+            self.dropBlocks(addr)
+        if addr in self.watches:
+            failure('Watchpoint %d written' % addr, breakStop)
+
+    # Instruction fetch and decode
+
+    def step (self):
+        # execute one instruction, returns True on a dynamic stop
+        store = self.store
+        scr   = self.scr
+        self.lastS = lastS = store[scr]
+        store[scr] = lastS + 1
+        # Fetch instruction and break out fields
+        instruction = store[lastS]
+        f = (instruction >> 13) & 15
+        a = (instruction & addrMask) | (lastS & modMask)
+        m = ((a + store[self.bReg]) if instruction >= bit18 else a) & mask16
+        if not (self.traceFile is None):
+            self.traceFile.record(lastS, instruction, self.aReg, self.qReg,
+                                  store[self.bReg])
+        self.instructions += 1
+        self.functionCounts[f] += 1
+        if instruction >= bit18:
+            self.modifiedCount += 1
+        self.functions[f](m)
+        if store[self.scr] == lastS:
+            self.trace('Dynamic stop at %d' % lastS)
+            return True
+        return False
+
+    def run (self, limit=defaultLimit):
+        # run until a dynamic stop, failure or limit instructions executed
+        try:
+            code = self.runSlice(limit)
+            if code is None:
+                code = self.limitStopped()
+            return code
+        finally:
+            self.flushTrace() # dumps a trace ring
+
+    def runSlice (self, limit):
+        # run up to limit instructions, returning the exit code if the
+        # machine stops first and None if not.  Output is flushed but the
+        # trace is not, so a run can be made of several slices.  ttyWait is
+        # returned when input attached with wait is exhausted, the machine
+        # then being ready to carry on as if the input had been there.  A
+        # monitor, see setMonitor(), is called between pieces of the slice
+        if self.monitor is None:
+            return self.runPiece(limit)
+        while True:
+            before = self.instructions
+            code = self.runPiece(min(limit, self.monitorDue))
+            n = self.instructions - before
+            limit -= n
+            self.monitorDue -= n
+            if self.monitorDue <= 0:
+                self.monitorDue = self.monitorEvery
+                self.monitor(self)
+            if not (code is None) or limit == 0:
+                return code
+
+    def runPiece (self, limit):
+        # runSlice() without the monitor
+        self.message = None
+        try:
+            # choose the loop once, tracing costs nothing when turned off
+            if not (self.profile is None):
+                return self.runProfiled(limit)
+            elif not (self.undoLog is None):
+                return self.runLogged(limit)
+            elif self.traceFile is None:
+                return self.runFast(limit)
+            elif self.traceTrigger is None:
+                return self.runTraced(limit)
+            else:
+                return self.runTriggered(limit)
+        except MachineStop as stop:
+            if stop.code == limitStop:
+                return None
+            if stop.code == ttyWait:
+                self.instructions -= 1 # the input instruction is not done
+                self.functionCounts[15] -= 1
+                if not (self.undoLog is None):
+                    self.undoLog.forget()
+            self.message = stop.msg
+            return stop.code
+        finally:
+            self.flushOutput()
+
+    def flushTrace (self):
+        if not (self.traceFile is None):
+            self.traceFile.flush()
+
+    def dynamicStop (self, lastS):
+        msg = 'Dynamic stop at %d' % lastS
+        self.trace(msg)
+        self.message = msg
+        return dynStop
+
+    def limitReached (self):
+        failure('execution limit reached', limitStop)
+
+    def limitStopped (self):
+        # the end of a run that reached its instruction limit
+        msg = 'execution limit reached'
+        self.trace(msg)
+        self.message = msg
+        return limitStop
+
+    def runTraced (self, limit):
+        # general loop, traces every instruction
+        store     = self.store
+        functions = self.functions
+        record    = self.traceFile.record
+        scr       = self.scr
+        bReg      = self.bReg
+        functionCounts = self.functionCounts
+        modifiedN = 0
+        executed  = 0
+        try:
+            # instruction fetch, decode and execute loop
+            while executed < limit: # break out on a dynamic stop
+                executed += 1
+                # Update SCR
+                lastS = store[scr]
+                store[scr] = lastS + 1
+                # Fetch instruction and break out fields
+                instruction = store[lastS]
+                f = (instruction >> 13) & 15
+                a = (instruction & addrMask) | (lastS & modMask)
+                m = ((a + store[bReg]) if instruction >= bit18 else a) & mask16
+                functionCounts[f] += 1
+                if instruction >= bit18:
+                    modifiedN += 1
+                record(lastS, instruction, self.aReg, self.qReg, store[bReg])
+                functions[f](m)
+                if f == 15: # level terminate moves SCR and B
+                    scr  = self.scr
+                    bReg = self.bReg
+                if store[scr] == lastS:
+                    return self.dynamicStop(lastS)
+        finally:
+            self.lastS = lastS if executed else self.lastS
+            self.instructions += executed
+            self.modifiedCount += modifiedN
+        self.limitReached()
+
+    def runProfiled (self, limit):
+        # general loop, counts instructions executed into self.profile
+        profile   = self.profile
+        counts    = profile.counts
+        fCounts   = profile.functions
+        taken     = profile.taken
+        notTaken  = profile.notTaken
+        backward  = profile.backward
+        store     = self.store
+        functions = self.functions
+        scr       = self.scr
+        bReg      = self.bReg
+        functionCounts = self.functionCounts
+        modifiedN = 0
+        executed  = 0
+        try:
+            # instruction fetch, decode and execute loop
+            while executed < limit: # break out on a dynamic stop
+                executed += 1
+                # Update SCR
+                lastS = store[scr]
+                store[scr] = lastS + 1
+                # Fetch instruction and break out fields
+                instruction = store[lastS]
+                f = (instruction >> 13) & 15
+                a = (instruction & addrMask) | (lastS & modMask)
+                m = ((a + store[bReg]) if instruction >= bit18 else a) & mask16
+                functionCounts[f] += 1
+                if instruction >= bit18:
+                    modifiedN += 1
+                counts[lastS] += 1
+                fCounts[f] += 1
+                if f == 7:
+                    if self.aReg == 0:
+                        taken[lastS] += 1
+                    else:
+                        notTaken[lastS] += 1
+                elif f == 9:
+                    if self.aReg >= bit18:
+                        taken[lastS] += 1
+                    else:
+                        notTaken[lastS] += 1
+                elif f == 15:
+                    profile.inOut(m & addrMask, self.instructions + executed)
+                functions[f](m)
+                if f == 15: # level terminate moves SCR and B
+                    scr  = self.scr
+                    bReg = self.bReg
+                elif 7 <= f <= 9 and store[scr] <= lastS:
+                    backward[lastS] += 1
+                if store[scr] == lastS:
+                    return self.dynamicStop(lastS)
+        finally:
+            self.lastS = lastS if executed else self.lastS
+            self.instructions += executed
+            self.modifiedCount += modifiedN
+        self.limitReached()
+
+    def runLogged (self, limit):
+        # the interpreter of runFast() without blocks, recording each
+        # instruction in self.undoLog before executing it, see undolog.py
+        log      = self.undoLog
+        regs     = log.regs
+        writes   = log.writes
+        size     = log.size
+        i        = log.next
+        count    = log.count
+        aShift   = undolog.aShift
+        qShift   = undolog.qShift
+        vShift   = undolog.valueShift
+        store    = self.store
+        decoded  = self.decoded
+        covers   = self.covers
+        breaks   = self.breaks
+        scr      = self.scr
+        bReg     = self.bReg
+        level    = self.level
+        level4   = undolog.level4Bit if level == 4 else 0
+        aReg     = self.aReg
+        qReg     = self.qReg
+        lastS    = self.lastS
+        functionCounts = self.functionCounts
+        modifiedN = 0
+        executed = 0
+        try:
+            while executed < limit: # break out on a dynamic stop
+                lastS = store[scr]
+                if breaks and lastS in breaks and \
+                   self.breakTaken(lastS, aReg, qReg):
+                    return breakStop
+                executed += 1
+                store[scr] = lastS + 1
+                entry = decoded[lastS]
+                if entry is None:
+                    # decode and remember, SCR and B words are never cached
+                    instruction = store[lastS]
+                    entry = ((instruction >> 13) & 15,
+                             (instruction & addrMask) | (lastS & modMask),
+                             instruction >= bit18)
+                    if lastS >= 8:
+                        decoded[lastS] = entry
+                f, m, modified = entry
+                functionCounts[f] += 1
+                if modified:
+                    modifiedN += 1
+                    m = (m + store[bReg]) & mask16
+                # record the registers, and below the word overwritten
+                j = i
+                regs[j] = lastS | (aReg << aShift) | (qReg << qShift) | level4
+                writes[j] = 0
+                i += 1
+                if i == size:
+                    i = 0
+                if count < size:
+                    count += 1
+                if f < 8:
+                    if f < 4:
+                        if f == 0:   # load B
+                            writes[j] = (bReg + 1) | (store[bReg] << vShift)
+                            qReg = store[bReg] = store[m]
+                            decoded[bReg] = None
+                            if not (covers[bReg] is None):
+                                self.written(bReg) # watched
+                        elif f == 1: # add
+                            aReg = (aReg + store[m]) & mask18
+                        elif f == 2: # negate and add
+                            qReg = store[m]
+                            aReg = (qReg - aReg) & mask18
+                        else:        # store Q
+                            writes[j] = (m + 1) | (store[m] << vShift)
+                            store[m] = qReg >> 1
+                            decoded[m] = None
+                            if not (covers[m] is None):
+                                self.written(m)
+                            if m == scr and store[scr] == lastS:
+                                return self.dynamicStop(lastS)
+                    elif f == 4:     # load A
+                        aReg = store[m]
+                    elif f == 5:     # store A
+                        if level == 1 and 8180 <= m <= 8191:
+                            continue # write to initial instructions ignored
+                        writes[j] = (m + 1) | (store[m] << vShift)
+                        store[m] = aReg
+                        decoded[m] = None
+                        if not (covers[m] is None):
+                            self.written(m)
+                        if m == scr and aReg == lastS:
+                            return self.dynamicStop(lastS)
+                    elif f == 6:     # collate
+                        aReg &= store[m]
+                    elif aReg == 0:  # jump if zero
+                        store[scr] = m
+                        if m == lastS:
+                            return self.dynamicStop(lastS)
+                elif f < 12:
+                    if f == 8:       # jump
+                        store[scr] = m
+                        if m == lastS:
+                            return self.dynamicStop(lastS)
+                    elif f == 9:     # jump if negative
+                        if aReg >= bit18:
+                            store[scr] = m
+                            if m == lastS:
+                                return self.dynamicStop(lastS)
+                    elif f == 10:    # count in store
+                        writes[j] = (m + 1) | (store[m] << vShift)
+                        store[m] = (store[m] + 1) & mask18
+                        decoded[m] = None
+                        if not (covers[m] is None):
+                            self.written(m)
+                        if m == scr and store[scr] == lastS:
+                            return self.dynamicStop(lastS)
+                    else:            # store S
+                        writes[j] = (m + 1) | (store[m] << vShift)
+                        s = store[scr]
+                        qReg = s & modMask
+                        store[m] = s & addrMask
+                        decoded[m] = None
+                        if not (covers[m] is None):
+                            self.written(m)
+                        if m == scr and store[scr] == lastS:
+                            return self.dynamicStop(lastS)
+                elif f == 15:        # input/output etc
+                    self.aReg = aReg
+                    self.qReg = qReg
+                    self.inOut(m)
+                    aReg   = self.aReg
+                    scr    = self.scr
+                    bReg   = self.bReg
+                    level  = self.level
+                    level4 = undolog.level4Bit if level == 4 else 0
+                    op = m & addrMask
+                    if op == 2048:
+                        regs[j] |= undolog.readerBit
+                    elif op == 2052:
+                        regs[j] |= undolog.ttyInBit
+                    if store[scr] == lastS: # after level terminate
+                        return self.dynamicStop(lastS)
+                else:                # multiply, divide and shift
+                    self.aReg = aReg
+                    self.qReg = qReg
+                    if f == 12:
+                        self.multiply(m)
+                    elif f == 13:
+                        self.divide(m)
+                    else:
+                        self.shift(m)
+                    aReg = self.aReg
+                    qReg = self.qReg
+        finally:
+            self.aReg  = aReg
+            self.qReg  = qReg
+            self.lastS = lastS
+            self.instructions += executed
+            self.modifiedCount += modifiedN
+            log.next  = i
+            log.count = count
+        self.limitReached()
+
+    def runUntraced (self, limit):
+        # run up to limit instructions at full speed with tracing suspended,
+        # returns the exit code if the machine stops first, otherwise None
+        tracer = self.traceFile
+        self.traceFile = None
+        try:
+            return self.runFast(limit)
+        except MachineStop as stop:
+            if stop.code != limitStop:
+                raise
+            return None
+        finally:
+            self.traceFile = tracer
+
+    def runTriggered (self, limit):
+        # general loop, traces the instructions selected by the trigger and
+        # runs at full speed when there can be no more to trace
+        trigger = self.traceTrigger
+        tracer  = self.traceFile
+        if trigger.after > 0:
+            n = min(trigger.after, limit)
+            before = self.instructions
+            code = self.runUntraced(n)
+            trigger.after -= self.instructions - before
+            if not (code is None):
+                return code
+            limit -= n
+            if limit == 0:
+                self.limitReached()
+        store     = self.store
+        functions = self.functions
+        record    = tracer.record
+        scr       = self.scr
+        bReg      = self.bReg
+        low       = trigger.low
+        high      = trigger.high
+        at        = trigger.at
+        armed     = trigger.armed
+        left      = trigger.left
+        sample    = trigger.sample
+        every     = trigger.every
+        functionCounts = self.functionCounts
+        modifiedN = 0
+        executed  = 0
+        if not armed:
+            self.traceFile = None # no messages before the trigger address
+        try:
+            # instruction fetch, decode and execute loop
+            while executed < limit: # break out on a dynamic stop
+                executed += 1
+                # Update SCR
+                lastS = store[scr]
+                store[scr] = lastS + 1
+                # Fetch instruction and break out fields
+                instruction = store[lastS]
+                f = (instruction >> 13) & 15
+                a = (instruction & addrMask) | (lastS & modMask)
+                m = ((a + store[bReg]) if instruction >= bit18 else a) & mask16
+                functionCounts[f] += 1
+                if instruction >= bit18:
+                    modifiedN += 1
+                if not armed and lastS == at:
+                    armed = True
+                    self.traceFile = tracer
+                if armed and low <= lastS <= high:
+                    sample -= 1
+                    if sample == 0:
+                        sample = every
+                        record(lastS, instruction, self.aReg, self.qReg,
+                               store[bReg])
+                        left -= 1
+                        if left == 0:
+                            # trace complete, carry on at full speed
+                            functions[f](m)
+                            self.traceFile = None
+                            if store[self.scr] == lastS:
+                                return self.dynamicStop(lastS)
+                            self.lastS = lastS
+                            self.instructions += executed
+                            limit -= executed
+                            executed = 0
+                            code = self.runUntraced(limit)
+                            if code is None:
+                                self.limitReached()
+                            return code
+                functions[f](m)
+                if f == 15: # level terminate moves SCR and B
+                    scr  = self.scr
+                    bReg = self.bReg
+                if store[scr] == lastS:
+                    return self.dynamicStop(lastS)
+        finally:
+            self.lastS = lastS if executed else self.lastS
+            self.instructions += executed
+            self.modifiedCount += modifiedN
+            self.traceFile = tracer
+            trigger.armed  = armed
+            trigger.left   = left
+            trigger.sample = sample
+        self.limitReached()
+
+    def runFast (self, limit):
+        # untraced loop with the instructions inlined and A, Q held in locals,
+        # hot code is run as translated blocks
+        store    = self.store
+        decoded  = self.decoded
+        misses   = 0
+        blocks   = self.blocks
+        covers   = self.covers
+        heat     = self.heat
+        hot      = hotCount if self.translating else 0
+        breaks   = self.breaks
+        # only enter a block if it cannot overrun the limit
+        blockLimit = limit - maxBlock
+        scr      = self.scr
+        bReg     = self.bReg
+        level    = self.level
+        aReg     = self.aReg
+        qReg     = self.qReg
+        lastS    = self.lastS
+        ptpBuf   = self.ptpBuf
+        ttyBuf   = self.ttyBuf
+        lineBuffered = self.lineBuffered
+        functionCounts = self.functionCounts
+        counted  = sum(functionCounts) # to count the decode lookups
+        modifiedN = 0
+        punched  = 0
+        printed  = 0
+        executed = 0
+        try:
+            while executed < limit: # break out on a dynamic stop
+                lastS = store[scr]
+                block = blocks[lastS]
+                if block is None:
+                    h = heat[lastS] + 1
+                    heat[lastS] = h
+                    if h == hot and not (self.translate(lastS) is None):
+                        continue
+                elif executed <= blockLimit or lastS in breaks:
+                    aReg, qReg, n = block(aReg, qReg)
+                    if n >= 0:
+                        executed += n
+                        continue
+                    if n == longLoop:
+                        aReg, qReg, n = block(aReg, qReg, limit-executed)
+                        executed += n
+                        continue
+                    if n != atBreak: # dynamic stop in block
+                        executed -= n
+                        lastS = store[scr]
+                        return self.dynamicStop(lastS)
+                    if self.breakTaken(lastS, aReg, qReg):
+                        return breakStop
+                    # condition not met, the instruction is interpreted
+                executed += 1
+                store[scr] = lastS + 1
+                entry = decoded[lastS]
+                if entry is None:
+                    # decode and remember, SCR and B words are never cached
+                    misses += 1
+                    instruction = store[lastS]
+                    entry = ((instruction >> 13) & 15,
+                             (instruction & addrMask) | (lastS & modMask),
+                             instruction >= bit18)
+                    if lastS >= 8:
+                        decoded[lastS] = entry
+                f, m, modified = entry
+                functionCounts[f] += 1
+                if modified:
+                    modifiedN += 1
+                    m = (m + store[bReg]) & mask16
+                if f < 8:
+                    if f < 4:
+                        if f == 0:   # load B
+                            qReg = store[bReg] = store[m]
+                            decoded[bReg] = None
+                            if not (covers[bReg] is None):
+                                self.written(bReg) # watched
+                        elif f == 1: # add
+                            aReg = (aReg + store[m]) & mask18
+                        elif f == 2: # negate and add
+                            qReg = store[m]
+                            aReg = (qReg - aReg) & mask18
+                        else:        # store Q
+                            store[m] = qReg >> 1
+                            decoded[m] = None
+                            if not (covers[m] is None):
+                                self.written(m)
+                            if m == scr and store[scr] == lastS:
+                                return self.dynamicStop(lastS)
+                    elif f == 4:     # load A
+                        aReg = store[m]
+                    elif f == 5:     # store A
+                        if level == 1 and 8180 <= m <= 8191:
+                            continue # write to initial instructions ignored
+                        store[m] = aReg
+                        decoded[m] = None
+                        if not (covers[m] is None):
+                            self.written(m)
+                        if m == scr and aReg == lastS:
+                            return self.dynamicStop(lastS)
+                    elif f == 6:     # collate
+                        aReg &= store[m]
+                    elif aReg == 0:  # jump if zero
+                        store[scr] = m
+                        if m == lastS:
+                            return self.dynamicStop(lastS)
+                elif f < 12:
+                    if f == 8:       # jump
+                        store[scr] = m
+                        if m == lastS:
+                            return self.dynamicStop(lastS)
+                    elif f == 9:     # jump if negative
+                        if aReg >= bit18:
+                            store[scr] = m
+                            if m == lastS:
+                                return self.dynamicStop(lastS)
+                    elif f == 10:    # count in store
+                        store[m] = (store[m] + 1) & mask18
+                        decoded[m] = None
+                        if not (covers[m] is None):
+                            self.written(m)
+                        if m == scr and store[scr] == lastS:
+                            return self.dynamicStop(lastS)
+                    else:            # store S
+                        s = store[scr]
+                        qReg = s & modMask
+                        store[m] = s & addrMask
+                        decoded[m] = None
+                        if not (covers[m] is None):
+                            self.written(m)
+                        if m == scr and store[scr] == lastS:
+                            return self.dynamicStop(lastS)
+                elif f == 15:        # input/output etc
+                    op = m & addrMask
+                    if op == 6144 and not (self.ptpFile is None):
+                        punched += 1
+                        ptpBuf.append(aReg & 255)    # as punchTape()
+                        if len(ptpBuf) >= outputBuffer:
+                            self.flushPunch()
+                    elif op == 6148 and not lineBuffered:
+                        printed += 1
+                        ch = aReg & 127              # as writeTTY()
+                        if ch == 10 or 32 <= ch <= 122:
+                            ttyBuf.append(ch)
+                            if len(ttyBuf) >= outputBuffer:
+                                self.flushTTY()
+                    else:
+                        self.aReg = aReg
+                        self.qReg = qReg
+                        self.inOut(m)
+                        aReg  = self.aReg
+                        scr   = self.scr
+                        bReg  = self.bReg
+                        level = self.level
+                        if store[scr] == lastS: # after level terminate
+                            return self.dynamicStop(lastS)
+                else:                # multiply, divide and shift
+                    self.aReg = aReg
+                    self.qReg = qReg
+                    if f == 12:
+                        self.multiply(m)
+                    elif f == 13:
+                        self.divide(m)
+                    else:
+                        self.shift(m)
+                    aReg = self.aReg
+                    qReg = self.qReg
+        finally:
+            self.aReg  = aReg
+            self.qReg  = qReg
+            self.lastS = lastS
+            self.instructions += executed
+            self.decodeLookups += sum(functionCounts) - counted
+            self.decodeMisses  += misses
+            self.modifiedCount += modifiedN
+            self.ioCounts['punch'] += punched
+            self.ioCounts['teleprinter'] += printed
+        self.limitReached()
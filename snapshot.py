@@ -0,0 +1,181 @@
+# Warm start snapshot cache - Andrew Herbert - 18/10/2026
+
+# Loading a language system pushes the whole translator tape through the
+# initial orders, millions of simulated instructions, to arrive at the same
+# store every time.  A SnapshotCache remembers the outcome of a run keyed by
+# a hash of everything the run depends on: the store image it starts from
+# (which includes the start address in the SCR), the paper tape and teletype
+# input and the instruction limit.  A repeated run is replaced by reading
+# back the store, registers, input positions, exit code and the teleprinter
+# and punch output the run produced.  The instructions the run executed, in
+# all and by function code, are added to the machine's counts, which depend
+# on the machine's history rather than on the run.
+
+# Each snapshot is one file, <key>.snap, holding a line of JSON describing
+# the state followed by the store image, teleprinter output and punch
+# output.  Files are replaced atomically so several simulators can share a
+# cache directory.  When the cache grows beyond its size bound the least
+# recently used snapshots are deleted.
+
+import sys
+import os
+import json
+import hashlib
+import tempfile
+from array import array
+
+import storefile
+
+defaultMaxBytes = 256*1024*1024
+snapVersion     = 2
+
+def readInput (path):
+    # contents of an input file, or None if there isn't one
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+class Recorder:
+    # stands in for a text stream, passing on and keeping what is written
+
+    def __init__ (self, stream):
+        self.stream = stream
+        self.parts  = []
+
+    def write (self, s):
+        self.parts.append(s)
+        return self.stream.write(s)
+
+    def flush (self):
+        self.stream.flush()
+
+    def text (self):
+        return ''.join(self.parts)
+
+class SnapshotCache:
+
+    def __init__ (self, directory, maxBytes=defaultMaxBytes):
+        self.directory = directory
+        self.maxBytes  = maxBytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path (self, key):
+        return os.path.join(self.directory, key + '.snap')
+
+    def key (self, machine, limit):
+        # the machine's input is read now, rather than on first use, so
+        # that it can be hashed
+        if machine.ptrBuf is None:
+            machine.ptrBuf = readInput(machine.ptrPath)
+        if machine.ttyInBuf is None:
+            machine.ttyInBuf = readInput(machine.ttyInPath)
+        h = hashlib.sha256()
+        h.update(b'%d %d %d %d %d %d %d\n' % (snapVersion, limit,
+                                              machine.level, machine.aReg,
+                                              machine.qReg, machine.ptrIdx,
+                                              machine.ttyInIdx))
+        h.update(storefile.imageBytes(machine.store))
+        for data in (machine.ptrBuf, machine.ttyInBuf):
+            if data is None:
+                h.update(b'none')
+            else:
+                h.update(b'%d:' % len(data))
+                h.update(data)
+        return h.hexdigest()
+
+    def load (self, key):
+        # returns (state, store, tty output, punch output) or None
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                state = json.loads(f.readline())
+                store = array('i', f.read(state['storeBytes']))
+                tty   = f.read(state['ttyBytes']).decode('ascii')
+                punch = f.read(state['punchBytes'])
+        except (OSError, ValueError, KeyError):
+            return None
+        if sys.byteorder == 'big':
+            store.byteswap()
+        os.utime(path) # most recently used
+        return (state, store, tty, punch if state['punched'] else None)
+
+    def save (self, key, machine, code, tty, punch, instructions, functions):
+        # punch is None if nothing was punched, instructions and functions
+        # are the instructions executed by the run, in all and by function
+        image = storefile.imageBytes(machine.store)
+        ttyBytes = tty.encode('ascii')
+        state = machine.getState()
+        state.update({'code': code, 'message': machine.message,
+                      'instructions': instructions, 'functions': functions,
+                      'punched': not (punch is None),
+                      'storeBytes': len(image), 'ttyBytes': len(ttyBytes),
+                      'punchBytes': 0 if punch is None else len(punch)})
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps(state).encode('ascii') + b'\n')
+            f.write(image)
+            f.write(ttyBytes)
+            if not (punch is None):
+                f.write(punch)
+        os.replace(temp, self.path(key))
+        self.evict()
+
+    def evict (self):
+        # delete least recently used snapshots until within size bound
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith('.snap'):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue # deleted by another simulator
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def restore (self, machine, snap):
+        # put machine into the state recorded in a snapshot, replaying its
+        # output, and return the run's exit code
+        state, store, tty, punch = snap
+        machine.store[:] = store
+        machine.flushDecoded()
+        machine.setState(dict(state, instructions=machine.instructions +
+                                                  state['instructions']))
+        for f in range(16):
+            machine.functionCounts[f] += state['functions'][f]
+        machine.message = state['message']
+        machine.ttyOut.write(tty)
+        if not (punch is None):
+            machine.punchBytes(punch)
+        return state['code']
+
+def run (cache, machine, limit):
+    # run machine, or restore the outcome of an identical earlier run
+    key  = cache.key(machine, limit)
+    snap = cache.load(key)
+    if not (snap is None):
+        return cache.restore(machine, snap)
+    before    = machine.instructions
+    functions = machine.stats()['functions']
+    recorder = Recorder(machine.ttyOut)
+    machine.ttyOut = recorder
+    try:
+        code = machine.run(limit)
+    finally:
+        machine.ttyOut = recorder.stream
+    functions = [after - earlier for after, earlier
+                 in zip(machine.stats()['functions'], functions)]
+    cache.save(key, machine, code, recorder.text(), machine.punchOutput(),
+               machine.instructions - before, functions)
+    return code
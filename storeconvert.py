@@ -0,0 +1,23 @@
+# Convert store file between binary and text formats - Andrew Herbert - 18/10/2026
+
+# Converts a .store file from 900sim.py to the binary format, or with -text
+# to the original text format.  The input may be in either format.
+
+import argparse
+
+import storefile
+
+def getArgs ():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input',  help='store file to convert')
+    parser.add_argument('output', help='converted store file')
+    parser.add_argument('-text',  help='write the text format',
+                        action='store_true')
+    args = parser.parse_args()
+    return (args.input, args.output, args.text)
+
+def convert (args):
+    inPath, outPath, text = args
+    storefile.writeStore(outPath, storefile.readStore(inPath), text)
+
+convert(getArgs())
@@ -0,0 +1,106 @@
+# Store image files - Andrew Herbert - 18/10/2026
+
+# A store image is kept between runs of the simulator in .store.  Two
+# formats are understood:
+#
+#   binary - a 16 byte header, the characters '900STORE' followed by the
+#            format version and the number of words, each a little endian
+#            32 bit integer, then the words of store as little endian 32 bit
+#            integers.  This is the default.
+#
+#   text   - the original format, a sequence of decimal integers separated
+#            by white space, 10 to a line.
+#
+# readStore() recognises either.  writeStore() can be given the image of
+# the store as it was when it was read, in which case only the pages that
+# have changed since are written back to a binary file.
+
+import sys
+import os
+from array import array
+
+magic    = b'900STORE'
+version  = 1
+header   = 16     # bytes
+pageSize = 512    # words
+
+def binaryHeader (words):
+    h = array('i', [version, words])
+    if sys.byteorder == 'big':
+        h.byteswap()
+    return magic + h.tobytes()
+
+def isBinary (path):
+    with open(path, 'rb') as f:
+        return f.read(len(magic)) == magic
+
+def readStore (path):
+    # returns the words held in the store file at path as an array
+    with open(path, 'rb') as f:
+        data = f.read()
+    words = array('i')
+    if data[:len(magic)] == magic:
+        count = array('i', data[len(magic):header])
+        if sys.byteorder == 'big':
+            count.byteswap()
+        words.frombytes(data[header:header+4*count[1]])
+        if sys.byteorder == 'big':
+            words.byteswap()
+    else:
+        words.extend(int(x) for x in data.split())
+    return words
+
+def imageBytes (store):
+    # store as little endian bytes, the binary file format
+    if sys.byteorder == 'big':
+        store = array('i', store)
+        store.byteswap()
+    return store.tobytes()
+
+toFraction = 2.0**-17
+
+def formatWord (addr, word):
+    # a word of store as integer, octal, fraction and instruction, the
+    # format of storeprint.py
+    n = word
+    if n >= 131072:
+        n-= 262144
+    m = '/' if word >= 131072 else ' '
+    f = (word >> 13) & 15
+    pad = ' ' if f < 10 else ''
+    a = word & 8191
+    fr = n * toFraction
+    return '%5d: %+7d &%6o %+8.6f %s%s %d %4d' % (addr, n, n, fr, pad, m, f, a)
+
+def writeText (path, store):
+    with open(path, mode='w') as f:
+        for i in range(len(store)):
+            print('%7d' % store[i], file=f, end=('\n' if i % 10 == 9 else ''))
+
+def writeBinary (path, store, original=None):
+    # original, if given, is the imageBytes() of the file's current contents
+    image = imageBytes(store)
+    if original is None or len(original) != len(image) or \
+       not os.path.exists(path) or not isBinary(path):
+        with open(path, 'wb') as f:
+            f.write(binaryHeader(len(store)))
+            f.write(image)
+        return len(image)
+    # write back only those pages which have changed
+    written = 0
+    pageBytes = 4 * pageSize
+    new = memoryview(image)
+    old = memoryview(original)
+    with open(path, 'r+b') as f:
+        for page in range(0, len(image), pageBytes):
+            if new[page:page+pageBytes] != old[page:page+pageBytes]:
+                f.seek(header + page)
+                f.write(new[page:page+pageBytes])
+                written += pageBytes
+    return written
+
+def writeStore (path, store, text=False, original=None):
+    if text:
+        writeText(path, store)
+    else:
+        writeBinary(path, store, original)
@@ -5,6 +5,8 @@
 import sys
 import argparse
 
+import telecode
+
 def getArgs ():
     parser = argparse.ArgumentParser()
     parser.add_argument('input')
@@ -12,21 +14,8 @@ def getArgs ():
     return args.input
 
 def printFile (path):
-    with open(path, 'rb') as f:
-        buf = f.read()
-    for i in range(len(buf)):
-        ch = buf[i]
-        print('%3d =' % ch, end = '')
-        st = ''
-        for bit in [128, 32, 16, 8, -1, 4, 2, 1]:
-            if bit == -1:
-                st += '.'
-            elif ch&bit != 0:
-                st += '0'
-            else:
-                st += ' '
-        print(st)
-            
+    for buf in telecode.readChunks(path):
+        sys.stdout.write(telecode.tapeLines(buf))
 
 printFile(getArgs())
     
@@ -0,0 +1,141 @@
+# Paper tape code conversions - Andrew Herbert - 18/10/2026
+
+# Conversions between text and Elliott 900 telecode, and the printable
+# renderings of binary tape used by binprint.py and tapevisual.py, shared
+# by those programs, to900text.py, from900text.py, pipeline.py and
+# 900sim.py.  Each works a byte at a time through a 256 entry table built
+# once, applied to whole buffers with bytes.translate or str.join, and the
+# file conversions work through their input in chunks so that a tape of any
+# size converts in bounded memory.
+#
+#   toTelecode(text)   - text to telecode, as to900text.py: each character
+#                        with an even parity bit added and '<! HALT !>'
+#                        replaced by the halt code 20
+#   fromTelecode(data) - telecode to text, as from900text.py: parity bit
+#                        removed, only newline and the characters from
+#                        space to 'z' kept, and a final newline added if
+#                        missing
+#   numberLines(data)  - lines of decimal codes, 10 to a line, as binprint.py
+#   tapeLines(data)    - a picture of each row of tape, as tapevisual.py
+#
+# Encoder and Decoder convert a tape a piece at a time, encodeFile() and
+# decodeFile() a whole file.
+
+chunkSize = 1024*1024 # bytes or characters converted at a time
+
+halt     = '<! HALT !>' # stands for the halt code in source text
+haltCode = 20
+
+def addParity (code):
+    p = 0
+    c = code
+    while c != 0:
+        if c & 1 > 0:
+            p+=1
+        c>>=1
+    if p & 1 > 0:
+        return code | 128 # odd parity, add parity digit
+    else:
+        return code       # even parity
+
+def printable (ch):
+    return ch == 10 or 32 <= ch <= 122
+
+parityTable = bytes(addParity(code) for code in range(256))
+stripTable  = bytes(code & 127 for code in range(256))
+unprintable = bytes(code for code in range(256) if not printable(code & 127))
+
+numberTable = ['%4d' % code for code in range(256)]
+
+def tapeRow (code):
+    # holes as 0, sprocket hole as .
+    return '%3d =' % code + ''.join('.' if bit == -1 else
+                                    '0' if code & bit else ' '
+                                    for bit in (128, 32, 16, 8, -1, 4, 2, 1))
+
+tapeTable = [tapeRow(code) + '\n' for code in range(256)]
+
+class Encoder:
+    # text to telecode, a piece at a time, holding back the start of a
+    # halt that might be completed by the next piece
+
+    def __init__ (self):
+        self.pending = ''
+
+    def encode (self, text, final=False):
+        text = (self.pending + text).replace(halt, chr(haltCode))
+        self.pending = ''
+        if not final:
+            for n in range(len(halt)-1, 0, -1):
+                if text.endswith(halt[:n]):
+                    self.pending = text[-n:]
+                    text = text[:-n]
+                    break
+        return text.encode('latin-1').translate(parityTable)
+
+class Decoder:
+    # telecode to text, a piece at a time, noting whether the text so far
+    # ends in a newline
+
+    def __init__ (self):
+        self.newline = True
+
+    def decode (self, data):
+        text = bytes(data).translate(stripTable, unprintable).decode('ascii')
+        if text != '':
+            self.newline = text[-1] == '\n'
+        return text
+
+    def end (self):
+        # force new line at end of file if not present
+        return '' if self.newline else '\n'
+
+def toTelecode (text):
+    return Encoder().encode(text, final=True)
+
+def fromTelecode (data):
+    decoder = Decoder()
+    return decoder.decode(data) + decoder.end()
+
+def encodeFile (inPath, outPath):
+    # UTF-8 text file to a telecode tape
+    encoder = Encoder()
+    with open(inPath, 'r', encoding='utf-8-sig') as inFile, \
+         open(outPath, 'wb') as outFile:
+        while True:
+            text = inFile.read(chunkSize)
+            outFile.write(encoder.encode(text, final=text == ''))
+            if text == '':
+                break
+
+def decodeFile (inPath, outPath):
+    # telecode tape to an ASCII text file
+    decoder = Decoder()
+    with open(inPath, 'rb') as inFile, \
+         open(outPath, 'w', encoding='ascii') as outFile:
+        while True:
+            data = inFile.read(chunkSize)
+            if data == b'':
+                break
+            outFile.write(decoder.decode(data))
+        outFile.write(decoder.end())
+
+def numberLines (data):
+    # the codes as '%4d', 10 to a line, a short last line left unfinished
+    text = '\n'.join([''.join([numberTable[code] for code in data[i:i+10]])
+                      for i in range(0, len(data), 10)])
+    if len(data) % 10 == 0 and len(data) != 0:
+        text += '\n'
+    return text
+
+def tapeLines (data):
+    return ''.join([tapeTable[code] for code in data])
+
+def readChunks (path, size=chunkSize):
+    # the contents of a file, size bytes at a time
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(size)
+            if data == b'':
+                return
+            yield data
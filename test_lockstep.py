@@ -0,0 +1,35 @@
+# Tests of the lockstep engine - Andrew Herbert - 18/10/2026
+
+# Run with python3 -m pytest.  The vector runs are skipped without NumPy.
+
+from array import array
+
+import pytest
+
+import sim900
+import lockstep
+from sim900 import makeIns, otherStop
+
+def scrOutOfRange ():
+    # a program that puts 20000 in the SCR, every machine running it
+    # leaves store on the same instruction
+    store = array('i', [0] * sim900.maxStore)
+    store[8]  = makeIns(0, 4, 30)
+    store[9]  = makeIns(0, 5, 0)
+    store[30] = 20000
+    return store
+
+def test_scalar_scr_out_of_range ():
+    records = lockstep.sweep(scrOutOfRange(), 8, [b''] * 20, limit=100,
+                             vector=False)
+    assert len(records) == 20
+    for record in records:
+        assert record['code'] == otherStop
+        assert record['message'] == 'address out of range'
+        assert record['instructions'] == 2
+
+@pytest.mark.skipif(not lockstep.available(), reason='needs NumPy')
+def test_vector_scr_out_of_range ():
+    records = lockstep.sweep(scrOutOfRange(), 8, [b''] * 20, limit=100)
+    assert records == lockstep.sweep(scrOutOfRange(), 8, [b''] * 20,
+                                     limit=100, vector=False)
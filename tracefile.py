@@ -0,0 +1,207 @@
+# Execution trace files - Andrew Herbert - 18/10/2026
+
+# The simulator's -trace option writes a record of every instruction
+# executed to .trace.  Two formats are understood:
+#
+#   binary - a 16 byte header, the characters '900TRACE' followed by the
+#            format version and the ring size (0 if the trace is complete),
+#            each a little endian 32 bit integer, then a sequence of records
+#            made of little endian 64 bit words.  An instruction is two words:
+#
+#              address | instruction << 14 | A << 32
+#              Q | B << 18
+#
+#            A message, e.g., 'Dynamic stop at 8', is one word with the top
+#            bit set and the length of the text in the bottom bits, followed
+#            by the text padded with zero bytes to a multiple of 8 bytes.
+#            This is the default.
+#
+#   text   - the original format, a line per instruction holding address,
+#            instruction, A, Q and B as decimal integers, and a line per
+#            message.
+#
+# A trace can also be kept in a ring of the last N records, which is
+# written to the file when the machine stops.
+#
+# readTrace() decodes either format, yielding for each record either a
+# tuple (address, instruction, A, Q, B) or a message string.
+
+import sys
+from array import array
+from collections import deque
+
+magic      = b'900TRACE'
+version    = 1
+header     = 16            # bytes
+bufferSize = 64*1024       # words buffered before writing
+textBit    = 1 << 63       # marks a message
+
+def binaryHeader (ring):
+    h = array('i', [version, ring])
+    if sys.byteorder == 'big':
+        h.byteswap()
+    return magic + h.tobytes()
+
+def writeWords (f, words):
+    if sys.byteorder == 'big':
+        words = array('Q', words)
+        words.byteswap()
+    f.write(words.tobytes())
+
+def messageBytes (s):
+    text = s.encode('ascii', 'replace')
+    words = array('Q', [textBit | len(text)])
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words.tobytes() + text + bytes(-len(text) % 8)
+
+class TextTrace:
+    # the original format
+
+    def __init__ (self, path):
+        self.file = open(path, 'w', buffering=1024*1024)
+
+    def record (self, addr, ins, a, q, b):
+        self.file.write('%d %d %d %d %d\n' % (addr, ins, a, q, b))
+
+    def message (self, s):
+        self.file.write(s+'\n')
+
+    def flush (self):
+        self.file.flush()
+
+    def close (self):
+        self.file.close()
+
+class BinaryTrace:
+    # records are packed into an array and written when it fills
+
+    def __init__ (self, path):
+        self.file = open(path, 'wb')
+        self.file.write(binaryHeader(0))
+        self.words = array('Q')
+
+    def record (self, addr, ins, a, q, b):
+        words = self.words
+        words.append(addr | ins << 14 | a << 32)
+        words.append(q | b << 18)
+        if len(words) >= bufferSize:
+            self.flush()
+
+    def message (self, s):
+        self.flush()
+        self.file.write(messageBytes(s))
+
+    def flush (self):
+        if len(self.words) != 0:
+            writeWords(self.file, self.words)
+            self.words = array('Q')
+        self.file.flush()
+
+    def close (self):
+        self.flush()
+        self.file.close()
+
+class RingTrace:
+    # only the last size records are kept, written to the file by flush()
+
+    def __init__ (self, path, size):
+        self.file = open(path, 'wb')
+        self.file.write(binaryHeader(size))
+        self.ring = deque(maxlen=size)
+
+    def record (self, addr, ins, a, q, b):
+        self.ring.append((addr, ins, a, q, b))
+
+    def message (self, s):
+        self.ring.append(s)
+
+    def flush (self):
+        words = array('Q')
+        for r in self.ring:
+            if isinstance(r, str):
+                writeWords(self.file, words)
+                words = array('Q')
+                self.file.write(messageBytes(r))
+            else:
+                addr, ins, a, q, b = r
+                words.append(addr | ins << 14 | a << 32)
+                words.append(q | b << 18)
+        writeWords(self.file, words)
+        self.ring.clear()
+        self.file.flush()
+
+    def close (self):
+        self.flush()
+        self.file.close()
+
+def openTrace (path, text=False, ring=0):
+    # a trace writer, ring is the number of records to keep, 0 for all
+    if text:
+        return TextTrace(path)
+    elif ring > 0:
+        return RingTrace(path, ring)
+    else:
+        return BinaryTrace(path)
+
+def isBinary (path):
+    with open(path, 'rb') as f:
+        return f.read(len(magic)) == magic
+
+def readBinary (f):
+    # f is positioned after the header
+    while True:
+        data = f.read(8 * bufferSize)
+        if len(data) < 8:
+            return
+        words = array('Q')
+        words.frombytes(data[:len(data) - len(data) % 8])
+        if sys.byteorder == 'big':
+            words.byteswap()
+        i = 0
+        while i < len(words):
+            w = words[i]
+            if w & textBit:
+                # message, may run on beyond the words read so far
+                n = w & 0xffffffff
+                size = n + (-n % 8)
+                rest = data[8*i+8:8*i+8+size]
+                if len(rest) < size:
+                    rest += f.read(size - len(rest))
+                    yield rest[:n].decode('ascii')
+                    break
+                yield rest[:n].decode('ascii')
+                i += 1 + size // 8
+            elif i+1 < len(words):
+                x = words[i+1]
+                yield (w & 16383, (w >> 14) & 262143, w >> 32,
+                       x & 262143, x >> 18)
+                i += 2
+            else:
+                # instruction split across reads, unless truncated
+                if len(data) < 8 * bufferSize:
+                    return
+                f.seek(-8, 1)
+                break
+
+def readText (f):
+    for line in f:
+        line = line.rstrip('\n')
+        if line[:1].isdigit():
+            yield tuple(int(i) for i in line.split())
+        else:
+            yield line
+
+def readTrace (path):
+    # yields the records of the trace file at path, in either format
+    if isBinary(path):
+        with open(path, 'rb') as f:
+            h = array('i', f.read(header)[len(magic):])
+            if sys.byteorder == 'big':
+                h.byteswap()
+            if h[1] != 0:
+                yield 'last %d records' % h[1]
+            yield from readBinary(f)
+    else:
+        with open(path) as f:
+            yield from readText(f)
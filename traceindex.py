@@ -0,0 +1,270 @@
+# Trace index - Andrew Herbert - 18/10/2026
+
+# A binary trace (see tracefile.py) of a long run can be gigabytes, too
+# much to decode from the start to find one instruction.  An index, kept
+# beside the trace in <trace>.idx, records
+#
+#   pieces    - the runs of instruction records between messages, as the
+#               byte offset, number of the first instruction and count, so
+#               that instruction N is found by arithmetic
+#   messages  - the instruction number and byte offset of each message,
+#               e.g., 'Dynamic stop at 8'
+#   addresses - for each store address the blocks of blockSize
+#               instructions in which it was executed
+#
+# Instructions are numbered from 0 in the order they appear in the trace.
+# The index is built in one pass over the trace, mapped into memory.  The
+# pieces and messages are found by searching the top bytes of the records
+# for the message flag, without decoding the instructions, then the
+# addresses in each block are collected, the blocks shared between worker
+# processes.
+#
+# The index file is a line of JSON giving the size and modification time
+# of the trace indexed and the lengths of the arrays which follow, each of
+# little endian 64 bit integers: pieces as (offset, first, count) triples,
+# messages as (instruction, offset) pairs, the start of each address's
+# entries in the block list, and the block list.
+#
+# Text traces cannot be indexed.
+
+import os
+import sys
+import json
+import mmap
+import bisect
+import multiprocessing
+from array import array
+
+import tracefile
+
+blockSize = 4096  # instructions
+maxStore  = 16*1024
+version   = 1
+
+recordBytes = 16
+wordBytes   = 8
+messageFlag = bytes(1 if code >= 128 else 0 for code in range(256))
+addrHigh    = bytes(code & 63 for code in range(256))
+
+def indexPath (path):
+    return path + '.idx'
+
+def traceIdentity (path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime': st.st_mtime_ns}
+
+def mapTrace (path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def words (data):
+    w = array('Q', data)
+    if sys.byteorder == 'big':
+        w.byteswap()
+    return w
+
+def messageAt (data, offset):
+    # (text, offset after) of the message at offset
+    n = words(data[offset:offset+wordBytes])[0] & 0xffffffff
+    text = data[offset+wordBytes:offset+wordBytes+n].decode('ascii')
+    return (text, offset + wordBytes + n + (-n % wordBytes))
+
+def scan (data):
+    # the pieces and messages of the trace mapped at data
+    pieces   = array('Q')
+    messages = array('Q')
+    end      = len(data)
+    pos      = tracefile.header
+    first    = 0  # number of the instruction at pos
+    start    = pos
+    window   = 256
+    while pos + wordBytes <= end:
+        # look for the message flag in the first word of the next window
+        # of records, widening the window while none is found
+        flags = data[pos+7:min(end, pos + window*recordBytes):recordBytes]
+        k = flags.translate(messageFlag).find(1)
+        if k < 0:
+            records = min(window, (end - pos) // recordBytes)
+            if records == 0:
+                break # a partial record at the end
+            pos    += records * recordBytes
+            window *= 2
+            continue
+        pos += k * recordBytes
+        count = (pos - start) // recordBytes
+        if count:
+            pieces.extend((start, first, count))
+        first += count
+        messages.extend((first, pos))
+        text, pos = messageAt(data, pos)
+        start  = pos
+        window = 256
+    count = (pos - start) // recordBytes
+    if count:
+        pieces.extend((start, first, count))
+    return pieces, messages, first + count
+
+def blockRanges (pieces, instructions):
+    # for each block, the byte ranges of its instruction records
+    ranges = [[] for b in range((instructions + blockSize - 1) // blockSize)]
+    for i in range(0, len(pieces), 3):
+        offset, first, count = pieces[i:i+3]
+        n = first
+        while n < first + count:
+            b = n // blockSize
+            m = min(first + count, (b + 1) * blockSize)
+            ranges[b].append((offset + (n - first) * recordBytes,
+                              offset + (m - first) * recordBytes))
+            n = m
+    return ranges
+
+tracePath = None # trace being indexed, inherited by the workers
+
+def blockAddresses (task):
+    # the addresses executed in each of a list of (block, ranges)
+    data = mapTrace(tracePath)
+    result = []
+    for block, ranges in task:
+        seen = set()
+        for start, end in ranges:
+            raw  = data[start:end]
+            pair = bytearray(2 * ((end - start) // recordBytes))
+            pair[0::2] = raw[0::recordBytes]
+            pair[1::2] = raw[1::recordBytes].translate(addrHigh)
+            addrs = array('H', pair)
+            if sys.byteorder == 'big':
+                addrs.byteswap()
+            seen.update(addrs)
+        result.append((block, sorted(seen)))
+    data.close()
+    return result
+
+def build (path, workers=None):
+    # index the binary trace at path, writing path.idx
+    global tracePath
+    identity = traceIdentity(path)
+    data = mapTrace(path)
+    try:
+        if data[:len(tracefile.magic)] != tracefile.magic:
+            raise ValueError(path + ' is not a binary trace')
+        pieces, messages, instructions = scan(data)
+    finally:
+        data.close()
+    ranges = blockRanges(pieces, instructions)
+    tasks = [(b, ranges[b]) for b in range(len(ranges))]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    tracePath = path
+    if workers <= 1 or not ('fork' in multiprocessing.get_all_start_methods()):
+        results = [blockAddresses(tasks)]
+    else:
+        chunk = (len(tasks) + workers - 1) // workers
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            results = pool.map(blockAddresses,
+                               [tasks[i:i+chunk]
+                                for i in range(0, len(tasks), chunk)])
+    lists = [[] for addr in range(maxStore)]
+    for result in results:
+        for block, addrs in result:
+            for addr in addrs:
+                lists[addr].append(block)
+    starts = array('Q', [0])
+    blocks = array('Q')
+    for addr in range(maxStore):
+        blocks.extend(lists[addr])
+        starts.append(len(blocks))
+    header = {'format': '900TRACEINDEX', 'version': version,
+              'blockSize': blockSize, 'instructions': instructions,
+              'pieces': len(pieces), 'messages': len(messages),
+              'starts': len(starts), 'blocks': len(blocks)}
+    header.update(identity)
+    with open(indexPath(path), 'wb') as f:
+        f.write(json.dumps(header).encode('ascii') + b'\n')
+        for a in (pieces, messages, starts, blocks):
+            if sys.byteorder == 'big':
+                a.byteswap()
+            f.write(a.tobytes())
+    return TraceIndex(path)
+
+class TraceIndex:
+
+    def __init__ (self, path):
+        # the index of the trace at path, which must be up to date
+        self.path = path
+        with open(indexPath(path), 'rb') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != '900TRACEINDEX' or \
+               header.get('version') != version:
+                raise ValueError(indexPath(path) + ' is not a trace index')
+            arrays = []
+            for name in ('pieces', 'messages', 'starts', 'blocks'):
+                a = array('Q', f.read(8 * header[name]))
+                if sys.byteorder == 'big':
+                    a.byteswap()
+                arrays.append(a)
+        self.header = header
+        self.pieces, self.messages, self.starts, self.blocks = arrays
+        self.blockSize    = header['blockSize']
+        self.instructions = header['instructions']
+        self.firsts = self.pieces[1::3] # first instruction of each piece
+
+    def current (self):
+        # True if the trace is unchanged since it was indexed
+        try:
+            identity = traceIdentity(self.path)
+        except OSError:
+            return False
+        return identity['size'] == self.header['size'] and \
+               identity['mtime'] == self.header['mtime']
+
+    def offset (self, n):
+        # byte offset of the record of instruction n
+        i = bisect.bisect_right(self.firsts, n) - 1
+        offset, first, count = self.pieces[3*i:3*i+3]
+        return offset + (n - first) * recordBytes
+
+    def records (self, n, count):
+        # (instruction number, record) for count instructions from n, and
+        # the messages among them with the number of the next instruction
+        if n >= self.instructions:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset(n))
+            for record in tracefile.readBinary(f):
+                if isinstance(record, str):
+                    yield (n, record)
+                    continue
+                if count == 0:
+                    return
+                yield (n, record)
+                n += 1
+                count -= 1
+
+    def executions (self, addr):
+        # (instruction number, record) for each execution of addr
+        for b in self.blocks[self.starts[addr]:self.starts[addr+1]]:
+            for n, record in self.records(b * self.blockSize,
+                                          self.blockSize):
+                if not isinstance(record, str) and record[0] == addr:
+                    yield (n, record)
+
+    def messageList (self):
+        # (instruction number, text) of each message
+        data = mapTrace(self.path)
+        try:
+            return [(self.messages[i], messageAt(data, self.messages[i+1])[0])
+                    for i in range(0, len(self.messages), 2)]
+        finally:
+            data.close()
+
+def openIndex (path, workers=None):
+    # the index of the trace at path, built or rebuilt if need be
+    if os.path.exists(indexPath(path)):
+        try:
+            index = TraceIndex(path)
+            if index.current():
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+    return build(path, workers)
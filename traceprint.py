@@ -1,35 +1,106 @@
 # 900sim trace analysis - Andrew Herbert - 04/07/2020
 
+# Usage: python3 traceprint.py [-trace FILE] [-at N [-count C]]
+#                              [-address X] [-stops [-window W]]
+#                              [-index] [-jobs J]
+#
+# Reads .trace (or -trace FILE) in either the binary or text format, see
+# tracefile.py, and prints every record.  A binary trace can instead be
+# looked into through its index, see traceindex.py, which is built the first
+# time it is needed or when the trace has changed, or by -index:
+#
+#   -at N       prints C (default 20) instructions from the Nth, counting
+#               from 0
+#   -address X  prints every execution of the instruction at address X
+#   -stops      prints the W (default 10) instructions before and after
+#               each dynamic stop
+#
+# Instructions printed through the index are preceded by their number.
+# -jobs sets the number of processes building the index, by default one per
+# processor.
+
+import sys
+import argparse
+
+import tracefile
+import traceindex
+
 def normal (n):
     return n - 262144 if n >= 131072 else n
 
-def decodeTrace (line):
-    items = []
-    for i in line.split():
-        items.append(int(i))
-    addr = items[0]
-    inst = items[1]
+def decodeTrace (record):
+    addr, inst, aReg, qReg, bReg = record
     m    = '/' if inst >= 131072 else ' '
     f    = (inst >> 13) & 15
     a    = inst & 8191
     pad  = (' ' if f < 10 else '')
-    aReg = normal(items[2])
-    qReg = normal(items[3])
-    bReg = normal(items[4])
-    print('%6d: %s%s%d %4d A=%8d Q=%8d B=%8d' % (addr, pad, m, f, a,
-                                                 aReg, qReg, bReg))
-    
-def decodeLine (line):
-    if len(line) < 0:
-        return()
-    elif (line[0]).isdigit():
-        decodeTrace(line)
+    aReg = normal(aReg)
+    qReg = normal(qReg)
+    bReg = normal(bReg)
+    return '%6d: %s%s%d %4d A=%8d Q=%8d B=%8d' % (addr, pad, m, f, a,
+                                                  aReg, qReg, bReg)
+
+def decodeRecord (record):
+    if isinstance(record, tuple):
+        print(decodeTrace(record))
+    else:
+        print(record)
+
+def decodeFile (path):
+    for record in tracefile.readTrace(path):
+        decodeRecord(record)
+
+def printNumbered (records):
+    for n, record in records:
+        if isinstance(record, tuple):
+            print('%12d %s' % (n, decodeTrace(record)))
+        else:
+            print('%12s %s' % ('', record))
+
+def getArgs ():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-trace', help='trace file', default='.trace')
+    parser.add_argument('-at', help='first instruction to print', type=int)
+    parser.add_argument('-count', help='number of instructions to print',
+                        type=int, default=20)
+    parser.add_argument('-address', help='print executions of address',
+                        type=int)
+    parser.add_argument('-stops', help='print instructions around stops',
+                        action='store_true')
+    parser.add_argument('-window', help='instructions either side of a stop',
+                        type=int, default=10)
+    parser.add_argument('-index', help='(re)build the index',
+                        action='store_true')
+    parser.add_argument('-jobs', help='processes building the index',
+                        type=int)
+    return parser.parse_args()
+
+def main ():
+    args = getArgs()
+    if args.at is None and args.address is None and not args.stops \
+       and not args.index:
+        decodeFile(args.trace)
+        return
+    if not tracefile.isBinary(args.trace):
+        print('%s is not a binary trace, cannot be indexed' % args.trace,
+              file=sys.stderr)
+        sys.exit(1)
+    if args.index:
+        index = traceindex.build(args.trace, args.jobs)
+        print('%d instructions, %d messages indexed' %
+              (index.instructions, len(index.messages) // 2),
+              file=sys.stderr)
     else:
-        print(line)
-        
-def decodeFile (file):
-    for line in file:
-        decodeLine(line)
-        
-with open('.trace') as file:
-    decodeFile (file)
+        index = traceindex.openIndex(args.trace, args.jobs)
+    if not (args.at is None):
+        printNumbered(index.records(args.at, args.count))
+    if not (args.address is None):
+        printNumbered(index.executions(args.address))
+    if args.stops:
+        for n, text in index.messageList():
+            if text.startswith('Dynamic stop'):
+                start = max(n - args.window, 0)
+                printNumbered(index.records(start, n - start + args.window))
+                print()
+
+main()
@@ -0,0 +1,91 @@
+# Undo log - Andrew Herbert - 18/10/2026
+
+# Records enough about each instruction executed to undo it, so that a run
+# that ends in a failure or an unexpected dynamic stop can be stepped back
+# from where it stopped to find the cause, see back and backto in
+# debugger.py.  While a machine has an undo log (machine.undoLog) it is run
+# by Machine.runLogged(), which records for each instruction
+#
+#   regs   - the SCR (the address of the instruction), A and Q before it,
+#            whether at level 4 and whether it read the reader or the
+#            teletype, packed into 64 bits
+#   writes - the word it overwrote, as address + 1 and the old value, or 0
+#            if none (stores, count, store S and load B, into the B word)
+#
+# in two arrays used as a ring, so only the last size instructions are
+# kept, sixteen bytes each.  Undoing an instruction puts back the word it
+# overwrote, the registers, level and SCR, and moves the reader or teletype
+# input back a character if it read one.  Output cannot be taken back: what
+# was punched or printed stays, and is punched or printed again if the
+# instructions are run again.
+
+from array import array
+
+mask18     = (1 << 18) - 1
+addrBits   = 14 # addresses are of a 16K store
+addrMask   = (1 << addrBits) - 1
+aShift     = 14
+qShift     = 32
+level4Bit  = 1 << 50
+readerBit  = 1 << 51
+ttyInBit   = 1 << 52
+valueShift = 15 # writes hold address + 1 below the old value
+
+class UndoLog:
+
+    def __init__ (self, size):
+        self.size   = size
+        self.regs   = array('Q', bytes(8*size))
+        self.writes = array('Q', bytes(8*size))
+        self.next   = 0 # where the next instruction is recorded
+        self.count  = 0 # instructions recorded, at most size
+
+    def forget (self):
+        # drop the last instruction recorded, which did not happen
+        if self.count > 0:
+            self.next = (self.next - 1) % self.size
+            self.count -= 1
+
+    def undo (self, machine):
+        # undo the last instruction recorded, returns False if none
+        if self.count == 0:
+            return False
+        self.forget()
+        regs  = self.regs[self.next]
+        write = self.writes[self.next]
+        level = 4 if regs & level4Bit else 1
+        if machine.level != level:
+            machine.setLevel(level)
+        if write != 0:
+            addr = (write & ((1 << valueShift) - 1)) - 1
+            machine.store[addr] = write >> valueShift
+            machine.invalidate(addr)
+        machine.store[machine.scr] = regs & addrMask
+        machine.aReg = (regs >> aShift) & mask18
+        machine.qReg = (regs >> qShift) & mask18
+        if regs & readerBit:
+            machine.ptrIdx -= 1
+        if regs & ttyInBit:
+            machine.ttyInIdx -= 1
+        machine.instructions -= 1
+        machine.message = None
+        return True
+
+    def back (self, machine, n):
+        # undo up to n instructions, returns how many were undone
+        done = 0
+        while done < n and self.undo(machine):
+            done += 1
+        return done
+
+    def lastWrite (self, addr):
+        # how many instructions back the last one recorded writing addr
+        # is, or None if none did
+        key  = addr + 1
+        mask = (1 << valueShift) - 1
+        i    = self.next
+        for n in range(1, self.count + 1):
+            i = i - 1 if i > 0 else self.size - 1
+            if self.writes[i] & mask == key:
+                return n
+        return None